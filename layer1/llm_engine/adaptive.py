@@ -0,0 +1,94 @@
+# layer1/llm_engine/adaptive.py
+from __future__ import annotations
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class AIMDLimiter:
+    """
+    Additive-increase / multiplicative-decrease controller for the number of
+    concurrent LLM calls, fed with the latency and outcome of every call.
+    After each window of calls:
+    - error rate above max_error_rate, or p90 latency above target_latency:
+      limit = limit * backoff (never below min_limit)
+    - otherwise, if the limit was actually reached during the window (calls
+      queued or every slot busy): limit = limit + increase (never above max_limit)
+    - otherwise the limit is left alone, since there is no evidence more slots help
+    target_latency should stay well under the connector timeout so the limit
+    backs off before calls start timing out.
+    """
+
+    def __init__(
+        self,
+        target_latency: float = 60.0,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        increase: int = 1,
+        backoff: float = 0.7,
+        window: int = 10,
+        max_error_rate: float = 0.1,
+    ):
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.target_latency = target_latency
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.backoff = backoff
+        self.window = max(1, window)
+        self.max_error_rate = max_error_rate
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._saturated = False
+        self.increases = 0
+        self.decreases = 0
+        self.last_p90 = 0.0
+        self.last_error_rate = 0.0
+
+    @classmethod
+    def for_timeout(cls, timeout: float, **kwargs: Any) -> "AIMDLimiter":
+        """Target half of the connector's request timeout (e.g. 60s for the default 120s)."""
+        return cls(target_latency=timeout * 0.5, **kwargs)
+
+    def observe(self, limit: int, latency: float, ok: bool, saturated: bool) -> int:
+        """Record one finished call and return the (possibly updated) limit."""
+        with self._lock:
+            self._latencies.append(latency)
+            if not ok:
+                self._errors += 1
+            self._saturated = self._saturated or saturated
+            if len(self._latencies) < self.window:
+                return limit
+
+            ordered = sorted(self._latencies)
+            p90 = ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+            error_rate = self._errors / len(ordered)
+            saturated = self._saturated
+            self._latencies = []
+            self._errors = 0
+            self._saturated = False
+            self.last_p90 = p90
+            self.last_error_rate = error_rate
+
+            if error_rate > self.max_error_rate or p90 > self.target_latency:
+                new_limit = max(self.min_limit, int(limit * self.backoff))
+                if new_limit < limit:
+                    self.decreases += 1
+                return new_limit
+            if saturated and limit < self.max_limit:
+                self.increases += 1
+                return min(self.max_limit, limit + self.increase)
+            return limit
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return {
+                "target_latency": self.target_latency,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "last_p90": self.last_p90,
+                "last_error_rate": self.last_error_rate,
+            }
@@ -0,0 +1,277 @@
+# layer1/llm_engine/balancer.py
+from __future__ import annotations
+import itertools
+import threading
+import time
+from typing import List, Optional, Iterator, AsyncIterator, Dict, Any, Union
+from .llm_connector import LMStudioConnector
+
+
+class _Backend:
+    __slots__ = ("connector", "outstanding", "healthy", "failures", "last_checked")
+
+    def __init__(self, connector: LMStudioConnector):
+        self.connector = connector
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.last_checked = 0.0
+
+
+class BalancedLMStudioConnector:
+    """
+    Load-balancing connector over several OpenAI-compatible endpoints.
+    Exposes the same llm/allm/stream/astream/embed API as LMStudioConnector, so it
+    plugs into Layer1LLMEngine.bind_lmstudio unchanged.
+
+    - Routes each call to the healthy backend with the fewest outstanding requests
+    - Ejects a backend after failure_threshold consecutive request failures
+    - A background thread probes /v1/models every health_interval seconds and
+      brings ejected backends back once they answer again
+    - If every backend is ejected, all of them are tried rather than failing outright
+    """
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        timeout: int = 120,
+        max_connections: int = 16,
+        health_interval: float = 10.0,
+        failure_threshold: int = 2,
+        start_health_checks: bool = True,
+    ):
+        if not base_urls:
+            raise ValueError("BalancedLMStudioConnector requires at least one base_url")
+        self._backends = [
+            _Backend(LMStudioConnector(base_url=url, timeout=timeout, max_connections=max_connections))
+            for url in base_urls
+        ]
+        self.health_interval = health_interval
+        self.failure_threshold = max(1, failure_threshold)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._rr = itertools.count()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        if start_health_checks and health_interval > 0:
+            self.start_health_checks()
+
+    @property
+    def model(self) -> str:
+        return self._backends[0].connector.model
+
+    @property
+    def embedding_model(self) -> str:
+        return self._backends[0].connector.embedding_model
+
+    @property
+    def base_url(self) -> str:
+        return ",".join(b.connector.base_url for b in self._backends)
+
+    # ----------------- routing -----------------
+    def _acquire(self) -> _Backend:
+        with self._lock:
+            candidates = [b for b in self._backends if b.healthy] or self._backends
+            low = min(b.outstanding for b in candidates)
+            tied = [b for b in candidates if b.outstanding == low]
+            backend = tied[next(self._rr) % len(tied)]
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend: _Backend, ok: bool) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if ok:
+                backend.failures = 0
+                return
+            backend.failures += 1
+            if backend.failures >= self.failure_threshold:
+                backend.healthy = False
+
+    # ----------------- connector API -----------------
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        backend = self._acquire()
+        ok = False
+        try:
+            result = backend.connector.llm(prompt, **params)
+            ok = True
+            return result
+        finally:
+            self._release(backend, ok)
+
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        backend = self._acquire()
+        ok = False
+        try:
+            result = await backend.connector.allm(prompt, **params)
+            ok = True
+            return result
+        finally:
+            self._release(backend, ok)
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        backend = self._acquire()
+        ok = False
+        try:
+            yield from backend.connector.stream(prompt, **params)
+            ok = True
+        except GeneratorExit:
+            # consumer stopped early; not a backend failure
+            ok = True
+            raise
+        finally:
+            self._release(backend, ok)
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        backend = self._acquire()
+        ok = False
+        try:
+            async for delta in backend.connector.astream(prompt, **params):
+                yield delta
+            ok = True
+        except GeneratorExit:
+            ok = True
+            raise
+        finally:
+            self._release(backend, ok)
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        backend = self._acquire()
+        ok = False
+        try:
+            result = backend.connector.embed(texts, model=model)
+            ok = True
+            return result
+        finally:
+            self._release(backend, ok)
+
+    async def aembed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        backend = self._acquire()
+        ok = False
+        try:
+            result = await backend.connector.aembed(texts, model=model)
+            ok = True
+            return result
+        finally:
+            self._release(backend, ok)
+
+    def health_check(self, timeout: float = 5.0) -> bool:
+        """True if at least one backend answers its /v1/models probe."""
+        self.check_backends(timeout)
+        return any(b.healthy for b in self._backends)
+
+    # ----------------- health probes -----------------
+    def check_backends(self, timeout: float = 5.0) -> None:
+        """Probe every backend once and update its healthy flag."""
+        for backend in self._backends:
+            alive = backend.connector.health_check(timeout=timeout)
+            with self._lock:
+                backend.healthy = alive
+                backend.last_checked = time.time()
+                if alive:
+                    backend.failures = 0
+
+    def start_health_checks(self) -> None:
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return
+        self._stop.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self) -> None:
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=self.health_interval)
+            self._health_thread = None
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            self.check_backends(timeout=min(5.0, self.health_interval))
+
+    def backend_status(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "base_url": b.connector.base_url,
+                    "healthy": b.healthy,
+                    "outstanding": b.outstanding,
+                    "failures": b.failures,
+                    "last_checked": b.last_checked,
+                }
+                for b in self._backends
+            ]
+
+    # ----------------- lifecycle -----------------
+    def close(self) -> None:
+        self.stop_health_checks()
+        for backend in self._backends:
+            backend.connector.close()
+
+    async def aclose(self) -> None:
+        self.stop_health_checks()
+        for backend in self._backends:
+            await backend.connector.aclose()
+
+
+def create_lmstudio_connector(
+    base_url: str, **kwargs: Any
+) -> Union[LMStudioConnector, BalancedLMStudioConnector]:
+    """
+    Build a connector from a base URL string. A comma-separated list of URLs
+    (e.g. LMSTUDIO_BASE_URL="http://gpu1:1234,http://gpu2:1234") yields a
+    BalancedLMStudioConnector; a single URL yields a plain LMStudioConnector.
+    """
+    urls = [u.strip() for u in (base_url or "").split(",") if u.strip()]
+    if len(urls) > 1:
+        return BalancedLMStudioConnector(urls, **kwargs)
+    balancer_only = ("health_interval", "failure_threshold", "start_health_checks")
+    connector_kwargs = {k: v for k, v in kwargs.items() if k not in balancer_only}
+    return LMStudioConnector(base_url=urls[0] if urls else None, **connector_kwargs)
@@ -0,0 +1,229 @@
+# layer1/llm_engine/embeddings.py
+from __future__ import annotations
+import asyncio
+import base64
+import contextlib
+import functools
+import hashlib
+import itertools
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .scheduler import Priority
+
+
+class EmbeddingService:
+    """
+    Batched, cached text embeddings on top of a connector's embed()/aembed().
+    - Identical texts in one call are embedded once
+    - Vectors are cached by content hash: in-process LRU, plus an optional
+      Redis tier (any object with RedisMemory's get/set API) storing float32 bytes;
+      get_many / set_many, when present, read and write a whole batch in one round trip
+    - Cache misses are sent batch_size texts per /v1/embeddings request
+    - With an LLMScheduler bound, each request holds a model slot at `priority`
+      (BACKGROUND by default), so embeddings share the server's concurrency limit
+    Redis failures are counted and ignored, like ResponseCache. aembed() checks the
+    LRU inline and runs the Redis tier on a worker thread, never on the event loop.
+    """
+
+    KEY_PREFIX = "llm:emb:"
+
+    def __init__(
+        self,
+        connector: Any,
+        model: Optional[str] = None,
+        batch_size: int = 64,
+        max_entries: int = 10000,
+        redis=None,
+        ttl: int = 7 * 24 * 3600,
+        scheduler: Any = None,
+        priority: Any = Priority.BACKGROUND,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.connector = connector
+        self.model = model or getattr(connector, "embedding_model", "")
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self.redis = redis
+        self.ttl = ttl
+        self.scheduler = scheduler
+        self.priority = priority
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.requests = 0
+        self.redis_errors = 0
+
+    # ----------------- keys / encoding -----------------
+    def make_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _encode(vector: Sequence[float]) -> str:
+        return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+    @staticmethod
+    def _decode(value: str) -> List[float]:
+        vector = array("f")
+        vector.frombytes(base64.b64decode(value))
+        return vector.tolist()
+
+    # ----------------- main API -----------------
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Vectors for texts, in input order."""
+        keys, found, pending = self._lookup_local(texts)
+        missing = self._resolve_redis(pending, self._redis_get_many(list(pending)), found)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            with self._slot():
+                vectors = self.connector.embed([text for _, text in batch], model=self.model or None)
+            self._redis_set_many(self._store(batch, vectors, found))
+        return [found[key] for key in keys]
+
+    async def aembed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Async counterpart of embed(); batches are sent concurrently."""
+        keys, found, pending = self._lookup_local(texts)
+        loop = asyncio.get_running_loop()
+        cached: List[Optional[List[float]]] = []
+        if pending and self.redis is not None:
+            cached = await loop.run_in_executor(None, self._redis_get_many, list(pending))
+        missing = self._resolve_redis(pending, cached, found)
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        results = await asyncio.gather(*[self._aembed_batch([text for _, text in b]) for b in batches])
+        written: Dict[str, str] = {}
+        for batch, vectors in zip(batches, results):
+            written.update(self._store(batch, vectors, found))
+        if written and self.redis is not None:
+            # like ResponseCache.aset: the write runs on a worker thread, not awaited
+            loop.run_in_executor(None, self._redis_set_many, written)
+        return [found[key] for key in keys]
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    async def aembed_one(self, text: str) -> List[float]:
+        return (await self.aembed([text]))[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "redis_hits": self.redis_hits,
+                "misses": self.misses,
+                "requests": self.requests,
+                "redis_errors": self.redis_errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    # ----------------- internals -----------------
+    def _lookup_local(self, texts: Sequence[str]) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """(keys, vectors found in the LRU, {key: text} still to look up)."""
+        keys = [self.make_key(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        pending: Dict[str, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in pending:
+                    continue
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+                    self.hits += 1
+                else:
+                    pending[key] = text
+        return keys, found, pending
+
+    def _resolve_redis(
+        self, pending: Dict[str, str], cached: List[Optional[List[float]]], found: Dict[str, List[float]]
+    ) -> List[Tuple[str, str]]:
+        """Merge Redis results into found; returns the (key, text) pairs that still need embedding."""
+        missing: List[Tuple[str, str]] = []
+        redis_hits = 0
+        for (key, text), vector in itertools.zip_longest(pending.items(), cached):
+            if vector is not None:
+                found[key] = vector
+                self._put_local(key, vector)
+                redis_hits += 1
+            else:
+                missing.append((key, text))
+        with self._lock:
+            self.hits += redis_hits
+            self.redis_hits += redis_hits
+            self.misses += len(missing)
+        return missing
+
+    def _slot(self):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(self.priority)
+
+    def _aslot(self):
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.aslot(self.priority)
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        async with self._aslot():
+            aembed = getattr(self.connector, "aembed", None)
+            if aembed is not None:
+                return await aembed(texts, model=self.model or None)
+            loop = asyncio.get_running_loop()
+            call = functools.partial(self.connector.embed, texts, model=self.model or None)
+            return await loop.run_in_executor(None, call)
+
+    def _store(
+        self, batch: List[Tuple[str, str]], vectors: List[List[float]], found: Dict[str, List[float]]
+    ) -> Dict[str, str]:
+        """Keep a batch's vectors in found and the LRU; returns the encoded Redis entries to write."""
+        with self._lock:
+            self.requests += 1
+        encoded: Dict[str, str] = {}
+        for (key, _), vector in zip(batch, vectors):
+            found[key] = vector
+            self._put_local(key, vector)
+            if self.redis is not None:
+                encoded[self.KEY_PREFIX + key] = self._encode(vector)
+        return encoded
+
+    def _redis_get_many(self, keys: List[str]) -> List[Optional[List[float]]]:
+        if self.redis is None or not keys:
+            return []
+        redis_keys = [self.KEY_PREFIX + key for key in keys]
+        try:
+            get_many = getattr(self.redis, "get_many", None)
+            values = get_many(redis_keys) if get_many is not None else [self.redis.get(k) for k in redis_keys]
+            return [self._decode(value) if value is not None else None for value in values]
+        except Exception:
+            with self._lock:
+                self.redis_errors += 1
+            return []
+
+    def _redis_set_many(self, items: Dict[str, str]) -> None:
+        if self.redis is None or not items:
+            return
+        try:
+            set_many = getattr(self.redis, "set_many", None)
+            if set_many is not None:
+                set_many(items, self.ttl)
+            else:
+                for key, value in items.items():
+                    self.redis.set(key, value, self.ttl)
+        except Exception:
+            with self._lock:
+                self.redis_errors += 1
+
+    def _put_local(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -7,3 +7,15 @@ class LLMEngineError(Exception):
 
 class MissingLLMBindingError(LLMEngineError):
     """Raised when LM Studio or LLM connector is not bound."""
+
+
+class CircuitOpenError(LLMEngineError):
+    """Raised when the LLM circuit breaker is open and calls fail fast."""
+
+
+class TranscriptMissError(LLMEngineError):
+    """Raised when a replay connector has no recorded response for a request."""
+
+
+class ReasoningBudgetError(LLMEngineError):
+    """Raised when a reasoning model returns no answer outside its <think> block, even after the direct-answer retry."""
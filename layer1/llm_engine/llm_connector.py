@@ -1,18 +1,36 @@
 # layer1/llm_engine/llm_connector.py
 from __future__ import annotations
+import asyncio
+import json
+import threading
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, Iterator, AsyncIterator, List
 import urllib.parse
 
+try:
+    import aiohttp
+except ImportError:  # async transport is optional; sync llm() still works
+    aiohttp = None
+
+
+_SSE_DONE = object()
+
 
 class LMStudioConnector:
     """
     Connector for LM Studio / local model serving.
     Expects LMSTUDIO_BASE_URL like "http://192.168.1.6:1234" (no extra :port)
-    Provides llm(prompt, **kwargs) -> str
+    Provides llm(prompt, **kwargs) -> str and allm(prompt, **kwargs) -> str,
+    plus stream()/astream() which yield content deltas from the SSE stream,
+    and embed()/aembed() for the /v1/embeddings endpoint.
+
+    Both transports keep a pooled keep-alive client (requests.Session for sync,
+    aiohttp.ClientSession for async) capped at max_connections, so concurrent
+    workflows share connections instead of paying a TCP handshake per call.
     """
 
-    def __init__(self, base_url: Optional[str] = None, timeout: int = 120):
+    def __init__(self, base_url: Optional[str] = None, timeout: int = 120, max_connections: int = 16):
         if base_url is None:
             raise ValueError("LMStudio base_url required (e.g. http://192.168.1.6:1234)")
         # normalize and strip trailing slashes
@@ -21,35 +39,269 @@ class LMStudioConnector:
         parsed = urllib.parse.urlparse(self.base_url)
         if parsed.scheme not in ("http", "https") or not parsed.netloc:
             raise ValueError(f"Invalid LMStudio base_url: {self.base_url}")
+        if max_connections < 1:
+            raise ValueError("max_connections must be >= 1")
         self.timeout = timeout
+        self.max_connections = max_connections
+        self.model = "deepseek-r1-0528-qwen3-8b"
+        self.embedding_model = "text-embedding-nomic-embed-text-v1.5"
 
-    def llm(self, prompt: str, max_tokens: int = 512, temperature: float = 0.2) -> str:
+        # sync pool: one session, adapter sized to max_connections
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # async pool: created lazily, bound to the loop that first uses it
+        self._async_session = None
+        self._async_loop = None
+        self._async_lock = threading.Lock()
+
+    # ----------------- request helpers -----------------
+    def _endpoint(self) -> str:
         """
         Uses /v1/chat/completions endpoint of LM Studio or compatible server.
         If your LM server uses a different path, change the endpoint here.
         """
-        endpoint = f"{self.base_url}/v1/chat/completions"
+        return f"{self.base_url}/v1/chat/completions"
+
+    def _build_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         payload = {
-            "model": "deepseek-r1-0528-qwen3-8b",
+            "model": model or self.model,
             "messages": [{"role": "user", "content": prompt}],
             "max_tokens": max_tokens,
             "temperature": temperature,
         }
+        if stop:
+            payload["stop"] = list(stop)
+        if response_format:
+            # OpenAI-style structured output, e.g. {"type": "json_schema", "json_schema": {...}}
+            payload["response_format"] = response_format
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _build_embedding_payload(self, texts: List[str], model: Optional[str] = None) -> Dict[str, Any]:
+        return {"model": model or self.embedding_model, "input": list(texts)}
+
+    @staticmethod
+    def _parse_embeddings(data: Dict[str, Any], count: int) -> List[List[float]]:
+        items = sorted(data.get("data") or [], key=lambda item: item.get("index", 0))
+        if len(items) != count:
+            raise ValueError(f"expected {count} embeddings, got {len(items)}")
+        return [item["embedding"] for item in items]
+
+    @staticmethod
+    def _parse_response(data: Dict[str, Any]) -> str:
+        # support both Chat-style and text completion style
+        if "choices" in data and data["choices"]:
+            # Chat-style: choices[0].message.content
+            ch0 = data["choices"][0]
+            if "message" in ch0 and "content" in ch0["message"]:
+                return ch0["message"]["content"]
+            if "text" in ch0:
+                return ch0["text"]
+        # fallback: if 'output' root key
+        if "output" in data:
+            return str(data["output"])
+        return str(data)
+
+    @staticmethod
+    def _parse_sse_line(line: str):
+        """
+        Parse one server-sent-events line of a streamed completion.
+        Returns the content delta (possibly ""), _SSE_DONE at end of stream,
+        or None for lines that carry no data (comments, keep-alives).
+        """
+        line = line.strip()
+        if not line.startswith("data:"):
+            return None
+        body = line[5:].strip()
+        if body == "[DONE]":
+            return _SSE_DONE
+        data = json.loads(body)
+        choices = data.get("choices") or []
+        if not choices:
+            return ""
+        ch0 = choices[0]
+        delta = ch0.get("delta") or {}
+        return delta.get("content") or ch0.get("text") or ""
+
+    # ----------------- sync API -----------------
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Blocking call over the shared keep-alive session.
+        """
+        payload = self._build_payload(
+            prompt, max_tokens, temperature, model=model, stop=stop, response_format=response_format
+        )
         try:
-            resp = requests.post(endpoint, json=payload, timeout=self.timeout)
+            resp = self._session.post(self._endpoint(), json=payload, timeout=self.timeout)
             resp.raise_for_status()
-            data = resp.json()
-            # support both Chat-style and text completion style
-            if "choices" in data and data["choices"]:
-                # Chat-style: choices[0].message.content
-                ch0 = data["choices"][0]
-                if "message" in ch0 and "content" in ch0["message"]:
-                    return ch0["message"]["content"]
-                if "text" in ch0:
-                    return ch0["text"]
-            # fallback: if 'output' root key
-            if "output" in data:
-                return str(data["output"])
-            return str(data)
+            return self._parse_response(resp.json())
+        except Exception as e:
+            raise RuntimeError(f"LMStudioConnector failed: {e}") from e
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """
+        Blocking streaming call. Yields non-empty content deltas as they arrive.
+        """
+        payload = self._build_payload(
+            prompt, max_tokens, temperature, stream=True, model=model, stop=stop, response_format=response_format
+        )
+        try:
+            with self._session.post(self._endpoint(), json=payload, timeout=self.timeout, stream=True) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines(decode_unicode=True):
+                    delta = self._parse_sse_line(line or "")
+                    if delta is _SSE_DONE:
+                        break
+                    if delta:
+                        yield delta
         except Exception as e:
-            raise RuntimeError(f"LMStudioConnector failed: {e}")
+            raise RuntimeError(f"LMStudioConnector stream failed: {e}") from e
+
+    def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """
+        Embed a batch of texts in one /v1/embeddings request; vectors come back in input order.
+        """
+        if not texts:
+            return []
+        payload = self._build_embedding_payload(texts, model)
+        try:
+            resp = self._session.post(f"{self.base_url}/v1/embeddings", json=payload, timeout=self.timeout)
+            resp.raise_for_status()
+            return self._parse_embeddings(resp.json(), len(texts))
+        except Exception as e:
+            raise RuntimeError(f"LMStudioConnector embeddings failed: {e}") from e
+
+    def health_check(self, timeout: float = 5.0) -> bool:
+        """
+        Probe /v1/models. Returns True if the server answers with a 2xx status.
+        """
+        try:
+            resp = self._session.get(f"{self.base_url}/v1/models", timeout=timeout)
+            return 200 <= resp.status_code < 300
+        except Exception:
+            return False
+
+    # ----------------- async API -----------------
+    async def _get_async_session(self):
+        if aiohttp is None:
+            raise RuntimeError("LMStudioConnector async transport requires aiohttp")
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            if self._async_session is None or self._async_session.closed or self._async_loop is not loop:
+                connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+                self._async_session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(total=self.timeout),
+                )
+                self._async_loop = loop
+            return self._async_session
+
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Non-blocking call over the shared aiohttp pool. Safe to await from
+        Layer-2 workers without stalling the event loop.
+        """
+        payload = self._build_payload(
+            prompt, max_tokens, temperature, model=model, stop=stop, response_format=response_format
+        )
+        try:
+            session = await self._get_async_session()
+            async with session.post(self._endpoint(), json=payload) as resp:
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+            return self._parse_response(data)
+        except Exception as e:
+            raise RuntimeError(f"LMStudioConnector failed: {e}") from e
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Async streaming call over the shared aiohttp pool. Yields non-empty content deltas.
+        """
+        payload = self._build_payload(
+            prompt, max_tokens, temperature, stream=True, model=model, stop=stop, response_format=response_format
+        )
+        try:
+            session = await self._get_async_session()
+            async with session.post(self._endpoint(), json=payload) as resp:
+                resp.raise_for_status()
+                async for raw in resp.content:
+                    delta = self._parse_sse_line(raw.decode("utf-8", errors="replace"))
+                    if delta is _SSE_DONE:
+                        break
+                    if delta:
+                        yield delta
+        except Exception as e:
+            raise RuntimeError(f"LMStudioConnector stream failed: {e}") from e
+
+    async def aembed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """
+        Async counterpart of embed() over the shared aiohttp pool.
+        """
+        if not texts:
+            return []
+        payload = self._build_embedding_payload(texts, model)
+        try:
+            session = await self._get_async_session()
+            async with session.post(f"{self.base_url}/v1/embeddings", json=payload) as resp:
+                resp.raise_for_status()
+                data = await resp.json(content_type=None)
+            return self._parse_embeddings(data, len(texts))
+        except Exception as e:
+            raise RuntimeError(f"LMStudioConnector embeddings failed: {e}") from e
+
+    # ----------------- lifecycle -----------------
+    def close(self) -> None:
+        """Close the sync pool. Use aclose() from async code to also release the async pool."""
+        self._session.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_session is not None and not self._async_session.closed:
+            await self._async_session.close()
+        self._async_session = None
+        self._async_loop = None
@@ -1,8 +1,24 @@
 from __future__ import annotations
-from typing import Callable, Optional
+import asyncio
+import contextlib
+import functools
+import json
+import time
+from typing import Callable, Optional, Iterator, AsyncIterator, Dict, Any, List, Tuple
 from .llm_connector import LMStudioConnector
 from .llm_state import LLMCallState
-from .errors import MissingLLMBindingError
+from .response_cache import ResponseCache
+from .singleflight import SingleFlight
+from .reasoning import ReasoningConfig, ReasoningSplitter, split_reasoning
+from .telemetry import LLMTelemetry
+from .transcript import RecordingConnector, TranscriptStore
+from .scheduler import LLMScheduler
+from .errors import MissingLLMBindingError, ReasoningBudgetError
+
+
+def _deliver(on_delta: Optional[Callable[[str], None]], text: str) -> None:
+    if on_delta is not None and text:
+        on_delta(text)
 
 
 class Layer1LLMEngine:
@@ -10,31 +26,583 @@ class Layer1LLMEngine:
     Main Layer-1 LLM Engine.
     - Bind LM Studio connector
     - Provides llm(prompt) -> str callable for Planner, Memory, or State Manager
+    - Provides stream(prompt) / astream(prompt) token iterators with TTFT + tokens/sec tracking
+    - Optional exact-match response cache for deterministic calls
+    - Single-flight coalescing of concurrent identical requests
+    - Reasoning-aware mode: <think> blocks are streamed, budgeted and stripped,
+      only the answer is returned (thinking goes to LLMCallState.metadata)
+    - Telemetry: every llm/allm/stream call is recorded (latency, sizes, tokens/sec,
+      error class, calling node) in a ring buffer; see telemetry_summary()
+    - Record mode: record_to(path) appends every upstream exchange to a transcript
+      that ReplayConnector can serve later without a model server
+    - Optional LLMScheduler: upstream calls wait for a model slot by priority
+      (interactive > planning > background) with per-user fair queuing
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = True,
+        reasoning: Optional[ReasoningConfig] = None,
+        telemetry: Optional[LLMTelemetry] = None,
+        scheduler: Optional[LLMScheduler] = None,
+    ):
         self._connector: Optional[LMStudioConnector] = None
+        self._cache = cache
+        self._flight: Optional[SingleFlight] = SingleFlight() if coalesce else None
+        self._reasoning = reasoning
+        self._telemetry = telemetry if telemetry is not None else LLMTelemetry()
+        self._recording: Optional[TranscriptStore] = None
+        self._scheduler = scheduler
 
     # ----------------- binding -----------------
     def bind_lmstudio(self, connector: LMStudioConnector) -> None:
         """Bind LM Studio connector"""
+        if self._recording is not None:
+            connector = RecordingConnector(connector, self._recording)
         self._connector = connector
 
+    def bind_cache(self, cache: Optional[ResponseCache]) -> None:
+        """Bind (or with None, remove) the exact-match response cache"""
+        self._cache = cache
+
+    def bind_reasoning(self, config: Optional[ReasoningConfig]) -> None:
+        """Enable (or with None, disable) reasoning-aware mode: <think> output is stripped from llm() results"""
+        self._reasoning = config
+
+    def record_to(self, path: str) -> TranscriptStore:
+        """Start record mode: upstream exchanges (prompt hash, response, timing) are appended to path"""
+        self.stop_recording()
+        self._recording = TranscriptStore.shared(path)
+        if self._connector is not None:
+            self._connector = RecordingConnector(self._connector, self._recording)
+        return self._recording
+
+    def stop_recording(self) -> None:
+        """Leave record mode and close the transcript file"""
+        if isinstance(self._connector, RecordingConnector):
+            self._connector = self._connector.inner
+        if self._recording is not None:
+            self._recording.close()
+            self._recording = None
+
+    def bind_scheduler(self, scheduler: Optional[LLMScheduler]) -> None:
+        """Bind (or with None, remove) the priority scheduler that limits concurrent upstream calls"""
+        self._scheduler = scheduler
+
+    @property
+    def scheduler(self) -> Optional[LLMScheduler]:
+        return self._scheduler
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        """Queue depth and wait times of the bound scheduler (empty if none)"""
+        return self._scheduler.stats() if self._scheduler is not None else {}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the bound response cache (empty if none)"""
+        return self._cache.stats() if self._cache is not None else {}
+
+    def coalesce_stats(self) -> Dict[str, Any]:
+        """Leader/shared counters of the in-flight request table (empty if disabled)"""
+        return self._flight.stats() if self._flight is not None else {}
+
+    @property
+    def telemetry(self) -> LLMTelemetry:
+        return self._telemetry
+
+    def telemetry_summary(self) -> Dict[str, Any]:
+        """Latency percentiles, throughput, errors and per-node breakdown of recent calls"""
+        return self._telemetry.summary()
+
     # ----------------- main API -----------------
-    def llm(self, prompt: str, max_tokens: int = 2048, temperature: float = 0.7) -> str:
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        answer_complete: Optional[Callable[[str], bool]] = None,
+        call_state: Optional[LLMCallState] = None,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        node: Optional[str] = None,
+        priority: Optional[Any] = None,
+        user_id: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
         """
         Main callable. Raises error if no connector bound.
+        Responses are cached when a cache is bound and the call is deterministic
+        (temperature 0) or explicitly opted in with cache=True; cache=False bypasses it.
+        Concurrent identical requests share a single upstream call.
+        In reasoning mode, answer_complete(answer_so_far) -> True stops generation early.
+        model / stop override the connector's default model and add stop sequences;
+        response_format requests structured (JSON schema) output from the backend.
+        node names the caller (e.g. "decompose_node") in telemetry.
+        priority ("interactive" / "planning" / "background") and user_id order the
+        call in the bound scheduler's queue.
+        on_delta(text) receives the answer as it streams (<think> text excluded); a cache hit
+        or a call coalesced onto another delivers the whole answer in one piece.
+        """
+        if self._connector is None:
+            raise MissingLLMBindingError("LM Studio connector not bound to LLM Engine")
+        call_state = call_state or LLMCallState.new(prompt)
+        started = time.perf_counter()
+        try:
+            params = {
+                "max_tokens": max_tokens, "temperature": temperature, "model": model,
+                "stop": stop, "response_format": response_format,
+            }
+            response = self._llm(prompt, params, cache, answer_complete, call_state, (priority, user_id), on_delta)
+        except Exception as e:
+            self._observe(started, prompt, "", call_state, node, e)
+            raise
+        self._observe(started, prompt, response, call_state, node)
+        return response
+
+    def _llm(
+        self,
+        prompt: str,
+        params: Dict[str, Any],
+        cache: Optional[bool],
+        answer_complete: Optional[Callable[[str], bool]],
+        call_state: LLMCallState,
+        admission: Tuple[Any, Optional[str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        key = self._request_key(prompt, params)
+        use_cache = self._use_cache(params["temperature"], cache)
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                call_state.metadata["cache_hit"] = True
+                call_state.mark_completed(cached)
+                _deliver(on_delta, cached)
+                return cached
+
+        def call() -> Tuple[str, LLMCallState]:
+            with self._slot(*admission):
+                response = self._complete(prompt, params, answer_complete, call_state, on_delta)
+            if use_cache:
+                self._cache.set(key, response)
+            return response, call_state
+
+        if self._flight is None:
+            return call()[0]
+        return self._shared_result(call_state, on_delta, *self._flight.do(key, call))
+
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        cache: Optional[bool] = None,
+        answer_complete: Optional[Callable[[str], bool]] = None,
+        call_state: Optional[LLMCallState] = None,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        node: Optional[str] = None,
+        priority: Optional[Any] = None,
+        user_id: Optional[str] = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        """
+        Async counterpart of llm(). Uses the connector's pooled async transport when
+        available, otherwise offloads the sync call to the default executor.
+        """
+        if self._connector is None:
+            raise MissingLLMBindingError("LM Studio connector not bound to LLM Engine")
+        call_state = call_state or LLMCallState.new(prompt)
+        started = time.perf_counter()
+        try:
+            params = {
+                "max_tokens": max_tokens, "temperature": temperature, "model": model,
+                "stop": stop, "response_format": response_format,
+            }
+            response = await self._allm(
+                prompt, params, cache, answer_complete, call_state, (priority, user_id), on_delta
+            )
+        except Exception as e:
+            self._observe(started, prompt, "", call_state, node, e)
+            raise
+        self._observe(started, prompt, response, call_state, node)
+        return response
+
+    async def _allm(
+        self,
+        prompt: str,
+        params: Dict[str, Any],
+        cache: Optional[bool],
+        answer_complete: Optional[Callable[[str], bool]],
+        call_state: LLMCallState,
+        admission: Tuple[Any, Optional[str]],
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        key = self._request_key(prompt, params)
+        use_cache = self._use_cache(params["temperature"], cache)
+        if use_cache:
+            cached = await self._cache.aget(key)
+            if cached is not None:
+                call_state.metadata["cache_hit"] = True
+                call_state.mark_completed(cached)
+                _deliver(on_delta, cached)
+                return cached
+
+        async def call() -> Tuple[str, LLMCallState]:
+            async with self._aslot(*admission):
+                response = await self._acomplete(prompt, params, answer_complete, call_state, on_delta)
+            if use_cache:
+                self._cache.aset(key, response)
+            return response, call_state
+
+        if self._flight is None:
+            return (await call())[0]
+        return self._shared_result(call_state, on_delta, *(await self._flight.ado(key, call)))
+
+    @staticmethod
+    def _shared_result(
+        call_state: LLMCallState,
+        on_delta: Optional[Callable[[str], None]],
+        response: str,
+        leader_state: LLMCallState,
+    ) -> str:
+        """A coalesced follower gets the leader's thinking metadata on its own call state."""
+        if leader_state is not call_state:
+            call_state.metadata.update(leader_state.metadata)
+            call_state.metadata["coalesced"] = True
+            call_state.mark_completed(response)
+            _deliver(on_delta, response)
+        return response
+
+    def _request_key(self, prompt: str, params: Dict[str, Any]) -> str:
+        model = params["model"] or getattr(self._connector, "model", "")
+        if params["stop"]:
+            # stop sequences change the output, so they are part of the identity
+            prompt = prompt + "\x00stop:" + "\x00".join(params["stop"])
+        if params["response_format"]:
+            prompt = prompt + "\x00format:" + json.dumps(params["response_format"], sort_keys=True)
+        return ResponseCache.make_key(model, prompt, params["temperature"], params["max_tokens"])
+
+    def _slot(self, priority: Any, user_id: Optional[str]):
+        if self._scheduler is None:
+            return contextlib.nullcontext()
+        return self._scheduler.slot(priority, user_id)
+
+    def _aslot(self, priority: Any, user_id: Optional[str]):
+        if self._scheduler is None:
+            return contextlib.nullcontext()
+        return self._scheduler.aslot(priority, user_id)
+
+    def _use_cache(self, temperature: float, cache: Optional[bool]) -> bool:
+        if self._cache is None or cache is False:
+            return False
+        return cache is True or temperature == 0
+
+    def _observe(
+        self,
+        started: float,
+        prompt: str,
+        response: str,
+        call_state: Optional[LLMCallState],
+        node: Optional[str],
+        error: Optional[BaseException] = None,
+    ) -> None:
+        latency = time.perf_counter() - started
+        cached = bool(call_state is not None and call_state.metadata.get("cache_hit"))
+        tokens = call_state.completion_tokens if call_state is not None else 0
+        tps = call_state.tokens_per_sec if call_state is not None else 0.0
+        if not tokens and response and not cached:
+            # non-streamed call: estimate (~4 chars/token) and use end-to-end rate
+            tokens = (len(response) + 3) // 4
+            tps = tokens / latency if latency > 0 else 0.0
+        self._telemetry.record(
+            latency,
+            len(prompt),
+            len(response),
+            completion_tokens=tokens,
+            tokens_per_sec=tps,
+            error=type(error).__name__ if error is not None else None,
+            node=node,
+            cached=cached,
+        )
+
+    # ----------------- upstream calls -----------------
+    def _complete(
+        self,
+        prompt: str,
+        params: Dict[str, Any],
+        answer_complete: Optional[Callable[[str], bool]],
+        call_state: Optional[LLMCallState],
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        cfg = self._reasoning
+        stream = getattr(self._connector, "stream", None)
+        if cfg is None and stream is not None and on_delta is not None:
+            response = "".join(self._forward(stream(prompt, **params), on_delta, call_state))
+            if call_state is not None:
+                call_state.mark_completed(response)
+            return response
+        if cfg is None or stream is None:
+            response = self._connector.llm(prompt, **params)
+            if cfg is not None:
+                thinking, response = split_reasoning(response)
+                self._record_thinking(call_state, thinking, 0, False)
+            if call_state is not None:
+                call_state.mark_completed(response)
+            _deliver(on_delta, response)
+            return response
+
+        splitter = ReasoningSplitter()
+        truncated = False
+        deltas = stream(prompt, **params)
+        try:
+            for delta in deltas:
+                if call_state is not None:
+                    call_state.add_tokens()
+                _deliver(on_delta, splitter.feed(delta))
+                if self._over_thinking_budget(splitter):
+                    truncated = True
+                    break
+                if answer_complete is not None and splitter.answer and answer_complete(splitter.answer):
+                    break
+        finally:
+            # closing the generator releases the HTTP response when we stop early
+            close = getattr(deltas, "close", None)
+            if close is not None:
+                close()
+        # stream ended inside <think> (max_tokens hit): no answer yet, ask directly
+        truncated = truncated or splitter.in_thinking
+        thinking, answer = splitter.finish()
+        if truncated:
+            fallback = self._connector.llm(prompt + cfg.direct_answer_suffix, **self._fallback_params(params))
+            answer = self._fallback_answer(fallback, call_state, thinking, splitter.thinking_tokens)
+            _deliver(on_delta, answer)
+        self._record_thinking(call_state, thinking, splitter.thinking_tokens, truncated)
+        if call_state is not None:
+            call_state.mark_completed(answer)
+        return answer
+
+    async def _acomplete(
+        self,
+        prompt: str,
+        params: Dict[str, Any],
+        answer_complete: Optional[Callable[[str], bool]],
+        call_state: Optional[LLMCallState],
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> str:
+        cfg = self._reasoning
+        astream = getattr(self._connector, "astream", None)
+        if cfg is None and astream is not None and on_delta is not None:
+            parts = [delta async for delta in self._aforward(astream(prompt, **params), on_delta, call_state)]
+            response = "".join(parts)
+            if call_state is not None:
+                call_state.mark_completed(response)
+            return response
+        if cfg is None or astream is None:
+            response = await self._acall_connector(prompt, params)
+            if cfg is not None:
+                thinking, response = split_reasoning(response)
+                self._record_thinking(call_state, thinking, 0, False)
+            if call_state is not None:
+                call_state.mark_completed(response)
+            _deliver(on_delta, response)
+            return response
+
+        splitter = ReasoningSplitter()
+        truncated = False
+        deltas = astream(prompt, **params)
+        try:
+            async for delta in deltas:
+                if call_state is not None:
+                    call_state.add_tokens()
+                _deliver(on_delta, splitter.feed(delta))
+                if self._over_thinking_budget(splitter):
+                    truncated = True
+                    break
+                if answer_complete is not None and splitter.answer and answer_complete(splitter.answer):
+                    break
+        finally:
+            await deltas.aclose()
+        # stream ended inside <think> (max_tokens hit): no answer yet, ask directly
+        truncated = truncated or splitter.in_thinking
+        thinking, answer = splitter.finish()
+        if truncated:
+            fallback = await self._acall_connector(prompt + cfg.direct_answer_suffix, self._fallback_params(params))
+            answer = self._fallback_answer(fallback, call_state, thinking, splitter.thinking_tokens)
+            _deliver(on_delta, answer)
+        self._record_thinking(call_state, thinking, splitter.thinking_tokens, truncated)
+        if call_state is not None:
+            call_state.mark_completed(answer)
+        return answer
+
+    @staticmethod
+    def _forward(
+        deltas: Iterator[str], on_delta: Callable[[str], None], call_state: Optional[LLMCallState]
+    ) -> Iterator[str]:
+        try:
+            for delta in deltas:
+                if call_state is not None:
+                    call_state.add_tokens()
+                on_delta(delta)
+                yield delta
+        finally:
+            close = getattr(deltas, "close", None)
+            if close is not None:
+                close()
+
+    @staticmethod
+    async def _aforward(
+        deltas: AsyncIterator[str], on_delta: Callable[[str], None], call_state: Optional[LLMCallState]
+    ) -> AsyncIterator[str]:
+        try:
+            async for delta in deltas:
+                if call_state is not None:
+                    call_state.add_tokens()
+                on_delta(delta)
+                yield delta
+        finally:
+            await deltas.aclose()
+
+    async def _acall_connector(self, prompt: str, params: Dict[str, Any]) -> str:
+        allm = getattr(self._connector, "allm", None)
+        if allm is not None:
+            return await allm(prompt, **params)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self._connector.llm, prompt, **params))
+
+    def _fallback_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # the caller's limit still applies: a 2048-token plan must not be cut to the fallback minimum
+        max_tokens = max(params.get("max_tokens") or 0, self._reasoning.fallback_max_tokens)
+        return dict(params, max_tokens=max_tokens)
+
+    def _fallback_answer(
+        self, fallback: str, call_state: Optional[LLMCallState], thinking: str, thinking_tokens: int
+    ) -> str:
+        answer = split_reasoning(fallback)[1]
+        if not answer:
+            # the direct-answer retry also spent its tokens thinking
+            self._record_thinking(call_state, thinking, thinking_tokens, True)
+            raise ReasoningBudgetError("model produced no answer outside <think>, also on the direct-answer retry")
+        return answer
+
+    def _over_thinking_budget(self, splitter: ReasoningSplitter) -> bool:
+        limit = self._reasoning.max_thinking_tokens
+        return limit is not None and splitter.in_thinking and splitter.thinking_tokens > limit
+
+    @staticmethod
+    def _record_thinking(call_state: Optional[LLMCallState], thinking: str, tokens: int, truncated: bool) -> None:
+        if call_state is None:
+            return
+        call_state.metadata["thinking"] = thinking
+        call_state.metadata["thinking_tokens"] = tokens
+        call_state.metadata["thinking_truncated"] = truncated
+
+    # ----------------- streaming API -----------------
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        call_state: Optional[LLMCallState] = None,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        node: Optional[str] = None,
+        priority: Optional[Any] = None,
+        user_id: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Yield content deltas as the model produces them.
+        If call_state is given, it records time-to-first-token, token count and
+        the joined response once the stream is exhausted (or closed early).
+        """
+        if self._connector is None:
+            raise MissingLLMBindingError("LM Studio connector not bound to LLM Engine")
+        call_state = call_state or LLMCallState.new(prompt)
+        parts = []
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        started = time.perf_counter()
+        try:
+            # the model slot is held until the stream ends or the consumer closes it
+            with self._slot(priority, user_id):
+                for delta in self._connector.stream(prompt, **params):
+                    call_state.add_tokens()
+                    parts.append(delta)
+                    yield delta
+        except GeneratorExit:
+            # consumer stopped early; record what was produced
+            call_state.mark_completed("".join(parts))
+            self._observe(started, prompt, call_state.response, call_state, node)
+            raise
+        except Exception as e:
+            self._observe(started, prompt, "".join(parts), call_state, node, e)
+            raise
+        call_state.mark_completed("".join(parts))
+        self._observe(started, prompt, call_state.response, call_state, node)
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        call_state: Optional[LLMCallState] = None,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        node: Optional[str] = None,
+        priority: Optional[Any] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream().
         """
         if self._connector is None:
             raise MissingLLMBindingError("LM Studio connector not bound to LLM Engine")
-        return self._connector.llm(prompt, max_tokens=max_tokens, temperature=temperature)
+        call_state = call_state or LLMCallState.new(prompt)
+        parts = []
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        started = time.perf_counter()
+        try:
+            # the model slot is held until the stream ends or the consumer closes it
+            async with self._aslot(priority, user_id):
+                async for delta in self._connector.astream(prompt, **params):
+                    call_state.add_tokens()
+                    parts.append(delta)
+                    yield delta
+        except GeneratorExit:
+            # consumer stopped early; record what was produced
+            call_state.mark_completed("".join(parts))
+            self._observe(started, prompt, call_state.response, call_state, node)
+            raise
+        except Exception as e:
+            self._observe(started, prompt, "".join(parts), call_state, node, e)
+            raise
+        call_state.mark_completed("".join(parts))
+        self._observe(started, prompt, call_state.response, call_state, node)
 
     # ----------------- helper -----------------
-    def generate_call_state(self, prompt: str, metadata: dict = None) -> LLMCallState:
+    def generate_call_state(
+        self,
+        prompt: str,
+        metadata: dict = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> LLMCallState:
         """
         Create a new call state, run LLM, and mark completed.
+        If on_delta is given, the call is streamed and each delta is passed to it.
         """
         state = LLMCallState.new(prompt, metadata)
-        response = self.llm(prompt)
-        state.mark_completed(response)
+        if on_delta is None:
+            self.llm(prompt, call_state=state)
+            return state
+        for delta in self.stream(prompt, call_state=state):
+            on_delta(delta)
         return state
@@ -13,6 +13,8 @@ class LLMCallState:
     metadata: Dict[str, Any] = field(default_factory=dict)
     created_at: float = field(default_factory=time.time)
     completed_at: float = 0.0
+    first_token_at: float = 0.0
+    completion_tokens: int = 0
 
     @classmethod
     def new(cls, prompt: str, metadata: Dict[str, Any] = None) -> "LLMCallState":
@@ -22,6 +24,33 @@ class LLMCallState:
             metadata=metadata or {},
         )
 
+    def mark_first_token(self):
+        if not self.first_token_at:
+            self.first_token_at = time.time()
+
+    def add_tokens(self, count: int = 1):
+        """Count streamed tokens (one SSE delta is treated as one token)."""
+        self.mark_first_token()
+        self.completion_tokens += count
+
     def mark_completed(self, response: str):
         self.response = response
         self.completed_at = time.time()
+
+    @property
+    def time_to_first_token(self) -> float:
+        """Seconds from call creation to first streamed token (0.0 if not streamed)."""
+        if not self.first_token_at:
+            return 0.0
+        return self.first_token_at - self.created_at
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Decode throughput measured from the first token to completion."""
+        if not self.completed_at or not self.first_token_at or self.completion_tokens < 2:
+            return 0.0
+        elapsed = self.completed_at - self.first_token_at
+        if elapsed <= 0:
+            return 0.0
+        # first token marks the start of the window, so it is not counted in the rate
+        return (self.completion_tokens - 1) / elapsed
@@ -0,0 +1,145 @@
+# layer1/llm_engine/reasoning.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+@dataclass
+class ReasoningConfig:
+    """
+    Reasoning-aware response mode for DeepSeek-R1 style models.
+    - max_thinking_tokens: abort the stream once the <think> block exceeds this
+      many streamed tokens (None = unlimited) and ask again for a direct answer
+    - fallback_max_tokens: minimum token limit of that direct-answer retry (a larger
+      max_tokens of the original call is kept); an empty retry answer raises ReasoningBudgetError
+    - direct_answer_suffix: appended to the prompt for the retry
+    """
+    max_thinking_tokens: Optional[int] = 1024
+    fallback_max_tokens: int = 512
+    direct_answer_suffix: str = "\n\nRespond with the final answer only, without step-by-step reasoning."
+
+
+def _partial_suffix(buf: str, tag: str) -> int:
+    """Length of the longest suffix of buf that is a proper prefix of tag."""
+    for n in range(min(len(tag) - 1, len(buf)), 0, -1):
+        if buf.endswith(tag[:n]):
+            return n
+    return 0
+
+
+class ReasoningSplitter:
+    """
+    Incremental splitter for streamed output of the form
+    "<think> ... </think> answer". Tags may be split across deltas.
+
+    feed(delta) returns the part of delta that belongs to the answer, so callers
+    can forward answer text as it streams. If a closing tag arrives without an
+    opening one (chat templates that pre-insert <think>), everything before it
+    is reclassified as thinking; answer text already returned by feed() for
+    that stretch is then superseded by the final `answer`.
+    """
+
+    def __init__(self):
+        self.thinking = ""
+        self.answer = ""
+        self.thinking_tokens = 0
+        self.in_thinking = False
+        self._buf = ""
+
+    def feed(self, delta: str) -> str:
+        self._buf += delta
+        out = ""
+        thought = False
+        while self._buf:
+            if self.in_thinking:
+                idx = self._buf.find(THINK_CLOSE)
+                if idx >= 0:
+                    self.thinking += self._buf[:idx]
+                    self._buf = self._buf[idx + len(THINK_CLOSE):]
+                    self.in_thinking = False
+                    thought = True
+                    continue
+                safe = len(self._buf) - _partial_suffix(self._buf, THINK_CLOSE)
+                if safe:
+                    self.thinking += self._buf[:safe]
+                    thought = True
+                self._buf = self._buf[safe:]
+                break
+
+            idx_open = self._buf.find(THINK_OPEN)
+            idx_close = self._buf.find(THINK_CLOSE)
+            if idx_open >= 0 and (idx_close < 0 or idx_open < idx_close):
+                out += self._buf[:idx_open]
+                self._buf = self._buf[idx_open + len(THINK_OPEN):]
+                self.in_thinking = True
+                continue
+            if idx_close >= 0:
+                # closing tag without an opening one: all answer so far was thinking
+                self.thinking += self.answer + out + self._buf[:idx_close]
+                self.answer = ""
+                out = ""
+                self._buf = self._buf[idx_close + len(THINK_CLOSE):]
+                thought = True
+                continue
+            hold = max(_partial_suffix(self._buf, THINK_OPEN), _partial_suffix(self._buf, THINK_CLOSE))
+            safe = len(self._buf) - hold
+            out += self._buf[:safe]
+            self._buf = self._buf[safe:]
+            break
+
+        if thought:
+            self.thinking_tokens += 1
+        self.answer += out
+        return out
+
+    def finish(self) -> Tuple[str, str]:
+        """Flush buffered text and return (thinking, answer) with whitespace trimmed."""
+        if self._buf:
+            if self.in_thinking:
+                self.thinking += self._buf
+            else:
+                self.answer += self._buf
+            self._buf = ""
+        return self.thinking.strip(), self.answer.strip()
+
+
+def split_reasoning(text: str) -> Tuple[str, str]:
+    """Split a complete response into (thinking, answer)."""
+    splitter = ReasoningSplitter()
+    splitter.feed(text)
+    return splitter.finish()
+
+
+def json_object_complete(text: str) -> bool:
+    """
+    True once text contains a complete top-level JSON object; usable as an
+    answer_complete predicate to stop generation right after the JSON answer.
+    An answer that opens an array first (a bare list of objects) is never complete here.
+    """
+    start = text.find("{")
+    if start < 0 or "[" in text[:start]:
+        return False
+    depth = 0
+    in_string = False
+    escaped = False
+    for ch in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
@@ -0,0 +1,453 @@
+# layer1/llm_engine/resilience.py
+from __future__ import annotations
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional
+import requests
+from .errors import CircuitOpenError
+from .scheduler import abackoff_sleep, backoff_sleep
+
+try:
+    import aiohttp
+except ImportError:  # async transport is optional
+    aiohttp = None
+
+_TRANSIENT_TYPES = (
+    ConnectionError, TimeoutError, asyncio.TimeoutError,
+    requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+) + ((aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) if aiohttp is not None else ())
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(getattr(error, "response", None), "status_code", None)  # requests.HTTPError
+    if status is None:
+        status = getattr(error, "status", None)  # aiohttp.ClientResponseError
+    return status if isinstance(status, int) else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for failures worth retrying: transport errors, timeouts, HTTP 429 and 5xx.
+    Follows the exception chain, so a connector's wrapping RuntimeError still classifies.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        status = _status_code(error)
+        if status is not None:
+            return status == 429 or status >= 500
+        if isinstance(error, _TRANSIENT_TYPES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+@dataclass
+class ResiliencePolicy:
+    """
+    Configuration for ResilientConnector.
+    - max_attempts: total tries per call (1 disables retries)
+    - base_delay / max_delay: full-jitter exponential backoff bounds (seconds)
+    - retry_budget_ratio: retries allowed as a fraction of recent calls
+    - hedge: send a second request if the first is slower than the observed p95
+    - hedge_min_delay: hedge delay used until enough latency samples exist
+    - breaker_threshold: consecutive failures that open the circuit
+    - breaker_reset: seconds the circuit stays open before a half-open trial
+    """
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    retry_budget_ratio: float = 0.2
+    retry_budget_min: int = 3
+    hedge: bool = False
+    hedge_min_delay: float = 2.0
+    hedge_quantile: float = 0.95
+    breaker_threshold: int = 5
+    breaker_reset: float = 30.0
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of call volume, so a dead
+    backend is not hammered with max_attempts x traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, minimum: int = 3):
+        self.ratio = ratio
+        self.minimum = minimum
+        self._tokens = float(minimum)
+        self._cap = float(minimum) + 100 * ratio
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self._cap, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class CircuitBreaker:
+    """
+    CLOSED -> OPEN after `threshold` consecutive failures; OPEN fails fast for
+    `reset_timeout` seconds, then HALF_OPEN lets one trial call through.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> bool:
+        """Admit a call or raise CircuitOpenError; True if the call is the half-open trial."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("LLM circuit open: backend is failing, not sending request")
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError("LLM circuit half-open: trial request already in flight")
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self.state = self.CLOSED
+
+    def release_trial(self) -> None:
+        """The call was abandoned (cancelled / interrupted): free the half-open trial, record nothing."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class _LatencyWindow:
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientConnector:
+    """
+    Wraps any connector (LMStudioConnector, BalancedLMStudioConnector) with
+    retries, optional hedging and a circuit breaker. Same llm/allm/stream/astream
+    API; other attributes (model, base_url, health_check, ...) pass through.
+
+    Only transient failures (is_transient) are retried and count toward the
+    breaker; a 4xx or any other error is raised at once. Backoff sleeps give up
+    the caller's scheduler slot. Streams are retried only if they fail before
+    the first delta is yielded.
+    """
+
+    def __init__(self, connector: Any, policy: Optional[ResiliencePolicy] = None):
+        self._inner = connector
+        self.policy = policy or ResiliencePolicy()
+        self.breaker = CircuitBreaker(self.policy.breaker_threshold, self.policy.breaker_reset)
+        self.budget = RetryBudget(self.policy.retry_budget_ratio, self.policy.retry_budget_min)
+        self._latency = _LatencyWindow()
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self.retries = 0
+        self.hedges = 0
+        self.rejected = 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    # ----------------- policy helpers -----------------
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.policy.max_delay, self.policy.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _hedge_delay(self) -> float:
+        observed = self._latency.quantile(self.policy.hedge_quantile)
+        return max(self.policy.hedge_min_delay, observed or 0.0)
+
+    def _may_retry(self, attempt: int) -> bool:
+        if attempt + 1 >= self.policy.max_attempts:
+            return False
+        if not self.budget.withdraw():
+            return False
+        self.retries += 1
+        return True
+
+    def _failed(self, error: Exception, trial: bool) -> bool:
+        """Record a failed attempt; True if it is transient (backend trouble, worth a retry)."""
+        if is_transient(error):
+            self.breaker.record_failure()
+            return True
+        # the backend answered; the request itself was bad
+        if trial:
+            self.breaker.release_trial()
+        return False
+
+    def _admit(self) -> bool:
+        try:
+            return self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+
+    # ----------------- sync -----------------
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            trial = self._admit()
+            started = time.monotonic()
+            try:
+                if self.policy.hedge:
+                    result = self._hedged_call(prompt, params)
+                else:
+                    result = self._inner.llm(prompt, **params)
+            except Exception as e:
+                if not self._failed(e, trial) or not self._may_retry(attempt):
+                    raise
+                backoff_sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # cancelled / interrupted: says nothing about the backend
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            self._latency.add(time.monotonic() - started)
+            return result
+
+    def _hedged_call(self, prompt: str, params: Dict[str, Any]) -> str:
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+        def call():
+            return self._inner.llm(prompt, **params)
+
+        primary = self._hedge_pool.submit(call)
+        done, _ = wait([primary], timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+        self.hedges += 1
+        pending = {primary, self._hedge_pool.submit(call)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            trial = self._admit()
+            started = False
+            try:
+                for delta in self._inner.stream(prompt, **params):
+                    started = True
+                    yield delta
+            except GeneratorExit:
+                # consumer stopped early; the backend itself was fine
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                if not self._failed(e, trial) or started or not self._may_retry(attempt):
+                    raise
+                backoff_sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return
+
+    # ----------------- async -----------------
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            trial = self._admit()
+            started = time.monotonic()
+            try:
+                if self.policy.hedge:
+                    result = await self._ahedged_call(prompt, params)
+                else:
+                    result = await self._inner.allm(prompt, **params)
+            except Exception as e:
+                if not self._failed(e, trial) or not self._may_retry(attempt):
+                    raise
+                await abackoff_sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # cancelled (e.g. a batch timeout): says nothing about the backend
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            self._latency.add(time.monotonic() - started)
+            return result
+
+    async def _ahedged_call(self, prompt: str, params: Dict[str, Any]) -> str:
+        def call():
+            return asyncio.ensure_future(self._inner.allm(prompt, **params))
+
+        primary = call()
+        done, _ = await asyncio.wait({primary}, timeout=self._hedge_delay())
+        if done:
+            return primary.result()
+        self.hedges += 1
+        pending = {primary, call()}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            trial = self._admit()
+            started = False
+            try:
+                async for delta in self._inner.astream(prompt, **params):
+                    started = True
+                    yield delta
+            except GeneratorExit:
+                # consumer stopped early; the backend itself was fine
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                if not self._failed(e, trial) or started or not self._may_retry(attempt):
+                    raise
+                await abackoff_sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            self.breaker.record_success()
+            return
+
+    # ----------------- introspection -----------------
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker_state": self.breaker.state,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "rejected": self.rejected,
+            "p95_latency": self._latency.quantile(0.95),
+        }
+
+    def close(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+            self._hedge_pool = None
+        self._inner.close()
+
+    async def aclose(self) -> None:
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+            self._hedge_pool = None
+        await self._inner.aclose()
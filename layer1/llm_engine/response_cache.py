@@ -0,0 +1,144 @@
+# layer1/llm_engine/response_cache.py
+from __future__ import annotations
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+class ResponseCache:
+    """
+    Exact-match LLM response cache used by Layer1LLMEngine.
+    - Tier 1: in-process LRU with max_entries and TTL eviction
+    - Tier 2: optional Redis tier (any object with RedisMemory's get/set API)
+
+    Keys are derived from model, prompt hash, temperature and max_tokens.
+    Redis failures are counted and ignored; the cache never breaks an LLM call.
+    aget / aset keep Redis round trips off the event loop.
+    """
+
+    KEY_PREFIX = "llm:cache:"
+
+    def __init__(self, max_entries: int = 1024, ttl: int = 3600, redis=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+        self.redis_errors = 0
+
+    # ----------------- keys -----------------
+    @staticmethod
+    def make_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = f"{model}|{prompt_hash}|{float(temperature):.4f}|{int(max_tokens)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ----------------- main API -----------------
+    def get(self, key: str) -> Optional[str]:
+        value = self._get_local(key)
+        if value is None and self.redis is not None:
+            value = self._get_redis(key)
+        if value is None:
+            self._miss()
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._put_local(key, value)
+        if self.redis is not None:
+            self._set_redis(key, value)
+
+    # ----------------- async -----------------
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for event-loop callers: the LRU is checked inline, Redis on a worker thread."""
+        value = self._get_local(key)
+        if value is None and self.redis is not None:
+            value = await asyncio.get_running_loop().run_in_executor(None, self._get_redis, key)
+        if value is None:
+            self._miss()
+        return value
+
+    def aset(self, key: str, value: str) -> None:
+        """set() for event-loop callers: the Redis write runs on a worker thread, not awaited."""
+        self._put_local(key, value)
+        if self.redis is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._set_redis, key, value)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self.KEY_PREFIX + key)
+            except Exception:
+                self.redis_errors += 1
+
+    def clear(self) -> None:
+        """Drop the in-process tier (Redis entries expire by TTL)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "redis_hits": self.redis_hits,
+                "redis_errors": self.redis_errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    # ----------------- internals -----------------
+    def _get_local(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+        return None
+
+    def _get_redis(self, key: str) -> Optional[str]:
+        try:
+            value = self.redis.get(self.KEY_PREFIX + key)
+        except Exception:
+            with self._lock:
+                self.redis_errors += 1
+            return None
+        if value is not None:
+            self._put_local(key, value)
+            with self._lock:
+                self.hits += 1
+                self.redis_hits += 1
+        return value
+
+    def _set_redis(self, key: str, value: str) -> None:
+        try:
+            self.redis.set(self.KEY_PREFIX + key, value, self.ttl)
+        except Exception:
+            with self._lock:
+                self.redis_errors += 1
+
+    def _miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def _put_local(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
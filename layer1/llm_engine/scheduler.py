@@ -0,0 +1,323 @@
+# layer1/llm_engine/scheduler.py
+from __future__ import annotations
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Union
+from .adaptive import AIMDLimiter
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+    INTERACTIVE = 0
+    PLANNING = 1
+    BACKGROUND = 2
+
+    @classmethod
+    def parse(cls, value: Union["Priority", int, str, None], default: "Priority") -> "Priority":
+        if value is None:
+            return default
+        if isinstance(value, str):
+            return cls[value.upper()]
+        return cls(value)
+
+
+class _Waiter:
+    __slots__ = ("priority", "user", "enqueued", "event", "future", "loop", "granted")
+
+    def __init__(self, priority: Priority, user: str, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.user = user
+        self.enqueued = time.perf_counter()
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+
+
+class _Hold:
+    """The slot a slot()/aslot() block holds; a retry backing off gives it up meanwhile."""
+    __slots__ = ("scheduler", "priority", "user", "started", "held")
+
+    def __init__(self, scheduler: "LLMScheduler", priority: Priority, user: Optional[str]):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.user = user
+        self.started = time.perf_counter()
+        self.held = True
+
+
+_HOLD: "contextvars.ContextVar[Optional[_Hold]]" = contextvars.ContextVar("llm_scheduler_hold", default=None)
+
+
+def backoff_sleep(seconds: float) -> None:
+    """
+    Sleep between retries. Inside a slot() block the model slot goes to the next
+    waiter for the duration and is queued for again afterwards.
+    """
+    hold = _HOLD.get()
+    if hold is None or not hold.held:
+        time.sleep(seconds)
+        return
+    hold.scheduler._pause(hold)
+    time.sleep(seconds)
+    hold.scheduler._resume(hold)
+
+
+async def abackoff_sleep(seconds: float) -> None:
+    """Async counterpart of backoff_sleep() for aslot() blocks."""
+    hold = _HOLD.get()
+    if hold is None or not hold.held:
+        await asyncio.sleep(seconds)
+        return
+    hold.scheduler._pause(hold)
+    await asyncio.sleep(seconds)
+    await hold.scheduler._aresume(hold)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the model server.
+    - At most max_concurrency LLM calls run at once (match the server's parallel slots)
+    - Waiting calls are served by priority class: interactive > planning > background
+    - Inside a class, users are served round-robin, so one user's batch cannot
+      hold back everyone else's requests
+    - A released slot is handed straight to the next waiter (no thundering herd)
+    - Optional AIMDLimiter: the latency and outcome of every slot feed it, and
+      max_concurrency follows the limit it computes
+    - A retry backing off (backoff_sleep / abackoff_sleep) gives its slot up
+      until it is ready to send again
+    Works for threads (slot()) and asyncio tasks (aslot()) sharing one instance.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        default_priority: Priority = Priority.PLANNING,
+        wait_window: int = 1024,
+        adaptive: Optional[AIMDLimiter] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.max_concurrency = max_concurrency
+        self.default_priority = default_priority
+        self._lock = threading.Lock()
+        self._active = 0
+        # priority -> user -> FIFO of waiters; dict order is the round-robin order
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[_Waiter]]"] = {p: OrderedDict() for p in Priority}
+        self._waits: Dict[Priority, Deque[float]] = {p: deque(maxlen=wait_window) for p in Priority}
+        self._served: Dict[Priority, int] = {p: 0 for p in Priority}
+        self.peak_queue_depth = 0
+        self.adaptive = adaptive
+        if adaptive is not None:
+            self.max_concurrency = min(max(max_concurrency, adaptive.min_limit), adaptive.max_limit)
+
+    # ----------------- sync -----------------
+    @contextlib.contextmanager
+    def slot(self, priority: Union[Priority, int, str, None] = None, user: Optional[str] = None) -> Iterator[None]:
+        """Hold one model slot for the duration of the with-block (blocks the thread while queued)."""
+        priority = Priority.parse(priority, self.default_priority)
+        waiter = self._enqueue(priority, user, None)
+        if waiter is not None:
+            waiter.event.wait()
+        with self._holding(priority, user) as hold:
+            ok = None
+            try:
+                yield
+                ok = True
+            except Exception:
+                ok = False
+                raise
+            finally:
+                # cancellations / early stream closes are not fed to the limiter
+                if hold.held:
+                    if ok is not None:
+                        self._observe(time.perf_counter() - hold.started, ok)
+                    self.release()
+
+    # ----------------- async -----------------
+    @contextlib.asynccontextmanager
+    async def aslot(
+        self, priority: Union[Priority, int, str, None] = None, user: Optional[str] = None
+    ) -> AsyncIterator[None]:
+        """Async counterpart of slot(); cancellation while queued gives up the place in line."""
+        priority = Priority.parse(priority, self.default_priority)
+        waiter = self._enqueue(priority, user, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        with self._holding(priority, user) as hold:
+            ok = None
+            try:
+                yield
+                ok = True
+            except Exception:
+                ok = False
+                raise
+            finally:
+                if hold.held:
+                    if ok is not None:
+                        self._observe(time.perf_counter() - hold.started, ok)
+                    self.release()
+
+    # ----------------- internals -----------------
+    @contextlib.contextmanager
+    def _holding(self, priority: Priority, user: Optional[str]) -> Iterator[_Hold]:
+        hold = _Hold(self, priority, user)
+        outer = _HOLD.get()
+        _HOLD.set(hold)
+        try:
+            yield hold
+        finally:
+            # set, not reset: a stream's generator may be closed from another context
+            _HOLD.set(outer)
+
+    def _pause(self, hold: _Hold) -> None:
+        hold.held = False
+        self.release()
+
+    def _resume(self, hold: _Hold) -> None:
+        waiter = self._enqueue(hold.priority, hold.user, None)
+        if waiter is not None:
+            try:
+                waiter.event.wait()
+            except BaseException:
+                self._abandon(waiter)
+                raise
+        hold.held = True
+        hold.started = time.perf_counter()
+
+    async def _aresume(self, hold: _Hold) -> None:
+        waiter = self._enqueue(hold.priority, hold.user, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+        hold.held = True
+        hold.started = time.perf_counter()
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """A queued caller gave up: leave the queue, or pass on a slot handed over meanwhile."""
+        with self._lock:
+            granted = waiter.granted
+            if not granted:
+                self._remove(waiter)
+        if granted:
+            self.release()
+
+    def _observe(self, latency: float, ok: bool) -> None:
+        if self.adaptive is None:
+            return
+        with self._lock:
+            limit = self.max_concurrency
+            saturated = self._active >= limit or self._queued() > 0
+        new_limit = self.adaptive.observe(limit, latency, ok, saturated)
+        if new_limit != limit:
+            self.set_max_concurrency(new_limit)
+
+    def _enqueue(self, priority: Priority, user: Optional[str], loop) -> Optional[_Waiter]:
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queued():
+                self._active += 1
+                self._served[priority] += 1
+                self._waits[priority].append(0.0)
+                return None
+            waiter = _Waiter(priority, user or "", loop)
+            self._queues[priority].setdefault(waiter.user, deque()).append(waiter)
+            self.peak_queue_depth = max(self.peak_queue_depth, self._queued())
+            return waiter
+
+    def _queued(self) -> int:
+        return sum(len(q) for users in self._queues.values() for q in users.values())
+
+    def _remove(self, waiter: _Waiter) -> None:
+        users = self._queues[waiter.priority]
+        queue = users.get(waiter.user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del users[waiter.user]
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in Priority:
+            users = self._queues[priority]
+            if not users:
+                continue
+            user, queue = next(iter(users.items()))
+            waiter = queue.popleft()
+            del users[user]
+            if queue:
+                users[user] = queue  # back of the round-robin
+            return waiter
+        return None
+
+    def release(self) -> None:
+        """Free a slot, handing it to the next queued waiter if any."""
+        with self._lock:
+            waiter = self._next_waiter() if self._active <= self.max_concurrency else None
+            if waiter is None:
+                self._active -= 1
+                return
+            waiter.granted = True
+            self._served[waiter.priority] += 1
+            self._waits[waiter.priority].append(time.perf_counter() - waiter.enqueued)
+        if waiter.loop is None:
+            waiter.event.set()
+        else:
+            waiter.loop.call_soon_threadsafe(self._wake, waiter)
+
+    @staticmethod
+    def _wake(waiter: _Waiter) -> None:
+        # a waiter cancelled after the hand-over releases the slot itself in aslot()
+        if not waiter.future.done():
+            waiter.future.set_result(None)
+
+    def set_max_concurrency(self, max_concurrency: int) -> None:
+        """
+        Resize the slot pool. Growing admits queued waiters immediately;
+        shrinking takes effect as running calls finish.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        with self._lock:
+            grow = max_concurrency - self.max_concurrency
+            self.max_concurrency = max_concurrency
+            self._active += max(0, grow)
+        for _ in range(max(0, grow)):
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Active slots, queue depth and wait-time percentiles per priority class"""
+        with self._lock:
+            per_class = {}
+            for priority in Priority:
+                waits = sorted(self._waits[priority])
+                per_class[priority.name.lower()] = {
+                    "queued": sum(len(q) for q in self._queues[priority].values()),
+                    "served": self._served[priority],
+                    "wait_p50": _percentile(waits, 0.50),
+                    "wait_p99": _percentile(waits, 0.99),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self._active,
+                "queued": self._queued(),
+                "peak_queue_depth": self.peak_queue_depth,
+                "classes": per_class,
+                "adaptive": self.adaptive.stats() if self.adaptive is not None else {},
+            }
@@ -0,0 +1,114 @@
+# layer1/llm_engine/singleflight.py
+from __future__ import annotations
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class _AsyncCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    In-flight request table: concurrent callers with the same key share one
+    upstream call and all receive its result (or its exception).
+    - do(key, fn) for threads (sync planner / worker paths)
+    - ado(key, coro_fn) for asyncio callers on the same event loop
+    The table only holds a key while its call is running; nothing is cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[Any, str], _AsyncCall] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    # ----------------- sync -----------------
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    # ----------------- async -----------------
+    async def ado(self, key: str, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        The shared call runs as its own task, so cancelling any caller (the first one
+        included) never cancels it for the others; it is cancelled only when every
+        caller waiting on it has gone.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        call = self._async_calls.get(slot)
+        if call is None:
+            call = _AsyncCall(loop.create_task(coro_fn()))
+            self._async_calls[slot] = call
+            call.task.add_done_callback(functools.partial(self._async_done, slot, call))
+            with self._lock:
+                self.leaders += 1
+        else:
+            with self._lock:
+                self.shared += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # every caller was cancelled: nobody wants the result any more
+                if self._async_calls.get(slot) is call:
+                    del self._async_calls[slot]
+                call.task.cancel()
+
+    def _async_done(self, slot: Tuple[Any, str], call: "_AsyncCall", task: "asyncio.Task") -> None:
+        if self._async_calls.get(slot) is call:
+            del self._async_calls[slot]
+        if not task.cancelled():
+            # mark retrieved so a failure nobody awaited does not log "exception never retrieved"
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "in_flight": len(self._calls) + len(self._async_calls),
+            }
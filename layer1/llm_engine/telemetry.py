@@ -0,0 +1,159 @@
+# layer1/llm_engine/telemetry.py
+from __future__ import annotations
+import logging
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger("layer1.llm")
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMTelemetry:
+    """
+    Fixed-size ring buffer of LLM call records, stored column-wise in typed
+    arrays so recording stays allocation-free on the hot path.
+    Columns: timestamp, latency, prompt/completion chars, completion tokens,
+    tokens/sec, error class, calling node, cache hit.
+    Error classes and node names are interned into a small label table.
+
+    Calls slower than slow_threshold seconds are also kept in slow_log and
+    logged at WARNING level on the "layer1.llm" logger.
+    """
+
+    __slots__ = (
+        "capacity", "slow_threshold", "slow_log", "total_calls",
+        "_ts", "_latency", "_prompt", "_completion", "_tokens", "_tps",
+        "_error", "_node", "_cached", "_labels", "_label_ids", "_next", "_size", "_lock",
+    )
+
+    def __init__(self, capacity: int = 2048, slow_threshold: float = 30.0, slow_log_size: int = 50):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        self.capacity = capacity
+        self.slow_threshold = slow_threshold
+        self.slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self.total_calls = 0
+        self._ts = array("d", bytes(8 * capacity))
+        self._latency = array("d", bytes(8 * capacity))
+        self._tps = array("d", bytes(8 * capacity))
+        self._prompt = array("l", [0]) * capacity
+        self._completion = array("l", [0]) * capacity
+        self._tokens = array("l", [0]) * capacity
+        self._error = array("H", [0]) * capacity
+        self._node = array("H", [0]) * capacity
+        self._cached = array("b", [0]) * capacity
+        self._labels: List[str] = [""]
+        self._label_ids: Dict[str, int] = {"": 0}
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _label(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        idx = self._label_ids.get(text)
+        if idx is None:
+            if len(self._labels) >= 65535:
+                return 0
+            idx = len(self._labels)
+            self._labels.append(text)
+            self._label_ids[text] = idx
+        return idx
+
+    # ----------------- recording -----------------
+    def record(
+        self,
+        latency: float,
+        prompt_chars: int,
+        completion_chars: int,
+        completion_tokens: int = 0,
+        tokens_per_sec: float = 0.0,
+        error: Optional[str] = None,
+        node: Optional[str] = None,
+        cached: bool = False,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            i = self._next
+            self._ts[i] = now
+            self._latency[i] = latency
+            self._prompt[i] = prompt_chars
+            self._completion[i] = completion_chars
+            self._tokens[i] = completion_tokens
+            self._tps[i] = tokens_per_sec
+            self._error[i] = self._label(error)
+            self._node[i] = self._label(node)
+            self._cached[i] = 1 if cached else 0
+            self._next = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total_calls += 1
+        if latency >= self.slow_threshold:
+            entry = {
+                "timestamp": now,
+                "latency": round(latency, 3),
+                "node": node or "",
+                "prompt_chars": prompt_chars,
+                "completion_tokens": completion_tokens,
+                "error": error or "",
+            }
+            self.slow_log.append(entry)
+            logger.warning("slow LLM call: %.2fs node=%s prompt_chars=%d error=%s",
+                           latency, node or "-", prompt_chars, error or "-")
+
+    # ----------------- reporting -----------------
+    def summary(self) -> Dict[str, Any]:
+        """Percentiles and aggregates over the calls currently in the buffer."""
+        with self._lock:
+            n = self._size
+            latency = list(self._latency[:n])
+            tps = list(self._tps[:n])
+            prompt = list(self._prompt[:n])
+            tokens = list(self._tokens[:n])
+            errors = list(self._error[:n])
+            nodes = list(self._node[:n])
+            cached = list(self._cached[:n])
+            labels = list(self._labels)
+            total = self.total_calls
+
+        ordered = sorted(latency)
+        by_error: Dict[str, int] = {}
+        by_node: Dict[str, List[float]] = {}
+        for lat, err, node in zip(latency, errors, nodes):
+            if err:
+                by_error[labels[err]] = by_error.get(labels[err], 0) + 1
+            by_node.setdefault(labels[node] or "-", []).append(lat)
+        live_tps = [t for t, c in zip(tps, cached) if t > 0 and not c]
+
+        return {
+            "total_calls": total,
+            "window": n,
+            "latency_p50": _percentile(ordered, 0.50),
+            "latency_p90": _percentile(ordered, 0.90),
+            "latency_p99": _percentile(ordered, 0.99),
+            "latency_max": ordered[-1] if ordered else 0.0,
+            "tokens_per_sec_avg": (sum(live_tps) / len(live_tps)) if live_tps else 0.0,
+            "prompt_chars_avg": (sum(prompt) / n) if n else 0.0,
+            "completion_tokens_total": sum(tokens),
+            "cache_hits": sum(cached),
+            "errors": by_error,
+            "nodes": {
+                name: {"calls": len(lats), "latency_p50": _percentile(sorted(lats), 0.5), "latency_total": sum(lats)}
+                for name, lats in by_node.items()
+            },
+            "slow_calls": len(self.slow_log),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next = 0
+            self._size = 0
+            self.total_calls = 0
+        self.slow_log.clear()
@@ -0,0 +1,377 @@
+# layer1/llm_engine/transcript.py
+from __future__ import annotations
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from .errors import TranscriptMissError
+from .response_cache import ResponseCache
+
+REPLAY_CHUNK_CHARS = 16
+
+# Layer1Main imports this module as llm_engine.transcript (sys.path hack) and Layer2 as
+# layer1.llm_engine.transcript: two module objects, two TranscriptStore classes. The
+# shared-store registry therefore lives on sys, which both copies see.
+_REGISTRY_ATTR = "_llm_engine_transcript_stores"
+
+
+def _store_registry() -> tuple:
+    """(lock, {realpath: store}) shared by every copy of this module in the process."""
+    return sys.__dict__.setdefault(_REGISTRY_ATTR, (threading.Lock(), {}))
+
+
+def transcript_key(
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+    model: Optional[str] = None,
+    stop: Optional[List[str]] = None,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hash of one connector request; the prompt itself is not stored."""
+    if stop:
+        prompt = prompt + "\x00stop:" + "\x00".join(stop)
+    if response_format:
+        prompt = prompt + "\x00format:" + json.dumps(response_format, sort_keys=True)
+    return ResponseCache.make_key(model or "", prompt, temperature, max_tokens)
+
+
+class TranscriptStore:
+    """
+    Append-only JSON-lines file of LLM exchanges, one compact record per call:
+    {"key", "response", "latency", "ttft", "chunks" (streamed calls only), "ts"}.
+    Use TranscriptStore.shared(path) so several connectors in one process
+    append through a single handle.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = None
+        self.records = 0
+
+    @classmethod
+    def shared(cls, path: str) -> "TranscriptStore":
+        path = os.path.realpath(path)
+        lock, stores = _store_registry()
+        with lock:
+            store = stores.get(path)
+            if store is None:
+                store = stores[path] = cls(path)
+            return store
+
+    def append(
+        self,
+        key: str,
+        response: str,
+        latency: float,
+        ttft: float = 0.0,
+        chunks: Optional[List[str]] = None,
+    ) -> None:
+        record: Dict[str, Any] = {"key": key, "response": response, "latency": round(latency, 4)}
+        if ttft:
+            record["ttft"] = round(ttft, 4)
+        if chunks is not None:
+            record["chunks"] = chunks
+        record["ts"] = int(time.time())
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._fh is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write(line)
+            self._fh.flush()
+            self.records += 1
+
+    def load(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Records grouped by key, in file order. Truncated trailing lines are skipped."""
+        entries: Dict[str, List[Dict[str, Any]]] = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries.setdefault(record["key"], []).append(record)
+        return entries
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class RecordingConnector:
+    """
+    Wraps a connector and appends every successful exchange to a TranscriptStore.
+    Streams are recorded with their deltas and time-to-first-token; a stream
+    closed early by the consumer is recorded as far as it got.
+    Other attributes (model, health_check, stats, ...) pass through to the inner connector.
+    """
+
+    def __init__(self, connector: Any, store: TranscriptStore):
+        self._inner = connector
+        self.store = store
+
+    def __getattr__(self, name: str) -> Any:
+        # before __init__ (copy, pickle) _inner is missing too; don't recurse
+        if name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+    @property
+    def inner(self) -> Any:
+        return self._inner
+
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        started = time.perf_counter()
+        response = self._inner.llm(prompt, **params)
+        key = transcript_key(prompt, **params)
+        self.store.append(key, response, time.perf_counter() - started)
+        return response
+
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        started = time.perf_counter()
+        response = await self._inner.allm(prompt, **params)
+        key = transcript_key(prompt, **params)
+        self.store.append(key, response, time.perf_counter() - started)
+        return response
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        key = transcript_key(prompt, **params)
+        chunks: List[str] = []
+        started = time.perf_counter()
+        ttft = 0.0
+        try:
+            for delta in self._inner.stream(prompt, **params):
+                if not chunks:
+                    ttft = time.perf_counter() - started
+                chunks.append(delta)
+                yield delta
+        except GeneratorExit:
+            self.store.append(key, "".join(chunks), time.perf_counter() - started, ttft, chunks)
+            raise
+        self.store.append(key, "".join(chunks), time.perf_counter() - started, ttft, chunks)
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        key = transcript_key(prompt, **params)
+        chunks: List[str] = []
+        started = time.perf_counter()
+        ttft = 0.0
+        try:
+            async for delta in self._inner.astream(prompt, **params):
+                if not chunks:
+                    ttft = time.perf_counter() - started
+                chunks.append(delta)
+                yield delta
+        except GeneratorExit:
+            self.store.append(key, "".join(chunks), time.perf_counter() - started, ttft, chunks)
+            raise
+        self.store.append(key, "".join(chunks), time.perf_counter() - started, ttft, chunks)
+
+
+class ReplayConnector:
+    """
+    Serves responses from a recorded transcript instead of a model server,
+    with the same llm/allm/stream/astream API as LMStudioConnector.
+    - Repeated requests get the recorded responses in order (the last one repeats)
+    - simulate_latency=True sleeps for the recorded latency (x latency_scale);
+      streams wait the recorded TTFT, then spread the rest over the deltas
+    - Unknown requests raise TranscriptMissError, or return fallback when it is set
+    """
+
+    def __init__(
+        self,
+        path: str,
+        simulate_latency: bool = False,
+        latency_scale: float = 1.0,
+        fallback: Optional[str] = None,
+        model: str = "deepseek-r1-0528-qwen3-8b",
+    ):
+        self.path = path
+        self.base_url = f"replay://{path}"
+        self.model = model
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+        self.fallback = fallback
+        self._entries = TranscriptStore(path).load()
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _next(self, prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        key = transcript_key(prompt, **params)
+        with self._lock:
+            records = self._entries.get(key)
+            if not records:
+                self.misses += 1
+                if self.fallback is None:
+                    raise TranscriptMissError(f"No recorded response for request {key[:12]} in {self.path}")
+                return {"response": self.fallback, "latency": 0.0}
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            self.hits += 1
+            return records[min(index, len(records) - 1)]
+
+    def _delay(self, seconds: float) -> float:
+        return max(0.0, seconds * self.latency_scale) if self.simulate_latency else 0.0
+
+    def _stream_plan(self, record: Dict[str, Any]):
+        text = record["response"]
+        chunks = record.get("chunks")
+        if chunks is None:
+            chunks = [text[i:i + REPLAY_CHUNK_CHARS] for i in range(0, len(text), REPLAY_CHUNK_CHARS)]
+        first = self._delay(record.get("ttft", 0.0))
+        rest = self._delay(record.get("latency", 0.0)) - first
+        per_chunk = max(0.0, rest) / max(1, len(chunks) - 1)
+        return chunks, first, per_chunk
+
+    # ----------------- connector API -----------------
+    def llm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        record = self._next(prompt, params)
+        delay = self._delay(record.get("latency", 0.0))
+        if delay:
+            time.sleep(delay)
+        return record["response"]
+
+    async def allm(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        record = self._next(prompt, params)
+        delay = self._delay(record.get("latency", 0.0))
+        if delay:
+            await asyncio.sleep(delay)
+        return record["response"]
+
+    def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        chunks, first, per_chunk = self._stream_plan(self._next(prompt, params))
+        for i, chunk in enumerate(chunks):
+            delay = first if i == 0 else per_chunk
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    async def astream(
+        self,
+        prompt: str,
+        max_tokens: int = 512,
+        temperature: float = 0.2,
+        model: Optional[str] = None,
+        stop: Optional[List[str]] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[str]:
+        params = {
+            "max_tokens": max_tokens, "temperature": temperature, "model": model,
+            "stop": stop, "response_format": response_format,
+        }
+        chunks, first, per_chunk = self._stream_plan(self._next(prompt, params))
+        for i, chunk in enumerate(chunks):
+            delay = first if i == 0 else per_chunk
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    def health_check(self, timeout: float = 5.0) -> bool:
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    # ----------------- lifecycle -----------------
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Callable, List, Optional
 import sys
 import os
 from dotenv import load_dotenv
@@ -10,13 +10,24 @@ load_dotenv()
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from planner.planner_main import Layer1Planner
-from planner.core.state import PlannerState
+from planner.core.plan_cache import PlanCache
+from planner.core.state import PlannerState, Step
+from planner.core.batch import BatchReport
 from memory.memory_facade import MemoryFacade
 from memory.redis_memory import RedisMemory
 from state_manager.state_facade import StateManagerFacade
 from state_manager.redis_connector import RedisConnector
 from llm_engine.llm_engine_main import Layer1LLMEngine
 from llm_engine.llm_connector import LMStudioConnector
+from llm_engine.balancer import create_lmstudio_connector
+from llm_engine.resilience import ResilientConnector
+from llm_engine.reasoning import ReasoningConfig, json_object_complete
+from llm_engine.llm_state import LLMCallState
+from llm_engine.response_cache import ResponseCache
+from llm_engine.transcript import ReplayConnector
+from llm_engine.scheduler import LLMScheduler, Priority
+from llm_engine.adaptive import AIMDLimiter
+from llm_engine.embeddings import EmbeddingService
 
 
 class Layer1Main:
@@ -34,29 +45,87 @@ class Layer1Main:
         lmstudio_base_url: Optional[str] = None,
         redis_host: Optional[str] = None,
         redis_port: Optional[int] = None,
-        enable_vector_memory: bool = False
+        enable_vector_memory: bool = False,
+        enable_llm_cache: bool = True,
+        enable_llm_resilience: bool = True,
+        llm_record_path: Optional[str] = None,
+        llm_replay_path: Optional[str] = None,
+        llm_max_concurrency: Optional[int] = None,
+        enable_adaptive_concurrency: Optional[bool] = None,
+        planner_pipeline: Optional[str] = None,
+        enable_plan_cache: Optional[bool] = None
     ):
         # Use environment variables with fallback defaults
         lmstudio_base_url = lmstudio_base_url or os.getenv("LMSTUDIO_BASE_URL", "http://127.0.0.1:1234")
         redis_host = redis_host or os.getenv("REDIS_HOST", "localhost")
         redis_port = redis_port or int(os.getenv("REDIS_PORT", "6379"))
-        # Initialize LLM Engine
-        self.llm_engine = Layer1LLMEngine()
-        connector = LMStudioConnector(base_url=lmstudio_base_url)
+        llm_record_path = llm_record_path or os.getenv("LLM_RECORD_PATH")
+        llm_replay_path = llm_replay_path or os.getenv("LLM_REPLAY_PATH")
+        llm_max_concurrency = llm_max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        planner_pipeline = planner_pipeline or os.getenv("PLANNER_PIPELINE", "fused")
+        if enable_plan_cache is None:
+            enable_plan_cache = os.getenv("PLANNER_CACHE", "1") == "1"
+        if enable_adaptive_concurrency is None:
+            enable_adaptive_concurrency = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "1") == "1"
+        self.lmstudio_base_url = lmstudio_base_url
+        # Initialize LLM Engine (comma-separated URLs -> load-balanced connector)
+        # DeepSeek-R1 emits <think> blocks: budget them and return only the answer
+        self.llm_engine = Layer1LLMEngine(reasoning=ReasoningConfig())
+        if llm_replay_path:
+            # benchmark mode: serve recorded responses instead of calling the model server
+            connector = ReplayConnector(
+                llm_replay_path, simulate_latency=os.getenv("LLM_REPLAY_SIMULATE_LATENCY", "0") == "1"
+            )
+            self.lmstudio_base_url = connector.base_url
+        else:
+            connector = create_lmstudio_connector(lmstudio_base_url)
+        # Shared scheduler: interactive > planning > background, capped at the server's slot count;
+        # AIMD tunes the cap from observed latency/errors, targeting half the request timeout
+        adaptive = None
+        if enable_adaptive_concurrency:
+            adaptive = AIMDLimiter.for_timeout(getattr(connector, "timeout", 120))
+        self.llm_scheduler = LLMScheduler(max_concurrency=llm_max_concurrency, adaptive=adaptive)
+        self.llm_engine.bind_scheduler(self.llm_scheduler)
+        if enable_llm_resilience:
+            # retries with jittered backoff + circuit breaker around the model server
+            connector = ResilientConnector(connector)
         self.llm_engine.bind_lmstudio(connector)
+        if llm_record_path:
+            self.llm_engine.record_to(llm_record_path)
 
         # Initialize Memory
         redis_mem = RedisMemory(host=redis_host, port=redis_port)
-        self.memory = MemoryFacade(redis=redis_mem, enable_vector=enable_vector_memory)
+        # Embeddings: batched /v1/embeddings calls, vectors cached by content hash (LRU + Redis);
+        # each request takes a BACKGROUND slot of the shared scheduler like any other model call
+        self.embeddings = EmbeddingService(
+            connector, model=os.getenv("EMBEDDING_MODEL") or None, redis=redis_mem,
+            scheduler=self.llm_scheduler, priority=Priority.BACKGROUND,
+        )
+        self.memory = MemoryFacade(redis=redis_mem, enable_vector=enable_vector_memory, embedder=self.embeddings)
+
+        # LLM response cache: in-process LRU backed by the shared Redis memory
+        if enable_llm_cache:
+            self.llm_engine.bind_cache(ResponseCache(redis=redis_mem))
 
         # Initialize State Manager
         redis_conn = RedisConnector(host=redis_host, port=redis_port)
         self.state_manager = StateManagerFacade(redis_connector=redis_conn)
 
-        # Initialize Planner with bindings
-        self.planner = Layer1Planner()
+        # Initialize Planner with bindings ("fused": one LLM call per plan, graph fallback)
+        self.planner = Layer1Planner(pipeline=planner_pipeline)
         self.planner.register_llm(self.llm_engine.llm)
+        self.planner.register_allm(self.llm_engine.allm)
+        # JSON answers end at their closing brace; <think> text is kept in state.context["reasoning"]
+        self.planner.register_reasoning(json_object_complete, LLMCallState.new)
         self.planner.register_memory(self.memory)
+        # planner state is checkpointed after every wave; resume_workflow() continues a crashed plan
+        self.planner.bind_checkpoints(self.state_manager)
+        if enable_plan_cache:
+            # repeated goals (same worker type, pipeline and model) skip the LLM entirely
+            self.planner.bind_plan_cache(
+                PlanCache(self.memory, ttl=int(os.getenv("PLANNER_CACHE_TTL", str(24 * 3600)))),
+                model_version=getattr(connector, "model", ""),
+            )
 
     # ---------------------- Workflow API ----------------------
     def create_workflow(self, user_id: str, goal: str, context: Optional[dict] = None) -> PlannerState:
@@ -65,12 +134,47 @@ class Layer1Main:
         self.state_manager.set_workflow_state(state.workflow_id, state.status)
         return state
 
-    def plan_workflow(self, state: PlannerState) -> PlannerState:
-        """Execute planner to generate steps"""
-        state = self.planner.plan_workflow(state)
+    def plan_workflow(self, state: PlannerState, on_step: Optional[Callable[[Step], None]] = None) -> PlannerState:
+        """
+        Execute planner to generate steps; on_step(step) receives each step as soon as it is planned.
+        Steps stream only with PLANNER_PIPELINE=graph; the default "fused" pipeline plans in one
+        structured call and hands every step to on_step when planning ends.
+        """
+        state = self.planner.plan_workflow(state, on_step=on_step)
         self.state_manager.set_workflow_state(state.workflow_id, state.status)
         return state
 
+    def resume_workflow(self, workflow_id: str) -> Optional[PlannerState]:
+        """Continue planning from the last checkpoint without redoing finished nodes"""
+        state = self.planner.resume_workflow(workflow_id)
+        if state is None:
+            return None
+        state = self.planner.step_workflow(state)
+        self.state_manager.set_workflow_state(state.workflow_id, state.status)
+        return state
+
+    async def plan_workflow_async(
+        self, state: PlannerState, on_step: Optional[Callable[[Step], None]] = None
+    ) -> PlannerState:
+        """Execute planner without blocking the event loop (on_step as in plan_workflow)"""
+        state = await self.planner.plan_workflow_async(state, on_step=on_step)
+        self.state_manager.set_workflow_state(state.workflow_id, state.status)
+        return state
+
+    def plan_workflows(
+        self, states: List[PlannerState], max_concurrency: Optional[int] = None, timeout: Optional[float] = None
+    ) -> BatchReport:
+        """
+        Plan a batch of workflows concurrently; report.summary() has throughput and failures.
+        Defaults to two workflows per LLM slot: every LLM call still waits for a scheduler slot,
+        the extra workflows only keep the next prompt ready when a slot frees up.
+        """
+        max_concurrency = max_concurrency or 2 * self.llm_scheduler.max_concurrency
+        report = self.planner.plan_workflows(states, max_concurrency=max_concurrency, timeout=timeout)
+        for state in report.states:
+            self.state_manager.set_workflow_state(state.workflow_id, state.status)
+        return report
+
     # ---------------------- Memory API ----------------------
     def save_temp_memory(self, key: str, value: str, ttl: Optional[int] = None):
         """Save to short-term memory (Redis)"""
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional, Any, Dict, List
+from typing import Optional, Any, Dict, List, Sequence, Tuple
 from .redis_memory import RedisMemory
 from .vector_memory import VectorMemory
 from .postgres_memory import PostgresMemory
@@ -8,16 +8,20 @@ class MemoryFacade:
     """
     Unified Memory API for Planner / LangGraph nodes
     Automatically initializes components if not provided
+    With an embedder (e.g. llm_engine EmbeddingService) text can be stored and
+    queried directly via store_text / store_texts / query_text
     """
 
     def __init__(self, redis: Optional[RedisMemory] = None,
                  vector: Optional[VectorMemory] = None,
                  structured: Optional[PostgresMemory] = None,
-                 enable_vector: bool = False):
+                 enable_vector: bool = False,
+                 embedder: Optional[Any] = None):
         self.redis = redis
         # Only initialize vector memory if explicitly enabled (requires Pinecone credentials)
         self.vector = vector if vector or not enable_vector else VectorMemory()
         self.structured = structured
+        self.embedder = embedder
 
     # Short-Term Memory
     def set_temp(self, key: str, value: Any, ttl: Optional[int] = None):
@@ -30,6 +34,11 @@ class MemoryFacade:
             raise RuntimeError("RedisMemory not initialized")
         return self.redis.get(key)
 
+    def delete_temp(self, key: str):
+        if not self.redis:
+            raise RuntimeError("RedisMemory not initialized")
+        self.redis.delete(key)
+
     # Long-Term Memory
     def store_vector(self, id: str, vector: List[float], metadata: Optional[Dict[str, Any]] = None):
         if not self.vector:
@@ -41,6 +50,32 @@ class MemoryFacade:
             raise RuntimeError("VectorMemory not initialized")
         return self.vector.query(vector, top_k)
 
+    # Text Memory (embedded by the bound embedder)
+    def store_text(self, id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        self.store_texts([(id, text, metadata)])
+
+    def store_texts(self, items: Sequence[Tuple[Any, ...]]) -> int:
+        """Embed and store (id, text) or (id, text, metadata) tuples in batches; returns the count."""
+        if not self.vector:
+            raise RuntimeError("VectorMemory not initialized")
+        if not self.embedder:
+            raise RuntimeError("Embedder not initialized")
+        if not items:
+            return 0
+        vectors = self.embedder.embed([item[1] for item in items])
+        records = []
+        for item, vector in zip(items, vectors):
+            metadata = dict(item[2] or {}) if len(item) > 2 else {}
+            metadata.setdefault("text", item[1])
+            records.append((item[0], vector, metadata))
+        self.vector.upsert_many(records)
+        return len(records)
+
+    def query_text(self, text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        if not self.embedder:
+            raise RuntimeError("Embedder not initialized")
+        return self.query_vector(self.embedder.embed_one(text), top_k)
+
     # Structured Memory
     def insert_structured(self, table: str, data: Dict[str, Any]):
         if not self.structured:
@@ -5,26 +5,31 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from planner.core.state import PlannerState
-from planner.core.graph import PlannerBindings
-from planner.core.errors import MissingBindingError
+from planner.core.graph import PlannerBindings, node_io
+from planner.core.errors import CodecError, MissingBindingError
+from planner.core.codec import dumps_state, loads_state
 
 def memory_write_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Example memory write node for LangGraph
     Writes state.steps / context to MemoryFacade if registered
+    Undeclared (snapshots the whole state), so it runs after all earlier nodes
     """
     if not hasattr(bindings, "memory") or bindings.memory is None:
         raise MissingBindingError("MemoryFacade binding required for memory_write_node")
 
     memory_facade = bindings.memory
-    # example: store current plan in Redis short-term
-    memory_facade.set_temp(f"workflow:{state.workflow_id}", str(state.__dict__))
+    # store the current plan in Redis short-term (compact versioned codec, see planner.core.codec)
+    memory_facade.set_temp(f"workflow:{state.workflow_id}", dumps_state(state))
     return state
 
+@node_io(reads=("workflow_id",), writes=("context.memory_snapshot",))
 def memory_read_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Example memory read node for LangGraph
     Reads from MemoryFacade and updates state.context
+    memory_snapshot is the stored state as a dict (PlannerState.to_dict); values not
+    written by memory_write_node are kept as the raw string
     """
     if not hasattr(bindings, "memory") or bindings.memory is None:
         raise MissingBindingError("MemoryFacade binding required for memory_read_node")
@@ -32,5 +37,10 @@ def memory_read_node(state: PlannerState, bindings: PlannerBindings) -> PlannerS
     memory_facade = bindings.memory
     data = memory_facade.get_temp(f"workflow:{state.workflow_id}")
     if data:
-        state.context["memory_snapshot"] = data
+        try:
+            snapshot = loads_state(data).to_dict()
+            snapshot["context"].pop("memory_snapshot", None)  # don't nest older snapshots
+        except CodecError:
+            snapshot = data
+        state.context["memory_snapshot"] = snapshot
     return state
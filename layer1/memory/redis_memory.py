@@ -1,6 +1,6 @@
 from __future__ import annotations
 import redis
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 class RedisMemory:
     """
@@ -17,6 +17,21 @@ class RedisMemory:
     def get(self, key: str) -> Optional[str]:
         return self.redis_client.get(key)
 
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Values for keys in one MGET round trip (None for missing keys)."""
+        if not keys:
+            return []
+        return self.redis_client.mget(keys)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None):
+        """Set several keys with one TTL in a single pipelined round trip."""
+        if not items:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, ex=ttl or self.ttl)
+        pipe.execute()
+
     def delete(self, key: str):
         self.redis_client.delete(key)
 
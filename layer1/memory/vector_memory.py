@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 import os
 from pinecone import Pinecone, ServerlessSpec
 
@@ -35,6 +35,11 @@ class VectorMemory:
     def upsert(self, id: str, vector: List[float], metadata: Optional[Dict[str, Any]] = None):
         self.index.upsert([(id, vector, metadata or {})])
 
+    def upsert_many(self, items: List[Tuple[str, List[float], Dict[str, Any]]], batch_size: int = 100):
+        """Upsert (id, vector, metadata) tuples, batch_size per request."""
+        for start in range(0, len(items), batch_size):
+            self.index.upsert(items[start:start + batch_size])
+
     def query(self, vector: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         result = self.index.query(vector=vector, top_k=top_k, include_metadata=True)
         return result.get("matches", [])
@@ -0,0 +1,150 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import asyncio
+import copy
+import time
+
+from .state import PlannerState
+
+# workflows planned at once when the caller gives no max_concurrency
+DEFAULT_BATCH_CONCURRENCY = 8
+
+
+@dataclass
+class WorkflowOutcome:
+    """
+    Result of one workflow in a batch.
+    outcome: PLANNED | CACHED | AWAITING_BINDINGS | ERROR | TIMEOUT
+    A timed-out or failed state keeps its completed_nodes, so step_workflow resumes it
+    (unless a timed-out state could not be copied; see _snapshot).
+    """
+    state: PlannerState
+    outcome: str
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.outcome in ("PLANNED", "CACHED")
+
+
+@dataclass
+class BatchReport:
+    """Outcomes in input order plus aggregate throughput / failure numbers (summary())."""
+    outcomes: List[WorkflowOutcome] = field(default_factory=list)
+    elapsed: float = 0.0
+    max_concurrency: int = 0
+
+    @property
+    def states(self) -> List[PlannerState]:
+        return [o.state for o in self.outcomes]
+
+    @property
+    def planned(self) -> List[PlannerState]:
+        """States that came back with a plan (partial results of a batch with failures)."""
+        return [o.state for o in self.outcomes if o.ok]
+
+    @property
+    def failures(self) -> List[WorkflowOutcome]:
+        return [o for o in self.outcomes if not o.ok]
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for o in self.outcomes:
+            counts[o.outcome] = counts.get(o.outcome, 0) + 1
+        latencies = sorted(o.elapsed for o in self.outcomes)
+        return {
+            "total": len(self.outcomes),
+            "ok": len(self.outcomes) - len(self.failures),
+            "failed": len(self.failures),
+            "outcomes": counts,
+            "elapsed": self.elapsed,
+            "throughput": len(self.outcomes) / self.elapsed if self.elapsed > 0 else 0.0,
+            "latency_p50": _percentile(latencies, 0.50),
+            "latency_p95": _percentile(latencies, 0.95),
+            "max_concurrency": self.max_concurrency,
+            "errors": {o.state.workflow_id: o.error for o in self.failures},
+        }
+
+
+# copy attempts before a timed-out state is reported without its mutable fields
+SNAPSHOT_ATTEMPTS = 3
+
+
+def _snapshot(state: PlannerState) -> PlannerState:
+    """
+    Copy of a state a node thread may still be writing to. deepcopy can then fail
+    ("dictionary changed size during iteration"); after a few tries the workflow is
+    reported with its identity only, so one workflow never aborts the batch.
+    """
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        try:
+            return copy.deepcopy(state)
+        except Exception:
+            continue
+    return PlannerState(
+        workflow_id=state.workflow_id,
+        user_id=state.user_id,
+        goal=state.goal,
+        context={},
+        created_at=state.created_at,
+    )
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_batch(
+    plan: Callable[[PlannerState], Awaitable[PlannerState]],
+    states: Sequence[PlannerState],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[WorkflowOutcome], None]] = None,
+) -> BatchReport:
+    """
+    Await plan(state) for every state, at most max_concurrency at a time.
+    - timeout (seconds) applies to each workflow; a timed-out plan is cancelled and
+      a snapshot of its state is reported, marked ERROR with outcome TIMEOUT. A sync node
+      already running on an executor thread cannot be cancelled and keeps writing to the
+      input state object after that, so use outcome.state, not the object passed in
+    - one workflow's failure never stops the others; on_result(outcome) is called as
+      each workflow finishes, for callers that act on partial results
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be >= 1")
+    gate = asyncio.Semaphore(max_concurrency)
+    report = BatchReport(max_concurrency=max_concurrency)
+
+    async def one(state: PlannerState) -> WorkflowOutcome:
+        async with gate:
+            started = time.perf_counter()
+            cache_hit_before = bool(state.context.get("plan_cache", {}).get("hit"))
+            error = None
+            try:
+                state = await asyncio.wait_for(plan(state), timeout)
+                if state.status == "AWAITING_BINDINGS":
+                    outcome = "AWAITING_BINDINGS"
+                elif state.context.get("plan_cache", {}).get("hit") and not cache_hit_before:
+                    outcome = "CACHED"
+                else:
+                    outcome = "PLANNED"
+            except asyncio.TimeoutError:
+                outcome, error = "TIMEOUT", f"planning timed out after {timeout}s"
+                state = _snapshot(state)
+                state.status = "ERROR"
+            except Exception as e:
+                outcome, error = "ERROR", str(e) or type(e).__name__
+                state.status = "ERROR"
+            result = WorkflowOutcome(state, outcome, time.perf_counter() - started, error)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    started = time.perf_counter()
+    report.outcomes = list(await asyncio.gather(*(one(state) for state in states)))
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,114 @@
+from __future__ import annotations
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import math
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# extra words per worker_type (same vocabulary as main.py's keyword routing)
+TYPE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "browser": ("open", "browse", "website", "url", "google", "web", "page", "http", "com"),
+    "file": ("file", "folder", "directory", "list", "read", "write", "create", "delete"),
+    "app": ("launch", "start", "app", "application", "program", "notepad", "calculator"),
+    "dbms": ("database", "query", "sql", "select", "insert", "update", "table"),
+    "email": ("email", "mail", "send", "inbox"),
+    "sms": ("sms", "text", "message"),
+    "api": ("api", "news", "weather", "fetch", "data", "endpoint", "request"),
+    "terminal": ("run", "execute", "command", "shell", "terminal", "script", "install", "disk", "process"),
+}
+
+# field weights: capabilities and worker_type say the most about a worker
+_WEIGHTS = {"capability": 1.0, "type": 1.0, "name": 0.5, "keyword": 0.5}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with a light suffix stem (files -> file, executing -> execut)."""
+    return [_stem(t) for t in _TOKEN_RE.findall((text or "").replace("_", " ").lower())]
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+class CapabilityIndex:
+    """
+    Inverted index from capability words to workers, built from Layer2Main.workers
+    ({worker_id: {"name", "worker_type", "capabilities", ...}}).
+    - match(text) scores every worker sharing tokens with text (field weight x IDF)
+    - route(text) returns a worker only when the match is unambiguous: the best score
+      reaches min_score and beats the runner-up by margin; otherwise None
+    """
+
+    def __init__(
+        self,
+        workers: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        type_keywords: Optional[Mapping[str, Iterable[str]]] = None,
+        min_score: float = 1.0,
+        margin: float = 1.5,
+    ):
+        self.type_keywords = dict(TYPE_KEYWORDS if type_keywords is None else type_keywords)
+        self.min_score = min_score
+        self.margin = margin
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._descriptions: Dict[str, str] = {}
+        self.build(workers or {})
+
+    def build(self, workers: Mapping[str, Mapping[str, Any]]) -> None:
+        """(Re)build the index; call again after workers are created or deleted."""
+        raw: Dict[str, Dict[str, float]] = defaultdict(dict)
+        descriptions: Dict[str, str] = {}
+        for worker_id, config in workers.items():
+            worker_type = config.get("worker_type", "")
+            descriptions[worker_id] = f"{worker_type}: {', '.join(config.get('capabilities') or [])}"
+            fields = [
+                ("capability", " ".join(config.get("capabilities") or [])),
+                ("type", worker_type),
+                ("name", config.get("name", "")),
+                ("keyword", " ".join(self.type_keywords.get(worker_type, ()))),
+            ]
+            for field_name, text in fields:
+                for token in tokenize(text):
+                    weight = _WEIGHTS[field_name]
+                    if raw[token].get(worker_id, 0.0) < weight:
+                        raw[token][worker_id] = weight
+        total = max(1, len(workers))
+        # rarer tokens discriminate better between workers
+        self._postings = {
+            token: {wid: w * math.log(1 + total / len(posting)) for wid, w in posting.items()}
+            for token, posting in raw.items()
+        }
+        self._descriptions = descriptions
+
+    def match(self, text: str) -> List[Tuple[str, float]]:
+        """(worker_id, score) for every matching worker, best first."""
+        scores: Dict[str, float] = defaultdict(float)
+        for token in set(tokenize(text)):
+            for worker_id, weight in self._postings.get(token, {}).items():
+                scores[worker_id] += weight
+        return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+
+    def route(self, text: str) -> Optional[str]:
+        return self.pick(self.match(text))
+
+    def pick(self, candidates: List[Tuple[str, float]]) -> Optional[str]:
+        """The best candidate if unambiguous, else None."""
+        if not candidates or candidates[0][1] < self.min_score:
+            return None
+        if len(candidates) > 1 and candidates[0][1] < candidates[1][1] * self.margin:
+            return None
+        return candidates[0][0]
+
+    def describe(self, worker_id: str) -> str:
+        """'worker_type: capability, ...' for prompts."""
+        return self._descriptions.get(worker_id, "")
+
+    @property
+    def workers(self) -> List[str]:
+        return list(self._descriptions)
+
+    def __len__(self) -> int:
+        return len(self._descriptions)
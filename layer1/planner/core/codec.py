@@ -0,0 +1,185 @@
+from __future__ import annotations
+from typing import Any, List, Optional, Sequence
+import base64
+import json
+import struct
+import zlib
+
+from .errors import CodecError
+from .state import PlannerState, Step
+
+try:
+    import msgpack
+except ImportError:  # optional; compact JSON is used instead
+    msgpack = None
+
+# bump when the field tuples below change incompatibly; appending a field is compatible
+CODEC_VERSION = 1
+
+# header: magic, codec version, flags
+_HEADER = struct.Struct(">2sBB")
+_MAGIC = b"PS"
+_FLAG_ZLIB = 0x01
+_FLAG_MSGPACK = 0x02
+
+# payloads at least this large are zlib-compressed when that makes them smaller
+COMPRESS_THRESHOLD = 1024
+
+_KIND_STATE = 0
+_KIND_STEP = 1
+
+# ----------------- field tuples -----------------
+# Step:        [id, title, description, requires_approval, metadata, routing, safety, results]
+# PlannerState: [workflow_id, user_id, goal, context, steps, plan, current_index, selected_worker,
+#                reflection, status, created_at, updated_at, completed_nodes]
+# plan entries are indices into steps (plan is normally the same Step objects) or inline Step tuples
+
+
+def _step_fields(step: Step) -> List[Any]:
+    return [
+        step.id, step.title, step.description, step.requires_approval,
+        step.metadata, step.routing, step.safety, step.results,
+    ]
+
+
+def _step_from_fields(fields: Sequence[Any]) -> Step:
+    fields = list(fields) + [None] * (8 - len(fields))
+    return Step(
+        id=fields[0],
+        title=fields[1],
+        description=fields[2],
+        requires_approval=True if fields[3] is None else fields[3],
+        metadata=fields[4] or {},
+        routing=fields[5] or {},
+        safety=fields[6] or {},
+        results=fields[7] or [],
+    )
+
+
+def _state_fields(state: PlannerState) -> List[Any]:
+    positions = {id(step): i for i, step in enumerate(state.steps)}
+    plan = [positions[id(step)] if id(step) in positions else _step_fields(step) for step in state.plan]
+    return [
+        state.workflow_id, state.user_id, state.goal, state.context,
+        [_step_fields(step) for step in state.steps], plan,
+        state.current_index, state.selected_worker, state.reflection, state.status,
+        state.created_at, state.updated_at, state.completed_nodes,
+    ]
+
+
+def _state_from_fields(fields: Sequence[Any]) -> PlannerState:
+    fields = list(fields) + [None] * (13 - len(fields))
+    steps = [_step_from_fields(item) for item in fields[4] or []]
+    plan = [steps[item] if isinstance(item, int) else _step_from_fields(item) for item in fields[5] or []]
+    return PlannerState(
+        workflow_id=fields[0],
+        user_id=fields[1],
+        goal=fields[2],
+        context=fields[3] or {},
+        steps=steps,
+        plan=plan,
+        current_index=fields[6],
+        selected_worker=fields[7],
+        reflection=fields[8],
+        status=fields[9] or "INITIAL",
+        created_at=fields[10],
+        updated_at=fields[11],
+        completed_nodes=fields[12] or [],
+    )
+
+
+# ----------------- framing -----------------
+def _pack(kind: int, fields: List[Any], compress: Optional[bool]) -> bytes:
+    try:
+        if msgpack is not None:
+            flags = _FLAG_MSGPACK
+            payload = msgpack.packb([kind, fields], use_bin_type=True)
+        else:
+            flags = 0
+            payload = json.dumps([kind, fields], separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    except (TypeError, ValueError) as e:
+        raise CodecError(f"state is not serializable: {e}") from e
+
+    if compress is None:
+        compress = len(payload) >= COMPRESS_THRESHOLD
+    if compress:
+        packed = zlib.compress(payload, 6)
+        if len(packed) < len(payload):
+            flags |= _FLAG_ZLIB
+            payload = packed
+    return _HEADER.pack(_MAGIC, CODEC_VERSION, flags) + payload
+
+
+def _unpack(blob: bytes, kind: int) -> List[Any]:
+    if len(blob) < _HEADER.size:
+        raise CodecError("blob too short")
+    magic, version, flags = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise CodecError("not a planner codec blob")
+    if version > CODEC_VERSION:
+        raise CodecError(f"codec version {version} is newer than supported ({CODEC_VERSION})")
+    payload = blob[_HEADER.size:]
+    try:
+        if flags & _FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+        if flags & _FLAG_MSGPACK:
+            if msgpack is None:
+                raise CodecError("blob was written with msgpack, which is not installed")
+            decoded = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        else:
+            decoded = json.loads(payload.decode("utf-8"))
+    except CodecError:
+        raise
+    except Exception as e:
+        raise CodecError(f"corrupt blob: {e}") from e
+    if not isinstance(decoded, list) or len(decoded) != 2 or decoded[0] != kind:
+        raise CodecError("unexpected payload kind")
+    return decoded[1]
+
+
+# ----------------- public API -----------------
+def encode_state(state: PlannerState, compress: Optional[bool] = None) -> bytes:
+    """
+    Versioned binary encoding of a PlannerState.
+    - msgpack when installed, else compact JSON (the header records which)
+    - zlib when the payload reaches COMPRESS_THRESHOLD (compress=True/False forces it)
+    - decode_state(encode_state(s)) == s for JSON-compatible context / metadata values
+      (tuples come back as lists, as with json)
+    """
+    return _pack(_KIND_STATE, _state_fields(state), compress)
+
+
+def decode_state(blob: bytes) -> PlannerState:
+    return _state_from_fields(_unpack(blob, _KIND_STATE))
+
+
+def encode_step(step: Step, compress: Optional[bool] = None) -> bytes:
+    return _pack(_KIND_STEP, _step_fields(step), compress)
+
+
+def decode_step(blob: bytes) -> Step:
+    return _step_from_fields(_unpack(blob, _KIND_STEP))
+
+
+def dumps_state(state: PlannerState, compress: Optional[bool] = None) -> str:
+    """encode_state as ASCII text, for stores that hold strings (Redis with decode_responses=True)."""
+    return base64.b64encode(encode_state(state, compress)).decode("ascii")
+
+
+def loads_state(text: str) -> PlannerState:
+    return decode_state(_b64decode(text))
+
+
+def dumps_step(step: Step, compress: Optional[bool] = None) -> str:
+    return base64.b64encode(encode_step(step, compress)).decode("ascii")
+
+
+def loads_step(text: str) -> Step:
+    return decode_step(_b64decode(text))
+
+
+def _b64decode(text: str) -> bytes:
+    try:
+        return base64.b64decode(text, validate=True)
+    except (TypeError, ValueError) as e:
+        raise CodecError(f"not a base64 planner blob: {e}") from e
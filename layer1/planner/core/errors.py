@@ -8,3 +8,11 @@ class NodeExecutionError(PlannerError):
 
 class MissingBindingError(PlannerError):
     """Raised when the planner is asked to run but required external binding(s) are not registered."""
+
+
+class StructuredOutputError(PlannerError):
+    """Raised when an LLM answer cannot be parsed into the expected JSON structure."""
+
+
+class CodecError(PlannerError):
+    """Raised when a PlannerState / Step blob cannot be encoded or decoded."""
@@ -1,7 +1,15 @@
 from __future__ import annotations
-from typing import Callable, Dict, Any, List, Optional
+from typing import Callable, Dict, Any, FrozenSet, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from ..core.state import PlannerState, Step
-from ..core.errors import MissingBindingError, NodeExecutionError
+from ..core.errors import MissingBindingError, NodeExecutionError, StructuredOutputError
+from ..core.profiles import ProfileRegistry
+from ..core.prompt_budget import BudgetReport, PromptBudget, PromptSection
+from ..core.structured import extract_json, json_schema_format, repair_prompt
+import asyncio
+import functools
+import inspect
 import traceback
 
 
@@ -16,29 +24,373 @@ class PlannerBindings:
         memory: Optional[Callable[..., Any]] = None,
         safety: Optional[Callable[..., Any]] = None,
         dispatch: Optional[Callable[..., Any]] = None,
+        profiles: Optional[ProfileRegistry] = None,
+        prompt_budget: Optional[PromptBudget] = None,
+        allm: Optional[Callable[..., Any]] = None,
     ):
         self.llm = llm
+        self.allm = allm
         self.memory = memory
         self.safety = safety
         self.dispatch = dispatch
+        self.profiles = profiles or ProfileRegistry()
+        self.prompt_budget = prompt_budget or PromptBudget()
+        self.structured_stats = {"calls": 0, "repairs": 0, "failures": 0}
+        # reflect_node runs only below this local plan-quality score (or for high-risk goals); None = always
+        self.reflection_threshold: Optional[float] = 0.75
+        self.reflection_stats = {"runs": 0, "skipped": 0}
+        # CapabilityIndex over the available workers; route_node matches steps against it first
+        self.capability_index: Optional[Any] = None
+        # workflow_id -> on_step(Step); decompose_node streams its answer (the llm binding's
+        # on_delta) when one is set
+        self.step_sinks: Dict[str, Callable[[Step], None]] = {}
+        # reasoning-aware engines: answer_complete(answer) -> True stops a JSON answer once it is
+        # closed; call_state_factory(prompt) -> LLMCallState whose metadata (thinking, ...) is
+        # kept in state.context["reasoning"][node]
+        self.answer_complete: Optional[Callable[[str], bool]] = None
+        self.call_state_factory: Optional[Callable[[str], Any]] = None
+
+    def build_prompt(self, node_name: str, sections: List[PromptSection], separator: str = "\n\n") -> str:
+        """Assemble a node prompt within the node's prompt-token budget."""
+        return self.build_prompt_report(node_name, sections, separator).prompt
+
+    def build_prompt_report(
+        self, node_name: str, sections: List[PromptSection], separator: str = "\n\n"
+    ) -> BudgetReport:
+        """build_prompt with the trimmed / dropped section names."""
+        budget = self.profiles.get(node_name).max_prompt_tokens
+        return self.prompt_budget.build(sections, max_tokens=budget, separator=separator)
+
+    def has_llm(self) -> bool:
+        return self.llm is not None or self.allm is not None
+
+    def step_sink(self, workflow_id: str) -> Optional[Callable[[Step], None]]:
+        return self.step_sinks.get(workflow_id)
+
+    def call_llm(
+        self,
+        node_name: str,
+        prompt: str,
+        state: Optional[PlannerState] = None,
+        json_answer: bool = False,
+        **overrides: Any,
+    ) -> Any:
+        """
+        Call the llm binding with the node's profile (model, max_tokens, temperature, stop).
+        The node name is passed as node= for telemetry. Only keyword arguments the
+        bound callable accepts are passed, so a plain llm(prompt) callable keeps working.
+        - state: the workflow being planned; its user_id orders the call in the scheduler and
+          the call's metadata is kept in state.context["reasoning"][node_name]
+        - json_answer: the answer is a single JSON object, so answer_complete may end it early
+        """
+        if self.llm is None:
+            raise MissingBindingError(f"LLM binding not set for {node_name}")
+        kwargs, call_state = self._call_kwargs(node_name, prompt, overrides, state, json_answer)
+        raw = self.llm(prompt, **_accepted_kwargs(self.llm, kwargs))
+        _keep_call_state(state, node_name, call_state)
+        return raw
+
+    async def acall_llm(
+        self,
+        node_name: str,
+        prompt: str,
+        state: Optional[PlannerState] = None,
+        json_answer: bool = False,
+        **overrides: Any,
+    ) -> Any:
+        """
+        Async call_llm: awaits the allm binding, or runs the sync llm binding in the
+        default executor so the event loop is never blocked.
+        """
+        if not self.has_llm():
+            raise MissingBindingError(f"LLM binding not set for {node_name}")
+        kwargs, call_state = self._call_kwargs(node_name, prompt, overrides, state, json_answer)
+        if self.allm is not None:
+            raw = await self.allm(prompt, **_accepted_kwargs(self.allm, kwargs))
+        else:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(self.llm, prompt, **_accepted_kwargs(self.llm, kwargs))
+            raw = await loop.run_in_executor(None, call)
+        _keep_call_state(state, node_name, call_state)
+        return raw
+
+    def call_structured(
+        self,
+        node_name: str,
+        prompt: str,
+        schema_name: str,
+        schema: Dict[str, Any],
+        parse: Callable[[Any], Any],
+        repair: bool = True,
+        state: Optional[PlannerState] = None,
+        **overrides: Any,
+    ) -> Any:
+        """
+        Ask for JSON matching schema (response_format json_schema) and return parse(json).
+        If the answer does not parse, one repair call at temperature 0 gets the error and
+        the previous answer; a second failure raises StructuredOutputError.
+        repair=False raises on the first failure (callers with their own fallback).
+        """
+        response_format = json_schema_format(schema_name, schema)
+        raw = self.call_llm(
+            node_name, prompt, state=state, json_answer=True, response_format=response_format, **overrides
+        )
+        return self.finish_structured(node_name, raw, schema_name, schema, parse, repair, state=state, **overrides)
+
+    def finish_structured(
+        self,
+        node_name: str,
+        raw: str,
+        schema_name: str,
+        schema: Dict[str, Any],
+        parse: Callable[[Any], Any],
+        repair: bool = True,
+        state: Optional[PlannerState] = None,
+        **overrides: Any,
+    ) -> Any:
+        """call_structured for an answer already received (e.g. streamed): parse, repair once, raise."""
+        self.structured_stats["calls"] += 1
+        ok, result = self._parse_structured(raw, parse, final=not repair)
+        if ok:
+            return result
+        self.structured_stats["repairs"] += 1
+        overrides["temperature"] = 0.0
+        fixed = self.call_llm(
+            node_name, repair_prompt(schema, raw, result), state=state, json_answer=True,
+            response_format=json_schema_format(schema_name, schema), **overrides
+        )
+        return self._parse_structured(fixed, parse, final=True)[1]
+
+    async def acall_structured(
+        self,
+        node_name: str,
+        prompt: str,
+        schema_name: str,
+        schema: Dict[str, Any],
+        parse: Callable[[Any], Any],
+        repair: bool = True,
+        state: Optional[PlannerState] = None,
+        **overrides: Any,
+    ) -> Any:
+        """Async call_structured (same repair / failure behaviour)."""
+        response_format = json_schema_format(schema_name, schema)
+        raw = await self.acall_llm(
+            node_name, prompt, state=state, json_answer=True, response_format=response_format, **overrides
+        )
+        return await self.afinish_structured(
+            node_name, raw, schema_name, schema, parse, repair, state=state, **overrides
+        )
+
+    async def afinish_structured(
+        self,
+        node_name: str,
+        raw: str,
+        schema_name: str,
+        schema: Dict[str, Any],
+        parse: Callable[[Any], Any],
+        repair: bool = True,
+        state: Optional[PlannerState] = None,
+        **overrides: Any,
+    ) -> Any:
+        """Async finish_structured."""
+        self.structured_stats["calls"] += 1
+        ok, result = self._parse_structured(raw, parse, final=not repair)
+        if ok:
+            return result
+        self.structured_stats["repairs"] += 1
+        overrides["temperature"] = 0.0
+        fixed = await self.acall_llm(
+            node_name, repair_prompt(schema, raw, result), state=state, json_answer=True,
+            response_format=json_schema_format(schema_name, schema), **overrides
+        )
+        return self._parse_structured(fixed, parse, final=True)[1]
+
+    def _llm_kwargs(self, node_name: str, overrides: Dict[str, Any]) -> Dict[str, Any]:
+        kwargs = self.profiles.get(node_name).as_kwargs()
+        kwargs["node"] = node_name
+        kwargs.update(overrides)
+        return kwargs
+
+    def _call_kwargs(
+        self,
+        node_name: str,
+        prompt: str,
+        overrides: Dict[str, Any],
+        state: Optional[PlannerState],
+        json_answer: bool,
+    ) -> Tuple[Dict[str, Any], Optional[Any]]:
+        kwargs = self._llm_kwargs(node_name, overrides)
+        call_state = None
+        if state is not None:
+            kwargs.setdefault("user_id", state.user_id)
+            if self.call_state_factory is not None:
+                call_state = kwargs["call_state"] = self.call_state_factory(prompt)
+        if json_answer and self.answer_complete is not None:
+            kwargs.setdefault("answer_complete", self.answer_complete)
+        return kwargs, call_state
+
+    def _parse_structured(self, raw: str, parse: Callable[[Any], Any], final: bool) -> Tuple[bool, Any]:
+        """(True, parsed) or (False, error message); a final failure raises StructuredOutputError."""
+        try:
+            return True, parse(extract_json(raw))
+        except StructuredOutputError as e:
+            if final:
+                self.structured_stats["failures"] += 1
+                raise
+            return False, str(e)
+
+
+NodeFn = Callable[[PlannerState, "PlannerBindings"], PlannerState]
+
+
+def node_io(
+    reads: Iterable[str] = (), writes: Iterable[str] = (), after: Iterable[str] = ()
+) -> Callable[[NodeFn], NodeFn]:
+    """
+    Declare which PlannerState fields a node reads and writes (dotted paths such as
+    "context.intent_extraction" or "steps.routing"), plus explicit dependencies by
+    node name. SimpleGraphPlanner orders declared nodes by these, so nodes with
+    disjoint fields can run concurrently.
+    """
+    def decorate(fn: NodeFn) -> NodeFn:
+        fn.node_io = {"reads": tuple(reads), "writes": tuple(writes), "after": tuple(after)}
+        return fn
+    return decorate
+
+
+def async_impl_of(sync_fn: NodeFn) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Mark an `async def` node as the native async implementation of sync_fn;
+    run_full_plan_async awaits it instead of offloading sync_fn to a thread.
+    """
+    def decorate(async_fn: Callable[..., Any]) -> Callable[..., Any]:
+        sync_fn.async_impl = async_fn
+        return async_fn
+    return decorate
+
+
+@dataclass(frozen=True)
+class NodeSpec:
+    """
+    A registered node; declared=False nodes act as barriers (run after and before everything).
+    afn is the async implementation used by run_full_plan_async, if any.
+    """
+    fn: NodeFn
+    name: str
+    afn: Optional[Callable[..., Any]]
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    after: FrozenSet[str]
+    declared: bool
+
+    def depends_on(self, prev: "NodeSpec") -> bool:
+        if not (self.declared and prev.declared) or prev.name in self.after:
+            return True
+        return (
+            _overlaps(prev.writes, self.reads | self.writes)  # read-after-write / write-after-write
+            or _overlaps(self.writes, prev.reads)             # write-after-read
+        )
+
+
+def _overlaps(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """True if any path in a equals, contains or is contained by a path in b ("steps" vs "steps.routing")."""
+    for x in a:
+        for y in b:
+            if x == y or x.startswith(y + ".") or y.startswith(x + "."):
+                return True
+    return False
+
+
+# thinking text kept per node in state.context["reasoning"]
+REASONING_TEXT_CHARS = 2048
+
+
+def _keep_call_state(state: Optional[PlannerState], node_name: str, call_state: Optional[Any]) -> None:
+    if state is None or call_state is None or not call_state.metadata:
+        return
+    metadata = dict(call_state.metadata)
+    if isinstance(metadata.get("thinking"), str):
+        metadata["thinking"] = metadata["thinking"][:REASONING_TEXT_CHARS]
+    state.context.setdefault("reasoning", {})[node_name] = metadata
+
+
+def _accepted_kwargs(fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        params = inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return kwargs
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values()):
+        return kwargs
+    return {k: v for k, v in kwargs.items() if k in params}
 
 
 class SimpleGraphPlanner:
     """
     A simple, deterministic graph-based planner engine.
-    Nodes are executed in sequence defined by self._nodes list.
+    Nodes form a DAG: a node runs after every earlier-registered node it depends on
+    (see node_io / NodeSpec.depends_on); undeclared nodes keep strict registration order.
+    Nodes whose dependencies are met together run as one wave on a thread pool; they
+    share the PlannerState and must update it in place. A wave of one node runs inline.
+    run_full_plan_async awaits async nodes on the event loop and offloads sync nodes
+    to the same thread pool.
     """
 
-    def __init__(self):
-        self._nodes: List[Callable[[PlannerState, PlannerBindings], PlannerState]] = []
+    def __init__(self, max_workers: int = 4):
+        self._nodes: List[NodeSpec] = []
+        self._waves: Optional[List[List[NodeSpec]]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.max_workers = max_workers
         self.bindings = PlannerBindings()
 
-    def register_node(self, node_fn: Callable[[PlannerState, PlannerBindings], PlannerState]) -> None:
-        self._nodes.append(node_fn)
+    def register_node(
+        self,
+        node_fn: NodeFn,
+        name: Optional[str] = None,
+        reads: Optional[Iterable[str]] = None,
+        writes: Optional[Iterable[str]] = None,
+        after: Optional[Iterable[str]] = None,
+    ) -> None:
+        """
+        Append a node. reads/writes/after override the node's @node_io declaration;
+        a node with neither runs strictly after all earlier nodes and before all later ones.
+        """
+        io = getattr(node_fn, "node_io", None) or {}
+        declared = bool(io) or reads is not None or writes is not None or after is not None
+        spec = NodeSpec(
+            fn=node_fn,
+            name=name or node_fn.__name__,
+            afn=node_fn if inspect.iscoroutinefunction(node_fn) else getattr(node_fn, "async_impl", None),
+            reads=frozenset(io.get("reads", ()) if reads is None else reads),
+            writes=frozenset(io.get("writes", ()) if writes is None else writes),
+            after=frozenset(io.get("after", ()) if after is None else after),
+            declared=declared,
+        )
+        known = {n.name for n in self._nodes}
+        if spec.name in known:
+            raise ValueError(f"Node {spec.name!r} is already registered")
+        unknown = spec.after - known
+        if unknown:
+            raise ValueError(f"Node {spec.name!r} depends on unregistered node(s): {sorted(unknown)}")
+        self._nodes.append(spec)
+        self._waves = None
+
+    def set_nodes(self, nodes: Iterable[NodeFn]) -> None:
+        """Replace the node sequence (e.g. to switch planning pipelines)."""
+        self._nodes = []
+        self._waves = None
+        for fn in nodes:
+            self.register_node(fn)
+
+    def waves(self) -> List[List[str]]:
+        """Node names grouped by execution wave (for inspection / debugging)."""
+        return [[spec.name for spec in wave] for wave in self._schedule()]
 
     def bind_llm(self, llm_fn: Callable[..., Any]) -> None:
         self.bindings.llm = llm_fn
 
+    def bind_allm(self, allm_fn: Callable[..., Any]) -> None:
+        self.bindings.allm = allm_fn
+
     def bind_memory(self, mem_fn: Callable[..., Any]) -> None:
         self.bindings.memory = mem_fn
 
@@ -48,35 +400,172 @@ class SimpleGraphPlanner:
     def bind_dispatch(self, dispatch_fn: Callable[..., Any]) -> None:
         self.bindings.dispatch = dispatch_fn
 
-    def run_full_plan(self, state: PlannerState) -> PlannerState:
+    def run_full_plan(
+        self,
+        state: PlannerState,
+        resume: bool = False,
+        max_waves: Optional[int] = None,
+        on_wave: Optional[Callable[[PlannerState], None]] = None,
+    ) -> PlannerState:
         """
-        Execute planner nodes in order. If a required binding is missing, the planner
-        sets state.status = 'AWAITING_BINDINGS' and returns safely (inert).
-        Nodes should themselves check bindings if they need them.
+        Execute planner nodes wave by wave. If a required binding is missing, the planner
+        sets state.status = 'AWAITING_BINDINGS' and returns safely (inert) once the current
+        wave has finished; no later wave runs. Any other node failure sets status 'ERROR'
+        and raises NodeExecutionError. Within a wave the first failing node in registration
+        order decides which of the two happens.
+        Every node that succeeds is appended to state.completed_nodes and on_wave(state) is
+        called after each wave (also a failed one), e.g. to checkpoint. resume=True skips
+        nodes already in state.completed_nodes; max_waves stops early, leaving status 'PLANNING'.
         """
-        try:
+        state.touch()
+        if not resume:
+            state.completed_nodes = []
+        state.status = "PLANNING"
+        if not self._nodes:
+            state.status = "PLANNED"
             state.touch()
-            if not self._nodes:
-                state.status = "PLANNED"
-                state.touch()
+            return state
+
+        waves, truncated = self._pending_waves(state, max_waves)
+        for wave in waves:
+            if len(wave) == 1:
+                outcomes = [self._run_node(wave[0], state)]
+            else:
+                executor = self._get_executor()
+                futures = [executor.submit(self._run_node, spec, state) for spec in wave]
+                outcomes = [f.result() for f in futures]
+            state, stop = self._finish_wave(state, wave, outcomes, on_wave)
+            if stop:
                 return state
+        return self._finish_plan(state, truncated)
 
-            for node in self._nodes:
-                try:
-                    state = node(state, self.bindings)
-                    state.touch()
-                except MissingBindingError:
-                    state.status = "AWAITING_BINDINGS"
-                    state.touch()
-                    return state
-                except Exception as e:
-                    state.status = "ERROR"
-                    state.touch()
-                    raise NodeExecutionError(f"Node {node.__name__} failed: {e}") from e
-
-            if state.status not in ("IN_PROGRESS", "DONE", "ERROR"):
-                state.status = "PLANNED"
+    async def run_full_plan_async(
+        self,
+        state: PlannerState,
+        resume: bool = False,
+        max_waves: Optional[int] = None,
+        on_wave: Optional[Callable[[PlannerState], Any]] = None,
+    ) -> PlannerState:
+        """
+        Async run_full_plan: same waves and status semantics, never blocks the event loop.
+        on_wave may be a coroutine function (e.g. a checkpoint write offloaded to a thread); it is awaited.
+        """
+        state.touch()
+        if not resume:
+            state.completed_nodes = []
+        state.status = "PLANNING"
+        if not self._nodes:
+            state.status = "PLANNED"
             state.touch()
             return state
-        except Exception:
-            raise
+
+        waves, truncated = self._pending_waves(state, max_waves)
+        for wave in waves:
+            outcomes = await asyncio.gather(*[self._arun_node(spec, state) for spec in wave])
+            state, failure = self._apply_wave(state, wave, list(outcomes))
+            if on_wave is not None:
+                result = on_wave(state)
+                if inspect.isawaitable(result):
+                    await result
+            if self._end_wave(failure):
+                return state
+        return self._finish_plan(state, truncated)
+
+    def _pending_waves(self, state: PlannerState, max_waves: Optional[int]) -> Tuple[List[List[NodeSpec]], bool]:
+        """(waves minus completed nodes, whether max_waves cut them short)."""
+        done = set(state.completed_nodes)
+        pending = [w for w in ([s for s in wave if s.name not in done] for wave in self._schedule()) if w]
+        if max_waves is not None and len(pending) > max_waves:
+            return pending[:max_waves], True
+        return pending, False
+
+    def _finish_wave(
+        self,
+        state: PlannerState,
+        wave: List[NodeSpec],
+        outcomes: List[Tuple[Optional[PlannerState], Optional[BaseException]]],
+        on_wave: Optional[Callable[[PlannerState], None]] = None,
+    ) -> Tuple[PlannerState, bool]:
+        """Apply a wave's outcomes; returns (state, stop) or raises NodeExecutionError."""
+        state, failure = self._apply_wave(state, wave, outcomes)
+        if on_wave is not None:
+            on_wave(state)
+        return state, self._end_wave(failure)
+
+    @staticmethod
+    def _apply_wave(
+        state: PlannerState,
+        wave: List[NodeSpec],
+        outcomes: List[Tuple[Optional[PlannerState], Optional[BaseException]]],
+    ) -> Tuple[PlannerState, Optional[Tuple[NodeSpec, BaseException]]]:
+        """Record completed nodes and the wave's status; returns (state, first failure or None)."""
+        failures = []
+        for spec, (result, exc) in zip(wave, outcomes):
+            if exc is not None:
+                failures.append((spec, exc))
+                continue
+            if len(wave) == 1 and result is not None:
+                state = result
+            state.completed_nodes.append(spec.name)
+        state.touch()
+        if not failures:
+            return state, None
+        # as in sequential execution, the first failing node (registration order) decides
+        spec, exc = failures[0]
+        state.status = "AWAITING_BINDINGS" if isinstance(exc, MissingBindingError) else "ERROR"
+        return state, failures[0]
+
+    @staticmethod
+    def _end_wave(failure: Optional[Tuple[NodeSpec, BaseException]]) -> bool:
+        """stop after this wave? Raises NodeExecutionError for a failure other than a missing binding."""
+        if failure is None:
+            return False
+        spec, exc = failure
+        if isinstance(exc, MissingBindingError):
+            return True
+        raise NodeExecutionError(f"Node {spec.name} failed: {exc}") from exc
+
+    @staticmethod
+    def _finish_plan(state: PlannerState, truncated: bool = False) -> PlannerState:
+        if not truncated and state.status not in ("IN_PROGRESS", "DONE", "ERROR"):
+            state.status = "PLANNED"
+        state.touch()
+        return state
+
+    # ----------------- scheduling -----------------
+    def _schedule(self) -> List[List[NodeSpec]]:
+        if self._waves is None:
+            level: Dict[int, int] = {}
+            for i, spec in enumerate(self._nodes):
+                deps = [level[j] for j in range(i) if spec.depends_on(self._nodes[j])]
+                level[i] = max(deps) + 1 if deps else 0
+            waves: List[List[NodeSpec]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+            for i, spec in enumerate(self._nodes):
+                waves[level[i]].append(spec)
+            self._waves = waves
+        return self._waves
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="planner-node")
+        return self._executor
+
+    def _run_node(self, spec: NodeSpec, state: PlannerState) -> Tuple[Optional[PlannerState], Optional[BaseException]]:
+        try:
+            if inspect.iscoroutinefunction(spec.fn):
+                # async-only node in a sync run: give it a private event loop
+                return asyncio.run(spec.fn(state, self.bindings)), None
+            return spec.fn(state, self.bindings), None
+        except Exception as e:
+            return None, e
+
+    async def _arun_node(
+        self, spec: NodeSpec, state: PlannerState
+    ) -> Tuple[Optional[PlannerState], Optional[BaseException]]:
+        try:
+            if spec.afn is not None:
+                return await spec.afn(state, self.bindings), None
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), spec.fn, state, self.bindings), None
+        except Exception as e:
+            return None, e
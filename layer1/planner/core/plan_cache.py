@@ -0,0 +1,94 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..core.state import Step
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_goal(goal: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a goal."""
+    return _SPACE_RE.sub(" ", goal or "").strip().rstrip(".!?").strip().lower()
+
+
+class PlanCache:
+    """
+    Cache of finished plans, stored in Redis through MemoryFacade.set_temp/get_temp.
+    - Key: normalized goal + context["worker_type"] + version (planner pipeline and
+      node profiles, so a model or prompt-setting change never serves stale plans)
+    - Value: JSON with the serialized Step list and the reflection result
+    - Entries expire after ttl; invalidate() drops one goal explicitly
+    Memory failures are counted and ignored; the cache never breaks planning.
+    """
+
+    KEY_PREFIX = "planner:plan:"
+
+    def __init__(self, memory: Any, ttl: int = 24 * 3600):
+        self.memory = memory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    # ----------------- keys -----------------
+    @staticmethod
+    def make_key(goal: str, worker_type: Optional[str], version: str) -> str:
+        raw = f"{version}\x00{worker_type or ''}\x00{normalize_goal(goal)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ----------------- main API -----------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """{"steps": [Step], "reflection": ...} or None."""
+        try:
+            value = self.memory.get_temp(self.KEY_PREFIX + key)
+            entry = json.loads(value) if value is not None else None
+            if entry is not None:
+                entry["steps"] = [Step.from_dict(item) for item in entry["steps"]]
+        except Exception:
+            entry = None
+            self._count("errors")
+        self._count("hits" if entry else "misses")
+        return entry
+
+    def set(self, key: str, steps: List[Step], reflection: Optional[Dict[str, Any]] = None) -> None:
+        value = json.dumps(
+            {"steps": [step.to_dict() for step in steps], "reflection": reflection, "ts": time.time()},
+            separators=(",", ":"),
+        )
+        try:
+            self.memory.set_temp(self.KEY_PREFIX + key, value, self.ttl)
+            self._count("stores")
+        except Exception:
+            self._count("errors")
+
+    def invalidate(self, key: str) -> None:
+        try:
+            self.memory.delete_temp(self.KEY_PREFIX + key)
+            self._count("invalidations")
+        except Exception:
+            self._count("errors")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    # ----------------- internals -----------------
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
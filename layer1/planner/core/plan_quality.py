@@ -0,0 +1,108 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import List, Sequence
+import re
+
+from ..core.state import Step
+
+# imperative first words expected at the start of a step title
+ACTION_VERBS = frozenset("""
+add analyze apply archive assign authenticate back backup build bump calculate call check choose clean clear clone
+close collect commit compare compile compute configure confirm connect convert copy create debug decide define delete
+deploy describe design detect determine disable download draft edit enable ensure estimate evaluate execute export
+extract fetch filter find fix format gather generate get identify implement import inspect install investigate launch
+list load locate log login merge migrate monitor move navigate notify open optimize parse patch pause pick plan poll
+prepare print process provision pull push query read rebuild record refactor refresh register reload remove rename
+render replace report request reset resize restart restore resume retrieve review rollback run save scan schedule
+search select send set setup share sort start stop store submit summarize switch sync tag test track transform
+translate trigger tune uninstall unzip update upgrade upload use validate verify visit wait watch write
+""".split())
+
+# shell / SQL / infra operations that can destroy data or take systems down
+DESTRUCTIVE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"\brm\s+-[a-z]*[rf]",
+    r"\bdrop\s+(table|database|schema)\b",
+    r"\btruncate\s+table\b",
+    r"\bdelete\s+from\b",
+    r"\bmkfs(\.\w+)?\b",
+    r"\bdd\s+if=",
+    r"\bformat\s+[a-z]:",
+    r"\b(shutdown|reboot|poweroff)\b",
+    r"\bkill\s+-9\b",
+    r"\bchmod\s+(-r\s+)?777\b",
+    r"\bgit\s+push\s+.*--force\b",
+    r"\bgit\s+reset\s+--hard\b",
+    r"\bkubectl\s+delete\b",
+    r"\bterraform\s+destroy\b",
+    r":\(\)\s*\{",
+)]
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9'-]*")
+
+
+@dataclass
+class PlanAssessment:
+    """Local plan-quality verdict: score in [0, 1], the issues found and a high-risk flag."""
+    score: float
+    issues: List[str] = field(default_factory=list)
+    high_risk: bool = False
+    destructive: List[str] = field(default_factory=list)
+
+
+def find_destructive(text: str) -> List[str]:
+    """Destructive command fragments found in text."""
+    found = []
+    for pattern in DESTRUCTIVE_PATTERNS:
+        match = pattern.search(text or "")
+        if match:
+            found.append(match.group(0))
+    return found
+
+
+def assess_plan(goal: str, steps: Sequence[Step], max_steps: int = 8) -> PlanAssessment:
+    """
+    Score a plan without an LLM call:
+    - no steps scores 0; more than max_steps, or one step for a long goal, costs points
+    - duplicate steps (same normalized title or description) cost 0.3 each
+    - step titles that do not start with an action verb cost 0.15 each (at most 0.45)
+    - destructive commands in the goal or any step mark the plan high-risk
+    """
+    destructive = find_destructive(goal)
+    for step in steps:
+        destructive += find_destructive(f"{step.title}\n{step.description}")
+    if not steps:
+        return PlanAssessment(0.0, ["no steps"], bool(destructive), destructive)
+
+    score = 1.0
+    issues: List[str] = []
+    if len(steps) > max_steps:
+        score -= min(0.4, 0.1 * (len(steps) - max_steps))
+        issues.append(f"{len(steps)} steps (more than {max_steps})")
+    if len(steps) == 1 and len(goal.split()) > 12:
+        score -= 0.2
+        issues.append("single step for a long goal")
+
+    seen = set()
+    for step in steps:
+        for text in (step.title, step.description):
+            key = " ".join(_WORD_RE.findall(text.lower()))
+            if key and key in seen:
+                score -= 0.3
+                issues.append(f"duplicate step: {step.title}")
+                break
+        seen.update(" ".join(_WORD_RE.findall(t.lower())) for t in (step.title, step.description))
+
+    missing = [step.id for step in steps if not _starts_with_verb(step.title)]
+    if missing:
+        score -= min(0.45, 0.15 * len(missing))
+        issues.append(f"no action verb: {', '.join(missing)}")
+
+    if destructive:
+        issues.append(f"destructive: {', '.join(destructive)}")
+    return PlanAssessment(max(0.0, round(score, 3)), issues, bool(destructive), destructive)
+
+
+def _starts_with_verb(title: str) -> bool:
+    # letters only, so "1. Backup db" is judged by "backup"
+    words = re.findall(r"[a-z]+", title.lower())
+    return bool(words) and words[0] in ACTION_VERBS
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Any, Iterable
+
+
+@dataclass
+class NodeProfile:
+    """
+    LLM settings for one planner node.
+    model=None keeps the engine/connector default model; max_prompt_tokens=None
+    uses the planner's PromptBudget default. structured=True makes the node ask
+    for JSON-schema output and parse it directly (with one repair call on failure).
+    """
+    model: Optional[str] = None
+    max_tokens: int = 2048
+    temperature: float = 0.7
+    stop: List[str] = field(default_factory=list)
+    max_prompt_tokens: Optional[int] = None
+    structured: bool = False
+
+    def as_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_tokens": self.max_tokens, "temperature": self.temperature}
+        if self.model:
+            kwargs["model"] = self.model
+        if self.stop:
+            kwargs["stop"] = list(self.stop)
+        return kwargs
+
+
+class ProfileRegistry:
+    """
+    Maps planner node names (e.g. "intent_node") to NodeProfile.
+    Nodes without an explicit profile use the registry's default profile.
+    """
+
+    def __init__(self, default: Optional[NodeProfile] = None):
+        self.default = default or NodeProfile()
+        self._profiles: Dict[str, NodeProfile] = {}
+
+    @classmethod
+    def planner_defaults(cls) -> "ProfileRegistry":
+        """
+        Defaults for the built-in nodes: short deterministic answers for intent and
+        reflection (cache-eligible at temperature 0), a larger budget for decomposition.
+        Decomposition and reflection use structured JSON output. fused_plan_node
+        (intent + steps + self-check in one answer) gets the largest budget; route_node
+        only calls the LLM for steps the capability index cannot route.
+        """
+        registry = cls()
+        registry.register("intent_node", NodeProfile(max_tokens=1024, temperature=0.0))
+        registry.register("decompose_node", NodeProfile(max_tokens=2048, temperature=0.2, structured=True))
+        registry.register("reflect_node", NodeProfile(max_tokens=1024, temperature=0.0, structured=True))
+        registry.register("fused_plan_node", NodeProfile(max_tokens=3072, temperature=0.2, structured=True))
+        registry.register("route_node", NodeProfile(max_tokens=512, temperature=0.0, structured=True))
+        return registry
+
+    def register(self, node_name: str, profile: NodeProfile) -> None:
+        self._profiles[node_name] = profile
+
+    def get(self, node_name: str) -> NodeProfile:
+        return self._profiles.get(node_name, self.default)
+
+    def set_model(self, model: Optional[str], nodes: Iterable[str]) -> None:
+        """Point the given nodes at another model, keeping their other settings."""
+        for name in nodes:
+            self._profiles[name] = replace(self.get(name), model=model)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: profile.as_kwargs() for name, profile in self._profiles.items()}
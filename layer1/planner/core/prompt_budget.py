@@ -0,0 +1,179 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import json
+import threading
+
+TRUNCATION_MARKER = " ...[truncated]"
+
+
+def heuristic_token_count(text: str) -> int:
+    """Fast estimate (~4 characters per token for English/code)."""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class PromptSection:
+    """
+    One piece of a prompt.
+    - priority: lower is more important; higher-priority numbers are trimmed first
+    - required: never trimmed or dropped (goal, instructions)
+    - min_tokens: a section that would be cut below this is dropped instead
+    - prefix: label kept intact when the text is trimmed (e.g. "Context: ")
+    """
+    name: str
+    text: str
+    priority: int = 0
+    required: bool = False
+    min_tokens: int = 16
+    prefix: str = ""
+
+    def render(self) -> str:
+        return f"{self.prefix}{self.text}"
+
+
+@dataclass
+class BudgetReport:
+    prompt: str
+    tokens_before: int
+    tokens_after: int
+    trimmed: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+
+    @property
+    def saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens_after)
+
+
+class PromptBudget:
+    """
+    Token-aware prompt assembly for planner nodes and Layer-2 LLM tasks.
+    - tokenizer: optional callable text -> token count (e.g. lambda t: len(enc.encode(t)));
+      falls back to heuristic_token_count
+    - summarizer: optional callable (text, target_tokens) -> shorter text used
+      instead of plain truncation
+    Sections are trimmed by priority group, least important first; inside a group
+    every section gives up the same share, so no single step or field is wiped out.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        tokenizer: Optional[Callable[[str], int]] = None,
+        summarizer: Optional[Callable[[str, int], str]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer
+        self.summarizer = summarizer
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.trimmed_calls = 0
+        self.tokens_saved = 0
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is None:
+            return heuristic_token_count(text)
+        return self.tokenizer(text)
+
+    # ----------------- main API -----------------
+    def build(
+        self,
+        sections: List[PromptSection],
+        max_tokens: Optional[int] = None,
+        separator: str = "\n\n",
+    ) -> BudgetReport:
+        """Join sections in order, trimming low-priority ones to fit max_tokens."""
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        texts = [s.text for s in sections]
+        counts = [self.count(s.render()) for s in sections]
+        sep_tokens = self.count(separator) * max(0, len(sections) - 1)
+        before = sum(counts) + sep_tokens
+        total = before
+        trimmed: List[str] = []
+        dropped: List[str] = []
+
+        for priority in sorted({s.priority for s in sections if not s.required}, reverse=True):
+            over = total - budget
+            if over <= 0:
+                break
+            group = [
+                i for i, s in enumerate(sections)
+                if s.priority == priority and not s.required and texts[i] is not None
+            ]
+            group_tokens = sum(counts[i] for i in group)
+            if group_tokens <= 0:
+                continue
+            keep_ratio = max(0.0, (group_tokens - over) / group_tokens)
+            for i in group:
+                section = sections[i]
+                target = int(counts[i] * keep_ratio) - self.count(section.prefix)
+                if target < section.min_tokens:
+                    texts[i] = None
+                    total -= counts[i]
+                    counts[i] = 0
+                    dropped.append(section.name)
+                    continue
+                texts[i] = self._shrink(texts[i], target)
+                new_count = self.count(section.prefix + texts[i])
+                total -= counts[i] - new_count
+                counts[i] = new_count
+                trimmed.append(section.name)
+
+        kept = [f"{s.prefix}{t}" for s, t in zip(sections, texts) if t is not None]
+        prompt = separator.join(kept)
+        report = BudgetReport(
+            prompt=prompt,
+            tokens_before=before,
+            tokens_after=self.count(prompt) if (trimmed or dropped) else before,
+            trimmed=trimmed,
+            dropped=dropped,
+        )
+        with self._lock:
+            self.calls += 1
+            if trimmed or dropped:
+                self.trimmed_calls += 1
+                self.tokens_saved += report.saved
+        return report
+
+    def context_sections(
+        self,
+        context: Dict[str, Any],
+        priorities: Optional[Dict[str, int]] = None,
+        default_priority: int = 5,
+    ) -> List[PromptSection]:
+        """One section per context field ("key: value"); unknown keys get default_priority."""
+        priorities = priorities or {}
+        sections = []
+        for key, value in context.items():
+            if isinstance(value, str):
+                text = value
+            else:
+                try:
+                    text = json.dumps(value, default=str, ensure_ascii=False)
+                except (TypeError, ValueError):
+                    text = str(value)
+            sections.append(
+                PromptSection(name=key, text=text, priority=priorities.get(key, default_priority), prefix=f"{key}: ")
+            )
+        return sections
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "trimmed_calls": self.trimmed_calls, "tokens_saved": self.tokens_saved}
+
+    # ----------------- internals -----------------
+    def _shrink(self, text: str, target_tokens: int) -> str:
+        if self.summarizer is not None:
+            return self.summarizer(text, target_tokens)
+        marker_tokens = self.count(TRUNCATION_MARKER)
+        keep = max(1, target_tokens - marker_tokens)
+        current = self.count(text)
+        if current <= keep:
+            return text
+        # proportional cut, then tighten for non-linear tokenizers
+        chars = max(1, int(len(text) * keep / current))
+        cut = text[:chars]
+        while chars > 1 and self.count(cut) > keep:
+            chars = int(chars * 0.9)
+            cut = text[:chars]
+        return cut.rstrip() + TRUNCATION_MARKER
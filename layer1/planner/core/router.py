@@ -1,6 +1,11 @@
 from __future__ import annotations
-from typing import Callable, Optional, Dict, Any
-from ..core.state import PlannerState
+from typing import Callable, Optional, Dict, Any, List, Sequence
+from ..core.state import PlannerState, Step
+from ..core.capability_index import CapabilityIndex
+
+Selector = Callable[[PlannerState, Dict[str, Any]], str]
+# chooser(state, [(step, candidates)]) -> {step_id: worker_id}; one call for all ambiguous steps
+BatchChooser = Callable[[PlannerState, List[Any]], Dict[str, str]]
 
 
 class Router:
@@ -16,6 +21,11 @@ class Router:
 
     def __init__(self):
         self._worker_selector: Optional[Callable[[PlannerState, Dict[str, Any]], str]] = None
+        self._index: Optional[CapabilityIndex] = None
+
+    def register_capability_index(self, index: Optional[CapabilityIndex]) -> None:
+        """Capability index used by route_steps before falling back to the selector."""
+        self._index = index
 
     def register_selector(self, selector: Callable[[PlannerState, Dict[str, Any]], str]) -> None:
         """
@@ -32,3 +42,63 @@ class Router:
         if self._worker_selector is None:
             return None
         return self._worker_selector(state, step)
+
+    def route_steps(self, state: PlannerState, steps: Optional[Sequence[Step]] = None) -> Dict[str, Optional[str]]:
+        """Route every step (default: state.steps) in one pass; returns {step_id: worker or None}."""
+        return route_steps(state, state.steps if steps is None else steps, self._index, self._worker_selector)
+
+
+def route_steps(
+    state: PlannerState,
+    steps: Sequence[Step],
+    index: Optional[CapabilityIndex] = None,
+    selector: Optional[Selector] = None,
+    chooser: Optional[BatchChooser] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Batch routing; sets step.routing = {"worker", "method", "score", "candidates"} on every step.
+    1. steps the capability index matches unambiguously -> method "index"
+    2. remaining steps -> selector(state, step_dict) per distinct step text ("selector"),
+       else chooser(state, [(step, candidates)]) in one call ("llm"),
+       else the best index candidate, if any ("index_best")
+    Steps nothing can route get worker None.
+    """
+    routes: Dict[str, Optional[str]] = {}
+    ambiguous = []
+    for step in steps:
+        candidates = index.match(f"{step.title} {step.description}") if index is not None else []
+        worker = index.pick(candidates) if index is not None else None
+        step.routing.update({
+            "worker": worker,
+            "method": "index" if worker else None,
+            "score": round(candidates[0][1], 3) if candidates else 0.0,
+            "candidates": [wid for wid, _ in candidates[:3]],
+        })
+        if worker:
+            routes[step.id] = worker
+        else:
+            ambiguous.append((step, candidates))
+
+    chosen: Dict[str, str] = {}
+    method = None
+    if ambiguous and selector is not None:
+        method = "selector"
+        memo: Dict[str, str] = {}
+        for step, _ in ambiguous:
+            text = f"{step.title}\n{step.description}"
+            if text not in memo:
+                memo[text] = selector(state, {"id": step.id, "title": step.title, "description": step.description})
+            chosen[step.id] = memo[text]
+    elif ambiguous and chooser is not None:
+        method = "llm"
+        chosen = chooser(state, ambiguous)
+
+    for step, candidates in ambiguous:
+        worker = chosen.get(step.id)
+        step_method = method
+        if not worker and candidates:
+            worker, step_method = candidates[0][0], "index_best"
+        step.routing["worker"] = worker
+        step.routing["method"] = step_method if worker else None
+        routes[step.id] = worker
+    return routes
@@ -1,12 +1,13 @@
 from __future__ import annotations
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from typing import Any, Dict, List, Optional
 import time
 import uuid
 
 
-@dataclass
+@dataclass(slots=True)
 class Step:
+    """One plan step; slotted (no per-instance __dict__) since workflows hold many of them."""
     id: str
     title: str
     description: str
@@ -16,6 +17,30 @@ class Step:
     safety: Dict[str, Any] = field(default_factory=dict)
     results: List[Dict[str, Any]] = field(default_factory=list)
 
+    def to_dict(self) -> Dict[str, Any]:
+        """The step definition; per-run routing / safety / results are not included."""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "requires_approval": self.requires_approval,
+            "metadata": dict(self.metadata),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Step":
+        """Inverse of to_dict(); also accepts routing / safety / results (checkpoints)."""
+        return cls(
+            id=data["id"],
+            title=data["title"],
+            description=data["description"],
+            requires_approval=data.get("requires_approval", True),
+            metadata=dict(data.get("metadata") or {}),
+            routing=dict(data.get("routing") or {}),
+            safety=dict(data.get("safety") or {}),
+            results=list(data.get("results") or []),
+        )
+
 
 @dataclass
 class PlannerState:
@@ -28,9 +53,10 @@ class PlannerState:
     current_index: Optional[int] = 0
     selected_worker: Optional[str] = None
     reflection: Optional[Dict[str, Any]] = None
-    status: str = "INITIAL"  # INITIAL, PLANNED, AWAITING_BINDINGS, IN_PROGRESS, DONE, ERROR
+    status: str = "INITIAL"  # INITIAL, PLANNING, PLANNED, AWAITING_BINDINGS, IN_PROGRESS, DONE, ERROR
     created_at: float = field(default_factory=time.time)
     updated_at: float = field(default_factory=time.time)
+    completed_nodes: List[str] = field(default_factory=list)  # planner nodes already applied (resume)
 
     @classmethod
     def new(cls, user_id: str, goal: str, context: Optional[Dict[str, Any]] = None) -> "PlannerState":
@@ -46,3 +72,18 @@ class PlannerState:
 
     def touch(self):
         self.updated_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe snapshot (checkpoints); plan is stored as step ids into steps."""
+        data = {k: v for k, v in self.__dict__.items() if k not in ("steps", "plan")}
+        data["steps"] = [asdict(step) for step in self.steps]
+        data["plan"] = [step.id for step in self.plan]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PlannerState":
+        data = dict(data)
+        steps = [Step.from_dict(item) for item in data.pop("steps", [])]
+        by_id = {step.id: step for step in steps}
+        plan = [by_id[step_id] for step_id in data.pop("plan", []) if step_id in by_id]
+        return cls(steps=steps, plan=plan, **data)
@@ -0,0 +1,207 @@
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import asyncio
+import json
+
+from .errors import StructuredOutputError
+from .state import Step
+from .structured import parse_step
+
+_THINK_OPEN = "<think>"
+_THINK_CLOSE = "</think>"
+
+
+def parse_step_line(line: str, index: int) -> Step:
+    """
+    One line of a numbered-list answer -> Step step_<index>.
+    "1. Title: description", "2) Title - description" or free text (first words as title).
+    """
+    text = line.strip()
+    for sep in (".", ")", "-"):
+        if text.startswith(f"{index}{sep}") or text.startswith(f"{index}{sep} "):
+            text = text.split(sep, 1)[1].strip()
+            break
+    if ":" in text:
+        title, description = [p.strip() for p in text.split(":", 1)]
+    elif " - " in text:
+        title, description = [p.strip() for p in text.split(" - ", 1)]
+    else:
+        parts = text.split(" ", 4)
+        title = " ".join(parts[:3]).strip()
+        description = text
+    return Step(id=f"step_{index}", title=title[:64], description=description[:512], requires_approval=True)
+
+
+class StepStreamParser:
+    """
+    Incremental parser turning a streamed decomposition answer into Steps.
+    feed(delta) returns the steps completed by that delta; close() flushes the rest.
+    - structured=True: JSON; every object of the top-level "steps" array (or of a bare
+      top-level array) becomes a Step as soon as its closing brace arrives
+    - structured=False: numbered list; every finished non-empty line is a step
+      (same rules as parsing the whole answer at once)
+    A leading <think> block from reasoning models is skipped.
+    """
+
+    def __init__(self, structured: bool):
+        self.structured = structured
+        self.steps: List[Step] = []
+        self._raw: List[str] = []
+        self._text = ""        # answer after the think block
+        self._think_done = False
+        self._pos = 0          # scan position in _text
+        # JSON scanner: one frame per open container
+        self._frames: List[Dict[str, Any]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._item_start: Optional[int] = None
+        self._finished = False
+
+    @property
+    def text(self) -> str:
+        """The raw answer received so far."""
+        return "".join(self._raw)
+
+    def feed(self, delta: str) -> List[Step]:
+        self._raw.append(delta)
+        if not self._think_done:
+            raw = self.text
+            stripped = raw.lstrip()
+            if stripped.startswith(_THINK_OPEN):
+                if _THINK_CLOSE not in stripped:
+                    return []
+                self._text = stripped.split(_THINK_CLOSE, 1)[1]
+            elif _THINK_OPEN.startswith(stripped):
+                return []  # may still become "<think>"
+            else:
+                self._text = raw
+            self._think_done = True
+        else:
+            self._text += delta
+        return self._scan_json() if self.structured else self._scan_lines(final=False)
+
+    def close(self) -> List[Step]:
+        """Steps completed by the end of the stream (a last list line without newline)."""
+        if not self._think_done:
+            # the stream ended inside the think block (or before any answer)
+            self._think_done = True
+            self._text = "" if self.text.lstrip().startswith(_THINK_OPEN) else self.text
+            if self.structured:
+                return self._scan_json()
+        return [] if self.structured else self._scan_lines(final=True)
+
+    # ----------------- numbered list -----------------
+    def _scan_lines(self, final: bool) -> List[Step]:
+        end = len(self._text) if final else self._text.rfind("\n") + 1
+        if end <= self._pos:
+            return []
+        lines = self._text[self._pos:end].splitlines()
+        self._pos = end
+        new = []
+        for line in lines:
+            if line.strip():
+                new.append(parse_step_line(line, len(self.steps) + 1))
+                self.steps.append(new[-1])
+        return new
+
+    # ----------------- JSON -----------------
+    def _scan_json(self) -> List[Step]:
+        new = []
+        text = self._text
+        for i in range(self._pos, len(text)):
+            if self._finished:
+                break
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._frames and self._frames[-1]["type"] == "{":
+                        self._frames[-1]["last_string"] = text[self._string_start:i + 1]
+                continue
+            if ch == '"':
+                if self._frames:
+                    self._in_string = True
+                    self._string_start = i
+            elif ch == ":" and self._frames and self._frames[-1]["type"] == "{":
+                self._frames[-1]["key"] = self._frames[-1].pop("last_string", None)
+            elif ch in "{[":
+                if not self._frames:
+                    self._frames.append({"type": ch, "steps": ch == "["})
+                    continue
+                parent = self._frames[-1]
+                if parent["steps"] and ch == "{":
+                    self._item_start = i
+                is_steps = (
+                    ch == "[" and len(self._frames) == 1 and parent["type"] == "{"
+                    and parent.get("key") == '"steps"'
+                )
+                self._frames.append({"type": ch, "steps": is_steps})
+            elif ch in "}]" and self._frames:
+                self._frames.pop()
+                if not self._frames:
+                    self._finished = True
+                elif ch == "}" and self._frames[-1]["steps"] and self._item_start is not None:
+                    step = self._parse_item(text[self._item_start:i + 1])
+                    self._item_start = None
+                    if step is not None:
+                        new.append(step)
+            elif ch == "," and self._frames and self._frames[-1]["type"] == "{":
+                self._frames[-1].pop("key", None)
+        self._pos = len(text)
+        return new
+
+    def _parse_item(self, fragment: str) -> Optional[Step]:
+        # a malformed item is left to the full-answer parse / repair
+        try:
+            step = parse_step(json.loads(fragment), len(self.steps) + 1)
+        except (json.JSONDecodeError, StructuredOutputError):
+            return None
+        self.steps.append(step)
+        return step
+
+
+class StepDispatcher:
+    """
+    Hands streamed steps to a sink on its own thread, in order.
+    The stream that produces the steps holds an LLM scheduler slot until it ends; calling
+    the sink inline would let a sink that calls the LLM (e.g. a per-step safety check)
+    wait for a slot the stream never frees. Here the stream keeps going and releases its
+    slot, and the sink's calls queue like any other. wait() / await await_done() after
+    the stream ends deliver the remaining steps and re-raise the first sink error.
+    """
+
+    def __init__(self, sink: Callable[[Step], None]):
+        self._sink = sink
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._futures: List[Future] = []
+
+    def emit(self, steps: Iterable[Step]) -> None:
+        for step in steps:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner-steps")
+            self._futures.append(self._pool.submit(self._sink, step))
+
+    def wait(self) -> None:
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._shutdown()
+
+    async def await_done(self) -> None:
+        try:
+            for future in self._futures:
+                await asyncio.wrap_future(future)
+        finally:
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
@@ -0,0 +1,203 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+import json
+import re
+
+from ..core.state import Step
+from ..core.errors import StructuredOutputError
+
+_THINK_RE = re.compile(r"<think>.*?(</think>|$)", re.DOTALL)
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+# The schemas are sent with "strict": true, so every object lists all of its
+# properties as required and forbids additional ones. The parsers stay lenient.
+
+STEP_ITEM_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["title", "description"],
+    "additionalProperties": False,
+}
+
+STEPS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {"steps": {"type": "array", "items": STEP_ITEM_SCHEMA, "minItems": 1}},
+    "required": ["steps"],
+    "additionalProperties": False,
+}
+
+REFLECTION_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "status": {"type": "string", "enum": ["OK", "REPLACED"]},
+        "notes": {"type": "string"},
+        "steps": {"type": "array", "items": STEP_ITEM_SCHEMA},
+    },
+    "required": ["status", "notes", "steps"],
+    "additionalProperties": False,
+}
+
+ROUTES_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "routes": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"step": {"type": "string"}, "worker": {"type": "string"}},
+                "required": ["step", "worker"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["routes"],
+    "additionalProperties": False,
+}
+
+FUSED_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "intent": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string"},
+                "constraints": {"type": "array", "items": {"type": "string"}},
+                "assumptions": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["intent", "constraints", "assumptions"],
+            "additionalProperties": False,
+        },
+        "steps": {"type": "array", "items": STEP_ITEM_SCHEMA, "minItems": 1},
+        "review": {
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "enum": ["OK", "REVISED"]},
+                "notes": {"type": "string"},
+            },
+            "required": ["status", "notes"],
+            "additionalProperties": False,
+        },
+    },
+    "required": ["intent", "steps", "review"],
+    "additionalProperties": False,
+}
+
+
+def json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """OpenAI-style response_format asking the backend for JSON matching schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def extract_json(raw: str) -> Any:
+    """
+    Parse a model answer as JSON, tolerating <think> blocks, code fences and
+    prose around a single top-level object.
+    """
+    text = _THINK_RE.sub("", raw or "")
+    if "</think>" in text:
+        text = text.rsplit("</think>", 1)[1]
+    text = _FENCE_RE.sub("", text.strip())
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            raise StructuredOutputError(f"invalid JSON: {e.msg} at position {e.pos}") from e
+    raise StructuredOutputError("no JSON object in response")
+
+
+def parse_steps(items: Any) -> List[Step]:
+    """Validate a list of {title, description} items and build Step objects."""
+    if not isinstance(items, list) or not items:
+        raise StructuredOutputError("'steps' must be a non-empty array")
+    return [parse_step(item, i) for i, item in enumerate(items, start=1)]
+
+
+def parse_step(item: Any, index: int) -> Step:
+    """Validate one {title, description} item and build Step step_<index>."""
+    if not isinstance(item, dict):
+        raise StructuredOutputError(f"step {index} must be an object")
+    title = item.get("title")
+    description = item.get("description", "")
+    if not isinstance(title, str) or not title.strip():
+        raise StructuredOutputError(f"step {index} needs a non-empty 'title' string")
+    if not isinstance(description, str):
+        raise StructuredOutputError(f"step {index} 'description' must be a string")
+    return Step(
+        id=f"step_{index}",
+        title=title.strip()[:64],
+        description=(description.strip() or title.strip())[:512],
+        requires_approval=True,
+    )
+
+
+def parse_plan(data: Any) -> List[Step]:
+    """STEPS_SCHEMA answer -> steps (a bare array is accepted too)."""
+    if isinstance(data, dict):
+        data = data.get("steps")
+    return parse_steps(data)
+
+
+def parse_reflection(data: Any) -> Dict[str, Any]:
+    """REFLECTION_SCHEMA answer -> {"status", "notes", "steps"} (steps only when REPLACED)."""
+    if not isinstance(data, dict):
+        raise StructuredOutputError("reflection must be a JSON object")
+    status = str(data.get("status", "")).upper()
+    if status not in ("OK", "REPLACED"):
+        raise StructuredOutputError("'status' must be OK or REPLACED")
+    notes = data.get("notes") or ""
+    steps = parse_steps(data.get("steps")) if status == "REPLACED" else []
+    return {"status": status, "notes": str(notes)[:512], "steps": steps}
+
+
+def parse_fused(data: Any) -> Dict[str, Any]:
+    """FUSED_SCHEMA answer -> {"intent": {...}, "steps": [Step], "review": {"status", "notes"}}."""
+    if not isinstance(data, dict):
+        raise StructuredOutputError("fused plan must be a JSON object")
+    intent = data.get("intent")
+    if not isinstance(intent, dict) or not isinstance(intent.get("intent"), str) or not intent["intent"].strip():
+        raise StructuredOutputError("'intent' must be an object with a non-empty 'intent' string")
+    review = data.get("review")
+    if not isinstance(review, dict):
+        raise StructuredOutputError("'review' must be an object")
+    status = str(review.get("status", "")).upper()
+    if status not in ("OK", "REVISED"):
+        raise StructuredOutputError("review 'status' must be OK or REVISED")
+    return {
+        "intent": {
+            "intent": intent["intent"].strip(),
+            "constraints": [str(c) for c in intent.get("constraints") or []],
+            "assumptions": [str(a) for a in intent.get("assumptions") or []],
+        },
+        "steps": parse_steps(data.get("steps")),
+        "review": {"status": status, "notes": str(review.get("notes") or "")[:512]},
+    }
+
+
+def parse_routes(data: Any, workers: List[str]) -> Dict[str, str]:
+    """ROUTES_SCHEMA answer -> {step_id: worker_id}; entries naming unknown workers are dropped."""
+    if not isinstance(data, dict) or not isinstance(data.get("routes"), list):
+        raise StructuredOutputError("'routes' must be an array")
+    known = set(workers)
+    routes: Dict[str, str] = {}
+    for item in data["routes"]:
+        if isinstance(item, dict) and item.get("worker") in known and isinstance(item.get("step"), str):
+            routes[item["step"]] = item["worker"]
+    return routes
+
+
+def repair_prompt(schema: Dict[str, Any], raw: str, error: str, max_chars: int = 4000) -> str:
+    """Targeted follow-up asking the model to fix its previous answer."""
+    return (
+        f"Your previous answer could not be parsed: {error}.\n"
+        "Return only a JSON object that matches this JSON schema, with no other text:\n"
+        f"{json.dumps(schema, separators=(',', ':'))}\n\n"
+        f"Previous answer:\n{raw[:max_chars]}"
+    )
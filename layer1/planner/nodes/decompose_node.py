@@ -1,53 +1,187 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from ..core.state import PlannerState, Step
-from ..core.graph import PlannerBindings
-from ..core.errors import MissingBindingError
+from ..core.graph import PlannerBindings, async_impl_of, node_io
+from ..core.errors import MissingBindingError, StructuredOutputError
+from ..core.prompt_budget import PromptSection
+from ..core.step_stream import StepDispatcher, StepStreamParser, parse_step_line
+from ..core.structured import STEPS_SCHEMA, extract_json, json_schema_format, parse_plan
 
 
+@node_io(
+    reads=("goal", "context.intent_extraction"),
+    writes=("steps", "current_index", "context.decompose_stream", "context.reasoning.decompose_node"),
+)
 def decompose_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Decomposition node. Must use LLM to produce steps.
     Contract:
       - bindings.llm(prompt) -> str (ideally JSON or newline list)
       - nodes must create Step objects in state.steps
+      - with a structured profile the answer must match STEPS_SCHEMA
+        (one repair call, then StructuredOutputError)
+      - with a step sink for this workflow (Layer1Planner on_step) the answer is streamed
+        through the llm binding's on_delta (same budget, cache and coalescing as any call)
+        and each Step goes to the sink as soon as it is complete (on a separate thread,
+        outside the call's LLM scheduler slot; see StepDispatcher)
+      - if the stream breaks after steps went out, the plan is made again unstreamed and
+        only steps the sink has not received are sent; the others are listed as
+        "superseded" in state.context["decompose_stream"]
 
     If no LLM: raise MissingBindingError to indicate inert planner.
     """
     if bindings.llm is None:
         raise MissingBindingError("LLM binding not set for decompose_node")
 
+    prompt, structured = _decompose_prompt(state, bindings)
+    sink = bindings.step_sink(state.workflow_id)
+    if sink is None:
+        return _store_steps(state, _decompose(state, bindings, prompt, structured))
+    parser = StepStreamParser(structured)
+    dispatcher = StepDispatcher(sink)
+    try:
+        try:
+            raw = bindings.call_llm(
+                "decompose_node", prompt, state=state, json_answer=structured,
+                on_delta=lambda delta: dispatcher.emit(parser.feed(delta)), **_stream_kwargs(structured)
+            )
+        except Exception as e:
+            if not parser.steps:
+                raise
+            # the stream broke after steps went out: plan again unstreamed, send only the new steps
+            steps = _decompose(state, bindings, prompt, structured)
+            dispatcher.emit(_after_broken_stream(state, parser, steps, e))
+            return _store_steps(state, steps)
+        dispatcher.emit(_finish_stream(parser, raw))
+        steps = parser.steps
+        if structured and not steps:
+            # nothing usable streamed: parse / repair the whole answer like call_structured
+            steps = bindings.finish_structured(
+                "decompose_node", parser.text, "plan_steps", STEPS_SCHEMA, parse_plan, state=state
+            )
+            dispatcher.emit(steps)
+    finally:
+        dispatcher.wait()
+    return _store_streamed(state, parser, steps)
+
+
+@async_impl_of(decompose_node)
+async def adecompose_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """Async decompose_node (awaits the async LLM binding)."""
+    if not bindings.has_llm():
+        raise MissingBindingError("LLM binding not set for decompose_node")
+
+    prompt, structured = _decompose_prompt(state, bindings)
+    sink = bindings.step_sink(state.workflow_id)
+    if sink is None:
+        return _store_steps(state, await _adecompose(state, bindings, prompt, structured))
+    parser = StepStreamParser(structured)
+    dispatcher = StepDispatcher(sink)
+    try:
+        try:
+            raw = await bindings.acall_llm(
+                "decompose_node", prompt, state=state, json_answer=structured,
+                on_delta=lambda delta: dispatcher.emit(parser.feed(delta)), **_stream_kwargs(structured)
+            )
+        except Exception as e:
+            if not parser.steps:
+                raise
+            steps = await _adecompose(state, bindings, prompt, structured)
+            dispatcher.emit(_after_broken_stream(state, parser, steps, e))
+            return _store_steps(state, steps)
+        dispatcher.emit(_finish_stream(parser, raw))
+        steps = parser.steps
+        if structured and not steps:
+            steps = await bindings.afinish_structured(
+                "decompose_node", parser.text, "plan_steps", STEPS_SCHEMA, parse_plan, state=state
+            )
+            dispatcher.emit(steps)
+    finally:
+        await dispatcher.await_done()
+    return _store_streamed(state, parser, steps)
+
+
+def _decompose(state: PlannerState, bindings: PlannerBindings, prompt: str, structured: bool) -> List[Step]:
+    if structured:
+        # JSON-schema output parsed straight into Steps; unparseable plans fail the node
+        return bindings.call_structured(
+            "decompose_node", prompt, "plan_steps", STEPS_SCHEMA, parse_plan, state=state
+        )
+    return _parse_numbered_list(bindings.call_llm("decompose_node", prompt, state=state))
+
+
+async def _adecompose(state: PlannerState, bindings: PlannerBindings, prompt: str, structured: bool) -> List[Step]:
+    if structured:
+        return await bindings.acall_structured(
+            "decompose_node", prompt, "plan_steps", STEPS_SCHEMA, parse_plan, state=state
+        )
+    return _parse_numbered_list(await bindings.acall_llm("decompose_node", prompt, state=state))
+
+
+def _decompose_prompt(state: PlannerState, bindings: PlannerBindings) -> Tuple[str, bool]:
+    """(prompt, structured) for the decompose_node profile."""
     intent_info = state.context.get("intent_extraction", {}).get("raw", "")
-    prompt = (
-        "Break down the goal into a focused ordered list of steps. Each step should be "
-        "an atomic action with a short title and short description.\n\n"
-        f"Goal: {state.goal}\n\n"
-        f"Context / intent: {intent_info}\n\n"
-        "Return steps as a numbered list or JSON."
-    )
-
-    raw = bindings.llm(prompt)
-    lines = [ln.strip() for ln in raw.splitlines() if ln.strip()]
-    steps: List[Step] = []
-    idx = 1
-    for line in lines:
-        text = line
-        for sep in (".", ")", "-"):
-            if text.startswith(f"{idx}{sep}") or text.startswith(f"{idx}{sep} "):
-                text = text.split(sep, 1)[1].strip()
-                break
-        if ":" in text:
-            title, description = [p.strip() for p in text.split(":", 1)]
-        elif " - " in text:
-            title, description = [p.strip() for p in text.split(" - ", 1)]
-        else:
-            parts = text.split(" ", 4)
-            title = " ".join(parts[:3]).strip()
-            description = text
-        step = Step(id=f"step_{idx}", title=title[:64], description=description[:512], requires_approval=True)
-        steps.append(step)
-        idx += 1
+    structured = bindings.profiles.get("decompose_node").structured
+    if structured:
+        output_format = 'Return JSON only: {"steps": [{"title": "...", "description": "..."}]}'
+    else:
+        output_format = "Return steps as a numbered list or JSON."
+    prompt = bindings.build_prompt("decompose_node", [
+        PromptSection(
+            "instructions",
+            "Break down the goal into a focused ordered list of steps. Each step should be "
+            "an atomic action with a short title and short description.",
+            required=True,
+        ),
+        PromptSection("goal", state.goal, priority=1, min_tokens=64, prefix="Goal: "),
+        PromptSection("intent", intent_info, priority=2, prefix="Context / intent: "),
+        PromptSection("format", output_format, required=True),
+    ])
+    return prompt, structured
+
 
+def _store_steps(state: PlannerState, steps: List[Step]) -> PlannerState:
     state.steps = steps
     state.current_index = 0 if steps else None
     return state
+
+
+def _stream_kwargs(structured: bool) -> Dict[str, Any]:
+    return {"response_format": json_schema_format("plan_steps", STEPS_SCHEMA)} if structured else {}
+
+
+def _finish_stream(parser: StepStreamParser, raw: str) -> List[Step]:
+    """Steps still to emit once the call returned; an llm binding without on_delta streamed nothing."""
+    new = [] if parser.text else parser.feed(raw)
+    return new + parser.close()
+
+
+def _after_broken_stream(
+    state: PlannerState, parser: StepStreamParser, steps: List[Step], error: Exception
+) -> List[Step]:
+    """Record the broken stream; returns the re-planned steps the sink has not received yet."""
+    state.context["decompose_stream"] = {
+        "streamed": len(parser.steps),
+        "complete": False,
+        "error": str(error)[:512],
+        # streamed steps the re-planned answer changed or dropped: state.steps is authoritative
+        "superseded": [step.id for step in parser.steps if step not in steps],
+    }
+    return [step for step in steps if step not in parser.steps]
+
+
+def _store_streamed(state: PlannerState, parser: StepStreamParser, steps: List[Step]) -> PlannerState:
+    # complete=False: the JSON answer broke off (e.g. max_tokens) after the streamed steps
+    complete = True
+    if parser.structured and parser.steps:
+        try:
+            complete = len(parse_plan(extract_json(parser.text))) == len(parser.steps)
+        except StructuredOutputError:
+            complete = False
+    state.context["decompose_stream"] = {"streamed": len(parser.steps), "complete": complete}
+    return _store_steps(state, steps)
+
+
+def _parse_numbered_list(raw: str) -> List[Step]:
+    lines = [ln for ln in raw.splitlines() if ln.strip()]
+    return [parse_step_line(line, idx) for idx, line in enumerate(lines, start=1)]
@@ -1,8 +1,9 @@
 from __future__ import annotations
 from ..core.state import PlannerState
-from ..core.graph import PlannerBindings
+from ..core.graph import PlannerBindings, node_io
 
 
+@node_io(reads=("steps", "current_index"), writes=("plan", "status", "current_index"))
 def finalize_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Finalization node. Prepares plan state for external consumption.
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import json
+from typing import Any, Dict
+from ..core.state import PlannerState
+from ..core.graph import PlannerBindings, async_impl_of, node_io
+from ..core.errors import MissingBindingError, StructuredOutputError
+from ..core.prompt_budget import PromptSection
+from ..core.structured import FUSED_SCHEMA, parse_fused
+from .intent_node import aintent_node, intent_node
+from .decompose_node import adecompose_node, decompose_node
+from .reflect_node import areflect_node, reflect_node
+
+
+@node_io(
+    reads=("goal",),
+    writes=(
+        "context.intent_extraction", "context.planning", "steps", "current_index", "reflection", "context.reasoning",
+    ),
+)
+def fused_plan_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """
+    Single-call planning node: intent extraction, decomposition and the reflection
+    self-check in one structured LLM answer (FUSED_SCHEMA).
+    Writes the same state as the three-node graph:
+      - state.context["intent_extraction"]["raw"] (JSON with intent, constraints, assumptions)
+      - state.steps / state.current_index
+      - state.reflection ({"status": "OK" | "REVISED", "notes"})
+    If the answer fails validation, falls back to intent_node -> decompose_node -> reflect_node.
+    state.context["planning"] records which path produced the plan.
+    """
+    if bindings.llm is None:
+        raise MissingBindingError("LLM binding not set for fused_plan_node")
+
+    prompt = _fused_prompt(state, bindings)
+    try:
+        # no repair call: the three-node graph is the fallback
+        result = bindings.call_structured(
+            "fused_plan_node", prompt, "fused_plan", FUSED_SCHEMA, parse_fused, repair=False, state=state
+        )
+    except StructuredOutputError as e:
+        _note_fallback(state, e)
+        for node in (intent_node, decompose_node, reflect_node):
+            state = node(state, bindings)
+        return state
+    return _apply_fused(state, result)
+
+
+@async_impl_of(fused_plan_node)
+async def afused_plan_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """Async fused_plan_node; the fallback uses the async graph nodes."""
+    if not bindings.has_llm():
+        raise MissingBindingError("LLM binding not set for fused_plan_node")
+
+    prompt = _fused_prompt(state, bindings)
+    try:
+        result = await bindings.acall_structured(
+            "fused_plan_node", prompt, "fused_plan", FUSED_SCHEMA, parse_fused, repair=False, state=state
+        )
+    except StructuredOutputError as e:
+        _note_fallback(state, e)
+        for node in (aintent_node, adecompose_node, areflect_node):
+            state = await node(state, bindings)
+        return state
+    return _apply_fused(state, result)
+
+
+def _fused_prompt(state: PlannerState, bindings: PlannerBindings) -> str:
+    return bindings.build_prompt("fused_plan_node", [
+        PromptSection(
+            "instructions",
+            "Plan the user goal below in one pass:\n"
+            "1. Extract the intent, constraints and assumptions.\n"
+            "2. Break the goal into a focused ordered list of steps. Each step should be an atomic "
+            "action with a short title and short description.\n"
+            "3. Review your steps for completeness, safety issues, missing steps or ordering problems "
+            "and fix them before answering; use review status REVISED if you changed anything, else OK.",
+            required=True,
+        ),
+        PromptSection("goal", state.goal, priority=1, min_tokens=64, prefix="Goal: "),
+        PromptSection(
+            "format",
+            'Return JSON only: {"intent": {"intent": "...", "constraints": ["..."], "assumptions": ["..."]}, '
+            '"steps": [{"title": "...", "description": "..."}], "review": {"status": "OK", "notes": "..."}}',
+            required=True,
+        ),
+    ])
+
+
+def _note_fallback(state: PlannerState, error: StructuredOutputError) -> None:
+    state.context["planning"] = {"pipeline": "fused", "fallback": True, "error": str(error)[:512]}
+
+
+def _apply_fused(state: PlannerState, result: Dict[str, Any]) -> PlannerState:
+    state.context.setdefault("intent_extraction", {})
+    state.context["intent_extraction"]["raw"] = json.dumps(result["intent"])
+    state.steps = result["steps"]
+    state.current_index = 0
+    state.reflection = result["review"]
+    state.context["planning"] = {"pipeline": "fused", "fallback": False}
+    return state
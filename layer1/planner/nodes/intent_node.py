@@ -1,10 +1,12 @@
 from __future__ import annotations
 from typing import Dict, Any
 from ..core.state import PlannerState
-from ..core.graph import PlannerBindings
+from ..core.graph import PlannerBindings, async_impl_of, node_io
 from ..core.errors import MissingBindingError
+from ..core.prompt_budget import PromptSection
 
 
+@node_io(reads=("goal",), writes=("context.intent_extraction", "context.reasoning.intent_node"))
 def intent_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Intent extraction node. Without an LLM binding this node will return inert status.
@@ -15,12 +17,30 @@ def intent_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     if bindings.llm is None:
         raise MissingBindingError("LLM binding not set for intent_node")
 
-    prompt = (
-        "Extract the intent, constraints, and important context from this user goal.\n\n"
-        f"Goal: {state.goal}\n\n"
-        "Return a short JSON with keys: intent, constraints, assumptions."
-    )
-    raw = bindings.llm(prompt)
+    raw = bindings.call_llm("intent_node", _intent_prompt(state, bindings), state=state, json_answer=True)
+    return _store_intent(state, raw)
+
+
+@async_impl_of(intent_node)
+async def aintent_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """Async intent_node (awaits the async LLM binding)."""
+    if not bindings.has_llm():
+        raise MissingBindingError("LLM binding not set for intent_node")
+
+    raw = await bindings.acall_llm("intent_node", _intent_prompt(state, bindings), state=state, json_answer=True)
+    return _store_intent(state, raw)
+
+
+def _intent_prompt(state: PlannerState, bindings: PlannerBindings) -> str:
+    return bindings.build_prompt("intent_node", [
+        PromptSection("instructions", "Extract the intent, constraints, and important context from this user goal.",
+                      required=True),
+        PromptSection("goal", state.goal, priority=1, min_tokens=64, prefix="Goal: "),
+        PromptSection("format", "Return a short JSON with keys: intent, constraints, assumptions.", required=True),
+    ])
+
+
+def _store_intent(state: PlannerState, raw: str) -> PlannerState:
     state.context.setdefault("intent_extraction", {})
     state.context["intent_extraction"]["raw"] = raw
     return state
@@ -1,27 +1,140 @@
 from __future__ import annotations
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from ..core.state import PlannerState
-from ..core.graph import PlannerBindings
-from ..core.errors import MissingBindingError
+from ..core.graph import PlannerBindings, async_impl_of, node_io
+from ..core.errors import MissingBindingError, StructuredOutputError
+from ..core.prompt_budget import PromptSection
+from ..core.structured import REFLECTION_SCHEMA, parse_reflection
+from ..core.plan_quality import assess_plan
 
 
+@node_io(
+    reads=("goal", "steps"),
+    writes=("steps", "current_index", "reflection", "context.reflection_gate", "context.reasoning.reflect_node"),
+)
 def reflect_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
     Reflection node. If safety or memory bindings are present, they may be used.
     If no LLM present, this node indicates that bindings are required to proceed.
+    Gated: plans scoring at least bindings.reflection_threshold on the local quality check
+    (plan_quality.assess_plan) skip the LLM call unless the goal is high-risk;
+    state.context["reflection_gate"] records the decision.
+    A plan whose steps do not all fit the prompt budget is not reviewed: a replacement
+    written from part of the plan would silently lose the steps the model never saw.
     """
     if bindings.llm is None:
         raise MissingBindingError("LLM binding not set for reflect_node")
+    if _skip_reflection(state, bindings):
+        return state
+
+    prompt, structured = _reflect_prompt(state, bindings)
+    if prompt is None:
+        return state
+    if structured:
+        try:
+            result = bindings.call_structured(
+                "reflect_node", prompt, "plan_reflection", REFLECTION_SCHEMA, parse_reflection, state=state
+            )
+        except StructuredOutputError as e:
+            return _reflection_failed(state, e)
+        return _apply_structured_reflection(state, result)
+
+    raw = bindings.call_llm("reflect_node", prompt, state=state)
+    return _apply_text_reflection(state, raw)
+
+
+@async_impl_of(reflect_node)
+async def areflect_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """Async reflect_node (awaits the async LLM binding)."""
+    if not bindings.has_llm():
+        raise MissingBindingError("LLM binding not set for reflect_node")
+    if _skip_reflection(state, bindings):
+        return state
+
+    prompt, structured = _reflect_prompt(state, bindings)
+    if prompt is None:
+        return state
+    if structured:
+        try:
+            result = await bindings.acall_structured(
+                "reflect_node", prompt, "plan_reflection", REFLECTION_SCHEMA, parse_reflection, state=state
+            )
+        except StructuredOutputError as e:
+            return _reflection_failed(state, e)
+        return _apply_structured_reflection(state, result)
+
+    raw = await bindings.acall_llm("reflect_node", prompt, state=state)
+    return _apply_text_reflection(state, raw)
+
+
+def _skip_reflection(state: PlannerState, bindings: PlannerBindings) -> bool:
+    """Score the plan locally; True (with state.reflection SKIPPED) when the LLM review is not needed."""
+    threshold = bindings.reflection_threshold
+    assessment = assess_plan(state.goal, state.steps)
+    high_risk = assessment.high_risk or bool(state.context.get("high_risk"))
+    if threshold is None:
+        skip, reason = False, "gate disabled"
+    elif high_risk:
+        skip, reason = False, "high-risk goal"
+    elif assessment.score < threshold:
+        skip, reason = False, f"score {assessment.score:.2f} below {threshold:.2f}"
+    else:
+        skip, reason = True, f"score {assessment.score:.2f} >= {threshold:.2f}"
+    state.context["reflection_gate"] = {
+        "skipped": skip,
+        "reason": reason,
+        "score": assessment.score,
+        "high_risk": high_risk,
+        "issues": assessment.issues,
+    }
+    bindings.reflection_stats["skipped" if skip else "runs"] += 1
+    if skip:
+        state.reflection = {"status": "SKIPPED", "notes": reason}
+    return skip
 
-    plan_text = "\n".join([f"{s.id}. {s.title} - {s.description}" for s in state.steps])
 
-    prompt = (
+def _reflect_prompt(state: PlannerState, bindings: PlannerBindings) -> Tuple[Optional[str], bool]:
+    """(prompt, structured) for the reflect_node profile; prompt is None when steps had to be dropped."""
+    structured = bindings.profiles.get("reflect_node").structured
+    if structured:
+        answer = (
+            'If changes are needed, return JSON {"status": "REPLACED", "notes": "...", '
+            '"steps": [{"title": "...", "description": "..."}]}; '
+            'otherwise return {"status": "OK", "notes": "", "steps": []}.'
+        )
+    else:
+        answer = "If changes are needed, return an improved numbered list; otherwise return 'OK'."
+    header = (
         "You are the reflection module. Evaluate the plan below for completeness, safety issues, "
-        "missing steps, or ordering problems. If changes are needed, return an improved numbered list; "
-        "otherwise return 'OK'.\n\n"
-        f"Plan:\n{plan_text}\n"
+        f"missing steps, or ordering problems. {answer}\n\n"
+        "Plan:"
+    )
+    # every step is trimmed by the same share, so long descriptions cannot crowd out later steps
+    step_sections = [
+        PromptSection(s.id, f"{s.title} - {s.description}", priority=1, min_tokens=8, prefix=f"{s.id}. ")
+        for s in state.steps
+    ]
+    report = bindings.build_prompt_report(
+        "reflect_node", [PromptSection("header", header, required=True)] + step_sections, separator="\n"
     )
-    raw = bindings.llm(prompt)
+    step_ids = {s.id for s in state.steps}
+    dropped = [name for name in report.dropped if name in step_ids]
+    if dropped:
+        _skip_over_budget(state, bindings, dropped)
+        return None, structured
+    return f"{report.prompt}\n", structured
+
+
+def _skip_over_budget(state: PlannerState, bindings: PlannerBindings, dropped: List[str]) -> None:
+    reason = f"plan exceeds the prompt budget ({len(dropped)} of {len(state.steps)} steps would be dropped)"
+    state.context["reflection_gate"].update({"skipped": True, "reason": reason, "dropped_steps": dropped})
+    # _skip_reflection counted this as a run
+    bindings.reflection_stats["runs"] -= 1
+    bindings.reflection_stats["skipped"] += 1
+    state.reflection = {"status": "SKIPPED", "notes": reason}
+
+
+def _apply_text_reflection(state: PlannerState, raw: str) -> PlannerState:
     if raw.strip().upper() == "OK":
         state.reflection = {"status": "OK", "notes": ""}
         return state
@@ -47,3 +160,19 @@ def reflect_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState
         state.reflection = {"status": "UNKNOWN", "notes": raw[:512]}
 
     return state
+
+
+def _reflection_failed(state: PlannerState, error: StructuredOutputError) -> PlannerState:
+    # an unusable review keeps the existing plan
+    state.reflection = {"status": "UNKNOWN", "notes": str(error)[:512]}
+    return state
+
+
+def _apply_structured_reflection(state: PlannerState, result: Dict[str, Any]) -> PlannerState:
+    if result["status"] == "REPLACED":
+        state.steps = result["steps"]
+        state.current_index = 0
+        state.reflection = {"status": "REPLACED", "notes": result["notes"] or "Plan updated by reflection"}
+    else:
+        state.reflection = {"status": "OK", "notes": result["notes"]}
+    return state
@@ -1,26 +1,70 @@
 from __future__ import annotations
-from typing import Dict, Any, Optional
+import functools
+from typing import Dict, Any, List, Optional
 from ..core.state import PlannerState
-from ..core.graph import PlannerBindings
-from ..core.errors import MissingBindingError
+from ..core.graph import PlannerBindings, node_io
+from ..core.errors import MissingBindingError, StructuredOutputError
+from ..core.prompt_budget import PromptSection
+from ..core.router import BatchChooser, route_steps
+from ..core.structured import ROUTES_SCHEMA, parse_routes
 
 
+@node_io(reads=("steps", "current_index"), writes=("selected_worker", "steps.routing"))
 def route_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
     """
-    Routing node: chooses worker for the plan. If an external Router/worker selector is bound
-    (planner_main will register it via graph.bindings.dispatch or via planner_main.register_worker_selector),
-    this function will call it. Otherwise it will raise MissingBindingError to indicate inert planner.
+    Routing node: chooses a worker for every step in one pass (step.routing["worker"]).
+    Steps are matched against bindings.capability_index first; only ambiguous steps go to
+    the external worker selector (bindings.dispatch, registered by planner_main), or, without
+    one, to a single structured LLM call choosing among the indexed workers.
+    Without an index or a selector it raises MissingBindingError to indicate inert planner.
+    state.selected_worker is the worker of the current step.
     """
-
-    if bindings.dispatch is None:
+    index = bindings.capability_index
+    if bindings.dispatch is None and index is None:
         raise MissingBindingError("Dispatch/worker selector binding not set for route_node")
 
     if state.current_index is None:
         return state
 
-    step = state.steps[state.current_index]
-    step_dict = {"id": step.id, "title": step.title, "description": step.description}
-    worker = bindings.dispatch(state, step_dict)
-    state.selected_worker = worker
-    step.routing["worker"] = worker
+    chooser = _llm_chooser(bindings) if index is not None and bindings.llm is not None else None
+    route_steps(state, state.steps, index, bindings.dispatch, chooser)
+    state.selected_worker = state.steps[state.current_index].routing.get("worker")
     return state
+
+
+def _llm_chooser(bindings: PlannerBindings) -> Optional[BatchChooser]:
+    index = bindings.capability_index
+    if not len(index):
+        return None
+
+    def choose(state: PlannerState, ambiguous: List[Any]) -> Dict[str, str]:
+        workers = "\n".join(f"- {wid} ({index.describe(wid)})" for wid in index.workers)
+        step_sections = [
+            PromptSection(
+                step.id,
+                f"{step.title} - {step.description}"
+                + (f" (likely: {', '.join(wid for wid, _ in candidates[:3])})" if candidates else ""),
+                priority=1, min_tokens=8, prefix=f"{step.id}. ",
+            )
+            for step, candidates in ambiguous
+        ]
+        prompt = bindings.build_prompt("route_node", [
+            PromptSection("instructions", "Assign each step to the worker best able to execute it.", required=True),
+            PromptSection("workers", workers, required=True, prefix="Workers:\n"),
+            PromptSection("steps_header", "Steps:", required=True),
+            *step_sections,
+            PromptSection(
+                "format", 'Return JSON only: {"routes": [{"step": "<step id>", "worker": "<worker id>"}]}',
+                required=True,
+            ),
+        ], separator="\n")
+        try:
+            return bindings.call_structured(
+                "route_node", prompt, "step_routes", ROUTES_SCHEMA,
+                functools.partial(parse_routes, workers=index.workers), user_id=state.user_id,
+            )
+        except StructuredOutputError:
+            # unparseable answer: route_steps falls back to the best index candidate
+            return {}
+
+    return choose
@@ -0,0 +1,20 @@
+from __future__ import annotations
+from ..core.state import PlannerState
+from ..core.graph import PlannerBindings, node_io
+
+
+@node_io(reads=("goal",), writes=("context.safety_precheck",))
+def safety_precheck_node(state: PlannerState, bindings: PlannerBindings) -> PlannerState:
+    """
+    Safety pre-check of the raw goal. Declared independent of intent/decomposition,
+    so it runs concurrently with the first LLM call.
+    Optional: without a safety binding the node does nothing.
+    Contract:
+      - bindings.safety(goal, {"user_id", "workflow_id"}) -> any result
+      - the result is stored in state.context["safety_precheck"]; callers decide whether to act on it
+    """
+    if bindings.safety is None:
+        return state
+    result = bindings.safety(state.goal, {"user_id": state.user_id, "workflow_id": state.workflow_id})
+    state.context["safety_precheck"] = result
+    return state
@@ -1,14 +1,39 @@
 from __future__ import annotations
-from typing import Callable, Optional, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, Optional, Dict, Any, List, Set
+import asyncio
+import json
+import logging
 from .core.graph import SimpleGraphPlanner, PlannerBindings
-from .core.state import PlannerState
+from .core.state import PlannerState, Step
 from .nodes.intent_node import intent_node
 from .nodes.decompose_node import decompose_node
 from .nodes.reflect_node import reflect_node
 from .nodes.route_node import route_node
 from .nodes.finalize_node import finalize_node
+from .nodes.fused_plan_node import fused_plan_node
+from .nodes.safety_node import safety_precheck_node
 from .core.router import Router
-from .core.errors import MissingBindingError
+from .core.capability_index import CapabilityIndex
+from .core.profiles import NodeProfile, ProfileRegistry
+from .core.prompt_budget import PromptBudget
+from .core.errors import CodecError, MissingBindingError
+from .core.plan_cache import PlanCache
+from .core.codec import dumps_state, loads_state
+from .core.batch import DEFAULT_BATCH_CONCURRENCY, BatchReport, WorkflowOutcome, run_batch
+
+logger = logging.getLogger("layer1.planner")
+
+# bump when node prompts / parsing change so cached plans from older code are not served
+PLAN_CACHE_VERSION = "1"
+
+# planning pipelines: nodes run by plan_workflow, ordered by their @node_io declarations
+# (the safety pre-check runs concurrently with intent extraction / fused planning)
+PIPELINES = {
+    # intent, decomposition and reflection as three LLM round trips
+    "graph": (safety_precheck_node, intent_node, decompose_node, reflect_node, route_node, finalize_node),
+    # one structured LLM call; falls back to the graph nodes when the answer fails validation
+    "fused": (safety_precheck_node, fused_plan_node, route_node, finalize_node),
+}
 
 
 class Layer1Planner:
@@ -24,27 +49,143 @@ class Layer1Planner:
 
       state = planner.create_workflow(user_id="alice", goal="Deploy backend", context={})
       state = planner.plan_workflow(state)
+      state = await planner.plan_workflow_async(state)  # after planner.register_allm(my_async_llm)
+      report = planner.plan_workflows(states, max_concurrency=8, timeout=120)  # batch of goals
+
+    pipeline="fused" plans with a single structured LLM call instead of three
+    (see PIPELINES); set_pipeline() switches at runtime.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        profiles: Optional[ProfileRegistry] = None,
+        prompt_budget: Optional[PromptBudget] = None,
+        pipeline: str = "graph",
+    ):
         self._engine = SimpleGraphPlanner()
         self._router = Router()
-        self._engine.register_node(intent_node)
-        self._engine.register_node(decompose_node)
-        self._engine.register_node(reflect_node)
-        self._engine.register_node(route_node)
-        self._engine.register_node(finalize_node)
+        self._profiles = profiles or ProfileRegistry.planner_defaults()
+        self._engine.bindings.profiles = self._profiles
+        if prompt_budget is not None:
+            self._engine.bindings.prompt_budget = prompt_budget
+        self._pipeline = ""
+        self._plan_cache: Optional[PlanCache] = None
+        self._model_version = ""
+        self._checkpoints: Optional[Any] = None
+        self._checkpoint_ttl: Optional[int] = None
+        self.set_pipeline(pipeline)
+
+    def set_pipeline(self, pipeline: str) -> None:
+        """Select the planning pipeline: "graph" (three LLM calls) or "fused" (one call, graph fallback)."""
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown planner pipeline {pipeline!r}; expected one of {sorted(PIPELINES)}")
+        self._engine.set_nodes(PIPELINES[pipeline])
+        self._pipeline = pipeline
+
+    def get_pipeline(self) -> str:
+        return self._pipeline
+
+    def register_node(self, node_fn: Callable[..., PlannerState], **io: Any) -> None:
+        """
+        Add a node to the current pipeline (until the next set_pipeline()).
+        io: name / reads / writes / after, overriding the node's @node_io declaration;
+        undeclared nodes run after all current nodes.
+        """
+        self._engine.register_node(node_fn, **io)
+
+    def get_waves(self) -> List[List[str]]:
+        """Node names grouped into the waves that run concurrently."""
+        return self._engine.waves()
 
     def register_llm(self, llm_callable: Callable[[str], str]) -> None:
         """Register an LLM callable: llm(prompt)->str"""
         self._engine.bind_llm(llm_callable)
 
+    def register_allm(self, allm_callable: Callable[..., Any]) -> None:
+        """Register an async LLM callable: await allm(prompt)->str, used by plan_workflow_async."""
+        self._engine.bind_allm(allm_callable)
+
+    def register_reasoning(
+        self,
+        answer_complete: Optional[Callable[[str], bool]] = None,
+        call_state_factory: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        """
+        Hooks for a reasoning-aware LLM engine (Layer1LLMEngine with ReasoningConfig):
+        - answer_complete(answer) -> True ends generation of a JSON answer (intent, structured
+          decompose / reflect / fused) as soon as the object is closed
+        - call_state_factory(prompt) -> LLMCallState passed as call_state=; its metadata
+          (thinking, thinking_tokens, thinking_truncated) lands in state.context["reasoning"][node]
+        """
+        self._engine.bindings.answer_complete = answer_complete
+        self._engine.bindings.call_state_factory = call_state_factory
+
+    def set_node_profile(self, node_name: str, profile: NodeProfile) -> None:
+        """Set model / max_tokens / temperature / stop sequences used by one node's LLM call."""
+        self._profiles.register(node_name, profile)
+
+    def use_fast_model(self, model: str, nodes: tuple = ("intent_node", "reflect_node")) -> None:
+        """Route cheap nodes to a smaller model; decomposition keeps the default (large) model."""
+        self._profiles.set_model(model, nodes)
+
+    def set_reflection_threshold(self, threshold: Optional[float]) -> None:
+        """
+        Run reflect_node only for plans scoring below threshold on the local quality check
+        (or high-risk goals); 0 skips every low-risk review, None always reflects.
+        """
+        self._engine.bindings.reflection_threshold = threshold
+
+    def reflection_stats(self) -> Dict[str, int]:
+        """How often reflect_node called the LLM vs. skipped it."""
+        return dict(self._engine.bindings.reflection_stats)
+
+    def get_profiles(self) -> ProfileRegistry:
+        return self._profiles
+
+    def get_prompt_budget(self) -> PromptBudget:
+        """Prompt-token budget shared by all nodes (set tokenizer/summarizer or max_tokens here)."""
+        return self._engine.bindings.prompt_budget
+
+    def bind_plan_cache(self, cache: Optional[PlanCache], model_version: str = "") -> None:
+        """
+        Serve repeated goals from a PlanCache (None disables it). model_version should name
+        the backing model so switching models does not reuse old plans.
+        """
+        self._plan_cache = cache
+        self._model_version = model_version
+
+    def plan_cache_key(self, goal: str, context: Optional[Dict[str, Any]] = None) -> str:
+        """Cache key for a goal: normalized goal + worker_type + planner/model version."""
+        version = "|".join([
+            PLAN_CACHE_VERSION,
+            self._pipeline,
+            self._model_version,
+            json.dumps(self._profiles.as_dict(), sort_keys=True),
+        ])
+        return PlanCache.make_key(goal, (context or {}).get("worker_type"), version)
+
+    def bind_checkpoints(self, state_manager: Any, ttl: Optional[int] = 24 * 3600) -> None:
+        """
+        Persist PlannerState after every wave through state_manager.set_checkpoint /
+        get_checkpoint (StateManagerFacade), so step_workflow can resume after a crash.
+        """
+        self._checkpoints = state_manager
+        self._checkpoint_ttl = ttl
+
+    def invalidate_plan(self, goal: str, context: Optional[Dict[str, Any]] = None) -> None:
+        """Drop the cached plan for goal (and context["worker_type"])."""
+        if self._plan_cache is not None:
+            self._plan_cache.invalidate(self.plan_cache_key(goal, context))
+
+    def plan_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._plan_cache.stats() if self._plan_cache is not None else None
+
     def register_memory(self, memory_callable: Callable[..., Any]) -> None:
         """Register a memory callable; not used by base planner nodes yet, available for future use."""
         self._engine.bind_memory(memory_callable)
 
     def register_safety(self, safety_callable: Callable[..., Any]) -> None:
-        """Register a safety callable for future integration."""
+        """Register a safety callable: safety(goal, info) -> result, stored in context["safety_precheck"]."""
         self._engine.bind_safety(safety_callable)
 
     def register_dispatch(self, worker_selector: Callable[[PlannerState, Dict[str, Any]], str]) -> None:
@@ -55,6 +196,17 @@ class Layer1Planner:
         self._engine.bind_dispatch(worker_selector)
         self._router.register_selector(worker_selector)
 
+    def register_workers(self, workers: Dict[str, Dict[str, Any]], **index_options: Any) -> CapabilityIndex:
+        """
+        Build a capability index from worker configs ({worker_id: {"worker_type", "capabilities", ...}},
+        e.g. Layer2Main.workers) used by route_node / Router.route_steps to route all steps in one pass.
+        Call again whenever workers change.
+        """
+        index = CapabilityIndex(workers, **index_options)
+        self._engine.bindings.capability_index = index
+        self._router.register_capability_index(index)
+        return index
+
     def create_workflow(self, user_id: str, goal: str, context: Optional[Dict[str, Any]] = None) -> PlannerState:
         """
         Create an initial PlannerState; does not run nodes.
@@ -63,27 +215,309 @@ class Layer1Planner:
         st.status = "CREATED"
         return st
 
-    def plan_workflow(self, state: PlannerState) -> PlannerState:
+    def plan_workflow(
+        self, state: PlannerState, use_cache: bool = True, on_step: Optional[Callable[[Step], None]] = None
+    ) -> PlannerState:
         """
         Execute the full planner pipeline (all nodes).
         If required bindings are missing (LLM, dispatch, etc.), planner will return state.status == 'AWAITING_BINDINGS'
         and will not produce a real plan.
+        With a plan cache bound, a cached plan for the same goal is returned as PLANNED
+        without any LLM call; use_cache=False forces re-planning (the result is still cached).
+        With checkpoints bound, progress is saved after every wave (see step_workflow).
+        on_step(step) receives every planned Step once: if the llm binding accepts on_delta(text)
+        (Layer1LLMEngine.llm does) decompose_node emits each step as soon as the model has finished
+        writing it, so callers can start on early steps; steps not streamed (plan-cache hits, the
+        fused pipeline) follow when planning ends. Streamed steps precede reflect_node; if
+        reflection replaces the plan (state.reflection["status"] == "REPLACED") state.plan is
+        authoritative.
+        Streamed steps reach on_step in order on a planner thread, outside the call's LLM slot,
+        so on_step may itself call the LLM. Only decompose_node streams: with the "fused"
+        pipeline every step arrives when planning ends.
         """
+        if on_step is not None:
+            emitted = self._bind_step_sink(state, on_step)
+            try:
+                state = self.plan_workflow(state, use_cache=use_cache)
+            finally:
+                self._engine.bindings.step_sinks.pop(state.workflow_id, None)
+            self._emit_remaining(state, emitted, on_step)
+            return state
+        cached = self._cached_plan(state) if use_cache else None
+        if cached is not None:
+            return cached
         try:
-            return self._engine.run_full_plan(state)
+            state = self._engine.run_full_plan(state, on_wave=self._checkpoint_hook())
         except MissingBindingError:
             state.status = "AWAITING_BINDINGS"
             return state
+        self._cache_plan(state)
+        return state
 
-    def step_workflow(self, state: PlannerState) -> PlannerState:
+    async def plan_workflow_async(
+        self, state: PlannerState, use_cache: bool = True, on_step: Optional[Callable[[Step], None]] = None
+    ) -> PlannerState:
         """
-        Run nodes incrementally (alias to plan_workflow for now).
-        Provided for future granularity (run node-by-node).
+        Async plan_workflow for event-loop callers: built-in nodes await the async LLM
+        binding (register_allm; a sync llm binding runs in an executor) and other sync
+        nodes run on the planner's thread pool, so many workflows can plan concurrently.
+        on_step as in plan_workflow (streams through the allm binding's on_delta).
         """
-        return self.plan_workflow(state)
+        if on_step is not None:
+            emitted = self._bind_step_sink(state, on_step)
+            try:
+                state = await self.plan_workflow_async(state, use_cache=use_cache)
+            finally:
+                self._engine.bindings.step_sinks.pop(state.workflow_id, None)
+            self._emit_remaining(state, emitted, on_step)
+            return state
+        cached = await self._acached_plan(state) if use_cache else None
+        if cached is not None:
+            return cached
+        try:
+            state = await self._engine.run_full_plan_async(state, on_wave=self._acheckpoint_hook())
+        except MissingBindingError:
+            state.status = "AWAITING_BINDINGS"
+            return state
+        await self._acache_plan(state)
+        return state
+
+    async def stream_workflow(self, state: PlannerState, use_cache: bool = True) -> AsyncIterator[Step]:
+        """
+        Plan like plan_workflow_async, yielding each Step as it is emitted (see on_step).
+        state is updated in place; planning errors are raised after the last step.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def on_step(step: Step) -> None:
+            # nodes may run on the planner's thread pool
+            loop.call_soon_threadsafe(queue.put_nowait, step)
+
+        task = asyncio.ensure_future(self.plan_workflow_async(state, use_cache=use_cache, on_step=on_step))
+        task.add_done_callback(lambda _: loop.call_soon_threadsafe(queue.put_nowait, done))
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def plan_workflows_async(
+        self,
+        states: List[PlannerState],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[WorkflowOutcome], None]] = None,
+        use_cache: bool = True,
+    ) -> BatchReport:
+        """
+        Plan a batch of workflows concurrently (plan_workflow_async each).
+        - at most max_concurrency workflows are in flight; their LLM calls still go through
+          the engine's LLMScheduler, so the configured LLM slot limit is never exceeded
+        - timeout (seconds) is per workflow; failed / timed-out workflows are reported,
+          never raised, and resume with step_workflow when checkpoints are bound
+        - on_result(outcome) fires as each workflow finishes (partial results)
+        Returns a BatchReport: outcomes in input order, summary() with throughput / failures.
+        """
+        return await run_batch(
+            lambda state: self.plan_workflow_async(state, use_cache=use_cache),
+            states, max_concurrency=max_concurrency, timeout=timeout, on_result=on_result,
+        )
+
+    def plan_workflows(
+        self,
+        states: List[PlannerState],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        timeout: Optional[float] = None,
+        on_result: Optional[Callable[[WorkflowOutcome], None]] = None,
+        use_cache: bool = True,
+    ) -> BatchReport:
+        """Blocking plan_workflows_async for non-async callers (queue consumers, nightly jobs)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("plan_workflows() called from a running event loop; await plan_workflows_async()")
+        return asyncio.run(self.plan_workflows_async(
+            states, max_concurrency=max_concurrency, timeout=timeout, on_result=on_result, use_cache=use_cache
+        ))
+
+    def step_workflow(self, state: PlannerState, max_waves: Optional[int] = None) -> PlannerState:
+        """
+        Run nodes incrementally, resuming after the last completed node.
+        - Nodes in state.completed_nodes are skipped, so a retry after an error, timeout or
+          AWAITING_BINDINGS never repeats finished LLM work
+        - With checkpoints bound (bind_checkpoints) the state is saved after every wave and a
+          newer checkpoint for the same workflow_id is resumed, also after a process restart
+        - max_waves runs at most that many waves and leaves status 'PLANNING' if nodes remain
+        """
+        state = self._resume_state(state)
+        cached = self._cached_plan(state) if not state.completed_nodes else None
+        if cached is not None:
+            return cached
+        try:
+            state = self._engine.run_full_plan(
+                state, resume=True, max_waves=max_waves, on_wave=self._checkpoint_hook()
+            )
+        except MissingBindingError:
+            state.status = "AWAITING_BINDINGS"
+            return state
+        self._cache_plan(state)
+        return state
+
+    async def step_workflow_async(self, state: PlannerState, max_waves: Optional[int] = None) -> PlannerState:
+        """Async step_workflow."""
+        state = await self._aresume_state(state)
+        cached = await self._acached_plan(state) if not state.completed_nodes else None
+        if cached is not None:
+            return cached
+        try:
+            state = await self._engine.run_full_plan_async(
+                state, resume=True, max_waves=max_waves, on_wave=self._acheckpoint_hook()
+            )
+        except MissingBindingError:
+            state.status = "AWAITING_BINDINGS"
+            return state
+        await self._acache_plan(state)
+        return state
+
+    def resume_workflow(self, workflow_id: str) -> Optional[PlannerState]:
+        """
+        Last checkpointed state of a workflow (e.g. after a restart); pass it to step_workflow.
+        A checkpoint written under another pipeline is ignored (None).
+        """
+        if self._checkpoints is None:
+            return None
+        try:
+            checkpoint = self._checkpoints.get_checkpoint(self._checkpoint_key(workflow_id))
+        except Exception as e:
+            logger.warning("planner checkpoint load failed for %s: %s", workflow_id, e)
+            return None
+        if not checkpoint:
+            return None
+        pipeline = checkpoint.get("pipeline")
+        if pipeline is not None and pipeline != self._pipeline:
+            # completed_nodes name another pipeline's nodes; resuming would skip the wrong work
+            logger.warning(
+                "planner checkpoint for %s was written by pipeline %r, not %r; ignored",
+                workflow_id, pipeline, self._pipeline,
+            )
+            return None
+        if "blob" in checkpoint:
+            try:
+                return loads_state(checkpoint["blob"])
+            except CodecError as e:
+                logger.warning("planner checkpoint for %s is unreadable: %s", workflow_id, e)
+                return None
+        # checkpoints written before the codec
+        return PlannerState.from_dict(checkpoint["state"]) if "state" in checkpoint else None
 
     def get_router(self) -> Router:
         return self._router
+
+    # ----------------- step streaming -----------------
+    def _bind_step_sink(self, state: PlannerState, on_step: Callable[[Step], None]) -> Set[str]:
+        emitted: Set[str] = set()
+
+        def sink(step: Step) -> None:
+            emitted.add(step.id)
+            on_step(step)
+
+        self._engine.bindings.step_sinks[state.workflow_id] = sink
+        return emitted
+
+    @staticmethod
+    def _emit_remaining(state: PlannerState, emitted: Set[str], on_step: Callable[[Step], None]) -> None:
+        if state.status not in ("PLANNED", "AWAITING_BINDINGS"):
+            return
+        for step in state.steps:
+            if step.id not in emitted:
+                on_step(step)
+
+    # ----------------- checkpoints -----------------
+    @staticmethod
+    def _checkpoint_key(workflow_id: str) -> str:
+        return f"planner:{workflow_id}"
+
+    def _checkpoint_hook(self) -> Optional[Callable[[PlannerState], None]]:
+        return self._save_checkpoint if self._checkpoints is not None else None
+
+    def _save_checkpoint(self, state: PlannerState) -> None:
+        # a lost checkpoint only costs a resume; never fail planning because of it
+        try:
+            self._checkpoints.set_checkpoint(
+                self._checkpoint_key(state.workflow_id),
+                {"pipeline": self._pipeline, "blob": dumps_state(state)},
+                self._checkpoint_ttl,
+            )
+        except Exception as e:
+            logger.warning("planner checkpoint save failed for %s: %s", state.workflow_id, e)
+
+    def _acheckpoint_hook(self) -> Optional[Callable[[PlannerState], Awaitable[None]]]:
+        # async runs: the Redis write (and encoding) happen on a worker thread between waves
+        if self._checkpoints is None:
+            return None
+
+        async def save(state: PlannerState) -> None:
+            await asyncio.get_running_loop().run_in_executor(None, self._save_checkpoint, state)
+
+        return save
+
+    def _resume_state(self, state: PlannerState) -> PlannerState:
+        saved = self.resume_workflow(state.workflow_id)
+        if saved is not None and len(saved.completed_nodes) > len(state.completed_nodes):
+            return saved
+        return state
+
+    async def _aresume_state(self, state: PlannerState) -> PlannerState:
+        if self._checkpoints is None:
+            return state
+        return await asyncio.get_running_loop().run_in_executor(None, self._resume_state, state)
+
+    # ----------------- plan cache -----------------
+    def _cached_plan(self, state: PlannerState) -> Optional[PlannerState]:
+        if self._plan_cache is None:
+            return None
+        cached = self._plan_cache.get(self.plan_cache_key(state.goal, state.context))
+        return self._plan_from_cache(state, cached) if cached is not None else None
+
+    async def _acached_plan(self, state: PlannerState) -> Optional[PlannerState]:
+        # the cache lookup and routing of a hit (which may call the LLM) are blocking
+        if self._plan_cache is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(None, self._cached_plan, state)
+
+    def _cache_plan(self, state: PlannerState) -> None:
+        # AWAITING_BINDINGS after planning still holds a complete plan (only routing is missing)
+        if self._plan_cache is not None and state.steps and state.status in ("PLANNED", "AWAITING_BINDINGS"):
+            self._plan_cache.set(self.plan_cache_key(state.goal, state.context), state.steps, state.reflection)
+
+    async def _acache_plan(self, state: PlannerState) -> None:
+        # PlanCache.set is a blocking Redis write
+        if self._plan_cache is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._cache_plan, state)
+
+    def _plan_from_cache(self, state: PlannerState, cached: Dict[str, Any]) -> PlannerState:
+        state.steps = cached["steps"]
+        state.current_index = 0 if state.steps else None
+        state.reflection = cached.get("reflection")
+        state.context["plan_cache"] = {"hit": True}
+        bindings = self._engine.bindings
+        # the goal is checked on every request, cached plan or not (no-op without a safety binding)
+        state = safety_precheck_node(state, bindings)
+        # same condition as route_node: a capability index alone (Layer2) is enough to route
+        if bindings.dispatch is not None or bindings.capability_index is not None:
+            state = route_node(state, bindings)
+        state = finalize_node(state, bindings)
+        state.touch()
+        return state
     
     def create_worker_blueprint(self, task: str) -> Dict[str, Any]:
         """Create worker blueprint from task analysis"""
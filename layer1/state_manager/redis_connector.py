@@ -7,6 +7,7 @@ class RedisConnector:
     """
     Raw Redis connection wrapper.
     Handles JSON serialization/deserialization and TTL.
+    set_raw / get_raw store already-encoded strings (e.g. planner codec blobs) as-is.
     """
 
     def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, decode_responses: bool = True):
@@ -25,6 +26,15 @@ class RedisConnector:
             return None
         return json.loads(val)
 
+    def set_raw(self, key: str, value: str, ttl: Optional[int] = None):
+        if ttl:
+            self.client.setex(key, ttl, value)
+        else:
+            self.client.set(key, value)
+
+    def get_raw(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
     def delete(self, key: str):
         self.client.delete(key)
 
@@ -43,6 +43,14 @@ class StateManagerFacade:
     def get_checkpoint(self, key: str) -> Optional[Dict[str, Any]]:
         return self.redis.get_json(f"checkpoint:{key}")
 
+    # ---------------- State Snapshots ----------------
+    def set_state_snapshot(self, workflow_id: str, blob: str, ttl: Optional[int] = None):
+        """Store an encoded PlannerState (planner.core.codec.dumps_state) without JSON wrapping."""
+        self.redis.set_raw(f"workflow:{workflow_id}:snapshot", blob, ttl)
+
+    def get_state_snapshot(self, workflow_id: str) -> Optional[str]:
+        return self.redis.get_raw(f"workflow:{workflow_id}:snapshot")
+
     # ---------------- Pub/Sub ----------------
     def publish_event(self, channel: str, message: str):
         self.redis.publish(channel, message)
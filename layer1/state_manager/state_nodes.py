@@ -1,10 +1,11 @@
 from __future__ import annotations
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from planner.core.state import PlannerState
+from planner.core.codec import dumps_state, loads_state
 from .state_facade import StateManagerFacade
 
 
@@ -32,3 +33,21 @@ def save_checkpoint_node(state: PlannerState, key: str, checkpoint: Dict[str, An
     """
     facade.set_checkpoint(key, checkpoint)
     return state
+
+
+def save_state_snapshot_node(
+    state: PlannerState, facade: StateManagerFacade, ttl: Optional[int] = None
+) -> PlannerState:
+    """
+    Node that stores the full PlannerState in Redis (compact versioned codec).
+    """
+    facade.set_state_snapshot(state.workflow_id, dumps_state(state), ttl)
+    return state
+
+
+def load_state_snapshot(workflow_id: str, facade: StateManagerFacade) -> Optional[PlannerState]:
+    """
+    Inverse of save_state_snapshot_node; None if no snapshot is stored.
+    """
+    blob = facade.get_state_snapshot(workflow_id)
+    return loads_state(blob) if blob else None
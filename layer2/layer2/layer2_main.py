@@ -10,9 +10,13 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from layer1.memory.redis_memory import RedisMemory
 from layer1.memory.memory_facade import MemoryFacade
-from layer1.llm_engine.llm_connector import LMStudioConnector
+from layer1.llm_engine.balancer import create_lmstudio_connector
+from layer1.llm_engine.resilience import ResilientConnector
+from layer1.llm_engine.transcript import RecordingConnector, ReplayConnector, TranscriptStore
+from layer1.llm_engine.scheduler import LLMScheduler, Priority
 from layer1.planner.planner_main import Layer1Planner
 from layer1.planner.core.state import PlannerState
+from layer1.planner.core.prompt_budget import PromptBudget, PromptSection
 
 
 class Layer2Main:
@@ -26,15 +30,37 @@ class Layer2Main:
         layer1_planner: Optional[Layer1Planner] = None,
         layer3_mcp=None,
         layer4_safety=None,
-        layer5_audit=None
+        layer5_audit=None,
+        llm_scheduler: Optional[LLMScheduler] = None
     ):
         # Configuration
         self.lmstudio_base_url = lmstudio_base_url or os.getenv("LMSTUDIO_BASE_URL", "http://127.0.0.1:1234")
         redis_host = redis_host or os.getenv("REDIS_HOST", "localhost")
         redis_port = redis_port or int(os.getenv("REDIS_PORT", "6379"))
         
-        # Initialize LLM (shared across all workers)
-        self.llm_connector = LMStudioConnector(base_url=self.lmstudio_base_url)
+        # Initialize LLM (shared across all workers; comma-separated URLs are load-balanced)
+        # LLM_REPLAY_PATH serves a recorded transcript, LLM_RECORD_PATH records one
+        replay_path = os.getenv("LLM_REPLAY_PATH")
+        record_path = os.getenv("LLM_RECORD_PATH")
+        if replay_path:
+            connector = ReplayConnector(
+                replay_path, simulate_latency=os.getenv("LLM_REPLAY_SIMULATE_LATENCY", "0") == "1"
+            )
+        else:
+            connector = create_lmstudio_connector(self.lmstudio_base_url)
+        # record outside the retry wrapper (as Layer-1 does): one entry per answered call,
+        # not one per attempt or hedge
+        connector = ResilientConnector(connector)
+        if record_path:
+            connector = RecordingConnector(connector, TranscriptStore.shared(record_path))
+        self.llm_connector = connector
+        # Share Layer-1's scheduler so worker LLM tasks queue behind interactive/planning calls
+        self.llm_scheduler = llm_scheduler or LLMScheduler(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        )
+        
+        # Prompt-token budget for direct LLM tasks (context is trimmed to fit)
+        self.prompt_budget = PromptBudget(max_tokens=2048)
         
         # Initialize Redis memory (shared short-term memory like Layer-1)
         self.redis_memory = RedisMemory(host=redis_host, port=redis_port)
@@ -46,8 +72,9 @@ class Layer2Main:
         if layer1_planner:
             self.planner = layer1_planner
         else:
-            self.planner = Layer1Planner()
+            self.planner = Layer1Planner(pipeline=os.getenv("PLANNER_PIPELINE", "fused"))
             self.planner.register_llm(self.llm_connector.llm)
+            self.planner.register_allm(self.llm_connector.allm)
             self.planner.register_memory(self.memory_facade)
         
         # Layer integrations
@@ -60,8 +87,9 @@ class Layer2Main:
         self.worker_configs_dir = Path(__file__).parent / "workers"
         self.worker_configs_dir.mkdir(exist_ok=True)
         
-        # Load existing workers
+        # Load existing workers (and index their capabilities for planner step routing)
         self._load_workers()
+        self.planner.register_workers(self.workers)
         
         print("[Layer-2] Worker Orchestration initialized")
         print(f"[Layer-2] LLM: {self.lmstudio_base_url}")
@@ -120,6 +148,7 @@ class Layer2Main:
         
         # Register in memory
         self.workers[worker_id] = worker_config
+        self.planner.register_workers(self.workers)
         
         print(f"[Layer-2] Created worker: {worker_id} ({worker_type})")
         return worker_config
@@ -150,8 +179,8 @@ class Layer2Main:
                     context={"worker_type": worker_config["worker_type"], **context}
                 )
                 
-                # Plan workflow (runs through all planner nodes)
-                state = self.planner.plan_workflow(state)
+                # Plan workflow (runs through all planner nodes without blocking the event loop)
+                state = await self.planner.plan_workflow_async(state)
                 
                 # Extract steps from plan
                 if state.status == "PLANNED" and state.steps:
@@ -200,7 +229,8 @@ class Layer2Main:
                 "plan_steps": [{
                     "id": s.id,
                     "title": s.title,
-                    "description": s.description
+                    "description": s.description,
+                    "worker": s.routing.get("worker")
                 } for s in plan_steps] if plan_steps else None
             }
             
@@ -341,15 +371,23 @@ class Layer2Main:
         """Execute task using LLM"""
         try:
             model_config = worker_config.get("model_config", {})
-            prompt = f"Task: {task}\nContext: {context}\nExecute this task and provide the result."
-            
-            response = self.llm_connector.llm(
-                prompt,
-                max_tokens=model_config.get("max_tokens", 2048),
-                temperature=model_config.get("temperature", 0.7)
+            sections = [PromptSection("task", task, required=True, prefix="Task: ")]
+            sections += self.prompt_budget.context_sections(context)
+            sections.append(PromptSection("instruction", "Execute this task and provide the result.", required=True))
+            budget = self.prompt_budget.build(
+                sections, max_tokens=model_config.get("max_prompt_tokens"), separator="\n"
             )
+            prompt = budget.prompt
+            
+            user = context.get("user_id") or worker_config.get("worker_id")
+            async with self.llm_scheduler.aslot(Priority.BACKGROUND, user):
+                response = await self.llm_connector.allm(
+                    prompt,
+                    max_tokens=model_config.get("max_tokens", 2048),
+                    temperature=model_config.get("temperature", 0.7)
+                )
             
-            return {"success": True, "response": response}
+            return {"success": True, "response": response, "prompt_tokens_saved": budget.saved}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -376,6 +414,7 @@ class Layer2Main:
             if config_file.exists():
                 config_file.unlink()
             del self.workers[worker_id]
+            self.planner.register_workers(self.workers)
             print(f"[Layer-2] Deleted worker: {worker_id}")
             return True
         return False
@@ -398,7 +437,8 @@ def create_layer2(
     layer1_planner: Optional[Layer1Planner] = None,
     layer3_mcp=None,
     layer4_safety=None,
-    layer5_audit=None
+    layer5_audit=None,
+    llm_scheduler: Optional[LLMScheduler] = None
 ) -> Layer2Main:
     """Create and initialize Layer-2"""
     return Layer2Main(
@@ -408,5 +448,6 @@ def create_layer2(
         layer1_planner,
         layer3_mcp,
         layer4_safety,
-        layer5_audit
+        layer5_audit,
+        llm_scheduler
     )
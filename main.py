@@ -6,6 +6,7 @@ Just run: python main.py
 """
 
 import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -16,6 +17,9 @@ from layer2.layer2.layer2_main import create_layer2
 from layer4.layer4.layer4_main import create_layer4
 from layer5.layer5.layer5_main import create_layer5
 
+# One URL or a comma-separated list of LM Studio endpoints (load-balanced)
+LMSTUDIO_BASE_URL = os.getenv("LMSTUDIO_BASE_URL", "http://192.168.1.6:1234")
+
 
 class UniversalAISystem:
     """Main system integrating all 5 layers"""
@@ -28,7 +32,7 @@ class UniversalAISystem:
         # Initialize all layers
         print("\n[INIT] Layer-1: Planner + Memory + LLM...")
         self.layer1 = Layer1Main(
-            lmstudio_base_url="http://192.168.1.6:1234",
+            lmstudio_base_url=LMSTUDIO_BASE_URL,
             redis_host="localhost",
             redis_port=6379
         )
@@ -48,13 +52,14 @@ class UniversalAISystem:
         
         print("\n[INIT] Layer-2: Worker Orchestration...")
         self.layer2 = create_layer2(
-            lmstudio_base_url="http://192.168.1.6:1234",
+            lmstudio_base_url=LMSTUDIO_BASE_URL,
             redis_host="localhost",
             redis_port=6379,
             layer1_planner=self.layer1.planner,
             layer3_mcp=self.layer3,
             layer4_safety=self.layer4,
-            layer5_audit=self.layer5
+            layer5_audit=self.layer5,
+            llm_scheduler=self.layer1.llm_scheduler
         )
         print("✅ Layer-2 ready")
         
@@ -236,6 +241,65 @@ class UniversalAISystem:
         
         return result
     
+    async def stream_answer(self, question: str):
+        """Stream an LLM answer to the console as tokens arrive"""
+        from layer1.llm_engine.llm_state import LLMCallState
+        
+        call_state = LLMCallState.new(question, {"source": "cli"})
+        print("\n[LLM] ", end="", flush=True)
+        deltas = self.layer1.llm_engine.astream(
+            question, call_state=call_state, node="cli", priority="interactive", user_id="cli"
+        )
+        async for delta in deltas:
+            print(delta, end="", flush=True)
+        print()
+        print(f"[LLM] TTFT: {call_state.time_to_first_token:.2f}s | "
+              f"{call_state.tokens_per_sec:.1f} tok/s | {call_state.completion_tokens} tokens")
+        return call_state
+    
+    def print_llm_stats(self):
+        """Print LLM telemetry: latency percentiles, throughput, per-node time, slow calls"""
+        engine = self.layer1.llm_engine
+        summary = engine.telemetry_summary()
+        print("\n[LLM STATS]")
+        print(f"  Calls: {summary['total_calls']} (window: {summary['window']}, cache hits: {summary['cache_hits']})")
+        print(f"  Latency: p50 {summary['latency_p50']:.2f}s | p90 {summary['latency_p90']:.2f}s | "
+              f"p99 {summary['latency_p99']:.2f}s | max {summary['latency_max']:.2f}s")
+        print(f"  Throughput: {summary['tokens_per_sec_avg']:.1f} tok/s avg | "
+              f"{summary['completion_tokens_total']} completion tokens")
+        for node, info in sorted(summary['nodes'].items(), key=lambda kv: -kv[1]['latency_total']):
+            print(f"  Node {node}: {info['calls']} calls | p50 {info['latency_p50']:.2f}s | "
+                  f"total {info['latency_total']:.1f}s")
+        for error, count in summary['errors'].items():
+            print(f"  Error {error}: {count}")
+        if engine.cache_stats():
+            print(f"  Cache: {engine.cache_stats()}")
+        if engine.coalesce_stats():
+            print(f"  Coalescing: {engine.coalesce_stats()}")
+        scheduler = engine.scheduler_stats()
+        if scheduler:
+            print(f"  Scheduler: {scheduler['active']}/{scheduler['max_concurrency']} slots busy | "
+                  f"queued {scheduler['queued']} (peak {scheduler['peak_queue_depth']})")
+            adaptive = scheduler['adaptive']
+            if adaptive:
+                print(f"    adaptive limit: {scheduler['max_concurrency']} "
+                      f"(range {adaptive['min_limit']}-{adaptive['max_limit']}, "
+                      f"target {adaptive['target_latency']:.0f}s, "
+                      f"+{adaptive['increases']}/-{adaptive['decreases']}, last p90 {adaptive['last_p90']:.2f}s)")
+            for name, info in scheduler['classes'].items():
+                print(f"    {name}: served {info['served']} | queued {info['queued']} | "
+                      f"wait p50 {info['wait_p50']:.2f}s p99 {info['wait_p99']:.2f}s")
+        plan_cache = self.layer1.planner.plan_cache_stats()
+        if plan_cache:
+            print(f"  Plan cache: {plan_cache['hits']} hits / {plan_cache['misses']} misses "
+                  f"({plan_cache['hit_rate']:.0%}) | {plan_cache['stores']} stored | {plan_cache['errors']} errors")
+        slow = list(engine.telemetry.slow_log)[-5:]
+        if slow:
+            print(f"  Slow calls (>{engine.telemetry.slow_threshold:.0f}s, last {len(slow)}):")
+            for entry in slow:
+                print(f"    {entry['latency']:.2f}s node={entry['node'] or '-'} "
+                      f"prompt={entry['prompt_chars']} chars {entry['error']}")
+    
     def _find_worker(self, worker_type: str):
         """Find worker by type"""
         for wid, worker in self.layer2.workers.items():
@@ -252,6 +316,7 @@ class UniversalAISystem:
         print("  Worker: open google.com | launch notepad | list files | echo hello")
         print("  Memory: remember <text> | recall | history | forget")
         print("  System: status | workers | policies | audit | health")
+        print("  LLM: ask <question> | stats")
         print("  Web3: authenticate | verify <hash> | sign <message>")
         print("  Admin: add-policy <rule> | enable-planner | reload")
         print("  Other: help | exit")
@@ -282,6 +347,8 @@ class UniversalAISystem:
                     print("  remember <text> - Store in memory")
                     print("  recall - Show recent memory")
                     print("  history - Show command history")
+                    print("  ask <question> - Stream an answer from the LLM")
+                    print("  stats - LLM latency/throughput telemetry")
                     print("  authenticate - Web3 wallet auth")
                     print("  verify <hash> - Verify execution")
                     print("  add-policy <rule> - Add safety rule")
@@ -360,6 +427,16 @@ class UniversalAISystem:
                     print("[MEMORY] Memory cleared (Redis TTL will expire)")
                     continue
                 
+                # LLM - Ask (streamed)
+                elif cmd.startswith('ask '):
+                    await self.stream_answer(user_input[4:].strip())
+                    continue
+                
+                # LLM - Telemetry
+                elif cmd == 'stats':
+                    self.print_llm_stats()
+                    continue
+                
                 # Web3 - Authenticate
                 elif cmd == 'authenticate':
                     print("\n[WEB3 AUTH]")
@@ -399,7 +476,8 @@ class UniversalAISystem:
                     print("\n[ADMIN] Planner control")
                     print("  Current: Disabled (use_planner=False)")
                     print("  To enable: Set use_planner=True in execute_worker_task")
-                    print("  Note: May cause LLM timeout on complex tasks")
+                    print(f"  Pipeline: {self.layer1.planner.get_pipeline()} (PLANNER_PIPELINE=fused|graph)")
+                    print("  Note: 'fused' plans in one LLM call; 'graph' uses three and may time out")
                     continue
                 
                 # Admin - Reload
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# tests import the packages the way Layer-2 / main.py do: layer1.llm_engine.*, layer1.planner.*
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+import pytest
+
+from layer1.llm_engine.adaptive import AIMDLimiter
+from layer1.llm_engine.scheduler import LLMScheduler
+
+
+def _window(limiter, limit, latency=1.0, ok=True, saturated=False):
+    for _ in range(limiter.window):
+        limit = limiter.observe(limit, latency, ok, saturated)
+    return limit
+
+
+def test_increases_only_when_saturated():
+    limiter = AIMDLimiter(target_latency=10.0, max_limit=6, window=4)
+    assert _window(limiter, 4) == 4  # idle capacity: no evidence more slots help
+    assert _window(limiter, 4, saturated=True) == 5
+    assert _window(limiter, 6, saturated=True) == 6  # capped at max_limit
+    assert limiter.stats()["increases"] == 1
+
+
+def test_backs_off_on_slow_or_failing_windows():
+    limiter = AIMDLimiter(target_latency=10.0, min_limit=2, backoff=0.5, window=4)
+    assert _window(limiter, 8, latency=20.0, saturated=True) == 4
+    assert _window(limiter, 4, ok=False) == 2
+    assert _window(limiter, 2, ok=False) == 2  # never below min_limit
+    assert limiter.stats()["decreases"] == 2
+    assert limiter.stats()["last_error_rate"] == 1.0
+
+
+def test_for_timeout_targets_half_the_timeout():
+    assert AIMDLimiter.for_timeout(120).target_latency == 60.0
+    with pytest.raises(ValueError):
+        AIMDLimiter(backoff=1.0)
+
+
+def test_scheduler_follows_the_limiter():
+    limiter = AIMDLimiter(target_latency=0.5, min_limit=1, max_limit=8, backoff=0.5, window=2)
+    scheduler = LLMScheduler(max_concurrency=4, adaptive=limiter)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with scheduler.slot():
+                raise ConnectionError("down")
+    assert scheduler.max_concurrency == 2
+
+    # a saturated healthy window grows the pool again
+    with scheduler.slot(), scheduler.slot():
+        pass
+    with scheduler.slot(), scheduler.slot():
+        pass
+    assert scheduler.max_concurrency == 3
+    assert scheduler.stats()["adaptive"]["increases"] == 1
+
+
+def test_initial_limit_is_clamped_to_the_limiter_bounds():
+    assert LLMScheduler(max_concurrency=32, adaptive=AIMDLimiter(max_limit=8)).max_concurrency == 8
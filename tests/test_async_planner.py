@@ -0,0 +1,126 @@
+import asyncio
+import inspect
+import json
+import threading
+
+from layer1.planner.nodes.decompose_node import decompose_node
+from layer1.planner.nodes.fused_plan_node import fused_plan_node
+from layer1.planner.nodes.intent_node import intent_node
+from layer1.planner.nodes.reflect_node import reflect_node
+from layer1.planner.planner_main import Layer1Planner
+
+STEPS_ANSWER = json.dumps({"steps": [
+    {"title": "Open web page", "description": "open the site in the browser"},
+    {"title": "Save file", "description": "write the page to a file"},
+]})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+def _answer(node):
+    if node == "decompose_node":
+        return STEPS_ANSWER
+    if node == "reflect_node":
+        return json.dumps({"status": "OK", "notes": "fine", "steps": []})
+    return json.dumps({"intent": "save a page", "constraints": [], "assumptions": []})
+
+
+def _planner():
+    planner = Layer1Planner(pipeline="graph")
+    planner.set_reflection_threshold(None)
+    planner.register_workers(WORKERS)
+    return planner
+
+
+def _summary(state):
+    return (
+        state.status,
+        [(s.id, s.title, s.description) for s in state.steps],
+        state.reflection,
+        state.completed_nodes,
+        state.context["intent_extraction"],
+    )
+
+
+def test_built_in_llm_nodes_have_async_twins():
+    for node in (intent_node, decompose_node, reflect_node, fused_plan_node):
+        assert inspect.iscoroutinefunction(node.async_impl)
+
+
+def test_async_plan_matches_sync_plan():
+    sync_planner = _planner()
+    sync_planner.register_llm(lambda prompt, node=None, **kwargs: _answer(node))
+    expected = sync_planner.plan_workflow(sync_planner.create_workflow("u", "Save the page"))
+
+    threads = set()
+
+    async def allm(prompt, node=None, **kwargs):
+        threads.add(threading.get_ident())
+        await asyncio.sleep(0)
+        return _answer(node)
+
+    async_planner = _planner()
+    async_planner.register_allm(allm)
+
+    async def scenario():
+        state = await async_planner.plan_workflow_async(async_planner.create_workflow("u", "Save the page"))
+        return state, threading.get_ident()
+
+    state, loop_thread = asyncio.run(scenario())
+    assert _summary(state) == _summary(expected)
+    assert threads == {loop_thread}  # awaited on the loop, not offloaded
+
+
+def test_sync_llm_binding_runs_off_the_event_loop():
+    threads = set()
+
+    def llm(prompt, node=None, **kwargs):
+        threads.add(threading.get_ident())
+        return _answer(node)
+
+    planner = _planner()
+    planner.register_llm(llm)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.ensure_future(ticker())
+        state = await planner.plan_workflow_async(planner.create_workflow("u", "Save the page"))
+        task.cancel()
+        return state, threading.get_ident(), ticks
+
+    state, loop_thread, ticks = asyncio.run(scenario())
+    assert state.status == "PLANNED"
+    assert threads and loop_thread not in threads
+    assert ticks > 0
+
+
+def test_many_workflows_plan_concurrently():
+    in_flight, peak = 0, 0
+
+    async def allm(prompt, node=None, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _answer(node)
+
+    planner = _planner()
+    planner.register_allm(allm)
+
+    async def scenario():
+        states = [planner.create_workflow(f"u{i}", "Save the page") for i in range(5)]
+        return await asyncio.gather(*[planner.plan_workflow_async(s) for s in states])
+
+    assert all(s.status == "PLANNED" for s in asyncio.run(scenario()))
+    assert peak > 1
@@ -0,0 +1,112 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from layer1.llm_engine.balancer import BalancedLMStudioConnector
+
+
+class StubServer:
+    """OpenAI-compatible stub: /v1/models and /v1/chat/completions, or 503 while down."""
+
+    def __init__(self, name):
+        self.name = name
+        self.up = True
+        self.completions = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, body):
+                status = 200 if stub.up else 503
+                data = json.dumps(body if stub.up else {"error": "down"}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply({"data": [{"id": "stub"}]})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stub.up:
+                    stub.completions += 1
+                self._reply({"choices": [{"message": {"content": stub.name}}]})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def servers():
+    pair = [StubServer("a"), StubServer("b")]
+    yield pair
+    for server in pair:
+        server.close()
+
+
+def _balancer(servers):
+    return BalancedLMStudioConnector(
+        [s.url for s in servers], timeout=5, failure_threshold=2, start_health_checks=False
+    )
+
+
+def test_failing_backend_is_ejected_and_restored_by_the_probe(servers):
+    a, b = servers
+    balancer = _balancer(servers)
+    try:
+        assert {balancer.llm("hi") for _ in range(4)} == {"a", "b"}
+
+        b.up = False
+        failures = 0
+        for _ in range(6):
+            try:
+                assert balancer.llm("hi") == "a"
+            except RuntimeError:
+                failures += 1
+        assert failures == 2  # failure_threshold, then b is out of rotation
+        status = {s["base_url"]: s for s in balancer.backend_status()}
+        assert status[b.url]["healthy"] is False and status[a.url]["healthy"] is True
+
+        balancer.check_backends(timeout=2)
+        assert balancer.backend_status()[1]["healthy"] is False
+
+        b.up = True
+        served_before = b.completions
+        assert balancer.health_check(timeout=2)
+        assert all(s["healthy"] and s["failures"] == 0 for s in balancer.backend_status())
+        assert {balancer.llm("hi") for _ in range(4)} == {"a", "b"}
+        assert b.completions > served_before
+    finally:
+        balancer.close()
+
+
+def test_all_backends_ejected_still_tries_them(servers):
+    balancer = _balancer(servers)
+    try:
+        for server in servers:
+            server.up = False
+        balancer.check_backends(timeout=2)
+        assert not any(s["healthy"] for s in balancer.backend_status())
+        servers[0].up = True
+        # nothing is healthy, so every backend stays a candidate instead of failing fast
+        results = set()
+        for _ in range(4):
+            try:
+                results.add(balancer.llm("hi"))
+            except RuntimeError:
+                results.add("error")
+        assert "a" in results
+    finally:
+        balancer.close()
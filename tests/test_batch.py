@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from layer1.planner.core.batch import run_batch
+from layer1.planner.core.state import PlannerState
+from layer1.planner.planner_main import Layer1Planner
+
+
+def _late_writer(state):
+    time.sleep(0.3)
+    state.goal = "written after the timeout"
+    state.completed_nodes.append("late_node")
+
+
+def test_timed_out_state_is_a_snapshot():
+    async def plan(state):
+        await asyncio.get_running_loop().run_in_executor(None, _late_writer, state)
+        return state
+
+    async def main():
+        original = PlannerState.new("u1", "goal")
+        report = await run_batch(plan, [original], timeout=0.05)
+        await asyncio.sleep(0.4)
+        return original, report.outcomes[0]
+
+    original, outcome = asyncio.run(main())
+    assert outcome.outcome == "TIMEOUT" and outcome.state.status == "ERROR"
+    assert outcome.state is not original
+    assert outcome.state.goal == "goal" and outcome.state.completed_nodes == []
+    assert original.goal == "written after the timeout"
+
+
+def test_plan_workflows_refuses_a_running_loop():
+    planner = Layer1Planner()
+
+    async def main():
+        with pytest.raises(RuntimeError, match="plan_workflows_async"):
+            planner.plan_workflows([PlannerState.new("u1", "goal")])
+
+    asyncio.run(main())
+
+
+def _busy_writer(state, stop):
+    # keeps growing state.context until told to stop, like a node still running after the timeout
+    i = 0
+    while not stop.is_set():
+        state.context[f"k{i}"] = {"v": [i]}
+        i += 1
+
+
+def test_timeout_while_a_node_is_still_mutating_the_state():
+    stop = threading.Event()
+
+    async def slow(state):
+        await asyncio.get_running_loop().run_in_executor(None, _busy_writer, state, stop)
+        return state
+
+    async def quick(state):
+        return state
+
+    async def main():
+        busy = PlannerState.new("u1", "busy goal", {f"seed{i}": {"v": [i]} for i in range(50000)})
+        try:
+            return await run_batch(
+                lambda s: slow(s) if s is busy else quick(s),
+                [busy, PlannerState.new("u2", "other goal")], timeout=0.05,
+            )
+        finally:
+            stop.set()
+
+    for _ in range(3):
+        report = asyncio.run(main())
+        stop.clear()
+        busy, other = report.outcomes
+        assert busy.outcome == "TIMEOUT" and busy.state.status == "ERROR"
+        assert busy.state.goal == "busy goal" and busy.state.workflow_id
+        assert other.outcome == "PLANNED"
@@ -0,0 +1,100 @@
+import json
+import re
+
+from layer1.planner.core.capability_index import CapabilityIndex, tokenize
+from layer1.planner.core.router import route_steps
+from layer1.planner.core.state import PlannerState, Step
+from layer1.planner.planner_main import Layer1Planner
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+FUSED_ANSWER = json.dumps({
+    "intent": {"intent": "save a page", "constraints": [], "assumptions": []},
+    "steps": [
+        {"title": "Open web page", "description": "open the site in the browser"},
+        {"title": "Ponder", "description": "think it over"},
+        {"title": "Save file", "description": "write the page to a file"},
+    ],
+    "review": {"status": "OK", "notes": ""},
+})
+
+
+def test_tokenize_lowercases_and_stems():
+    assert tokenize("Saving FILES, opened_pages") == ["sav", "file", "open", "page"]
+    # stems never shrink a token below three characters
+    assert tokenize("bus uses red") == ["bus", "use", "red"]
+    assert tokenize(None) == []
+
+
+def test_match_ranks_workers_best_first():
+    index = CapabilityIndex(WORKERS)
+    ranked = index.match("save the page to a file")
+    assert [wid for wid, _ in ranked] == ["w_file", "w_browser"]
+    assert ranked[0][1] > ranked[1][1] > 0
+    assert index.match("nothing relevant here") == []
+
+
+def test_route_is_unambiguous_or_none():
+    index = CapabilityIndex(WORKERS)
+    assert index.route("open the web page") == "w_browser"
+    assert index.route("save a file") == "w_file"
+    assert index.route("ponder") is None
+    # the browser wins but not by the margin
+    assert CapabilityIndex(WORKERS, margin=100.0).route("save the page to a file") is None
+    assert CapabilityIndex(WORKERS, min_score=100.0).route("save a file") is None
+
+
+def test_describe_and_rebuild():
+    index = CapabilityIndex(WORKERS)
+    assert index.describe("w_file") == "file: save file"
+    assert index.describe("missing") == ""
+    assert len(index) == 2
+    index.build({"w_mail": {"worker_type": "email", "capabilities": ["send email"]}})
+    assert index.workers == ["w_mail"]
+    assert index.route("send an email") == "w_mail"
+    assert index.route("save a file") is None
+
+
+def test_route_steps_falls_back_to_selector_for_ambiguous_steps_only():
+    steps = [Step("1", "Open web page", "open the site"), Step("2", "Ponder", "think it over")]
+    asked = []
+
+    def selector(state, step):
+        asked.append(step["id"])
+        return "w_file"
+
+    routes = route_steps(PlannerState("wf", "u", "goal", {}), steps, CapabilityIndex(WORKERS), selector)
+    assert routes == {"1": "w_browser", "2": "w_file"}
+    assert asked == ["2"]
+    assert steps[0].routing["method"] == "index"
+    assert steps[1].routing["method"] == "selector"
+
+
+class RouteLLM:
+    """Fused planner answer; route_node assigns every step listed in its prompt to w_file."""
+
+    def __init__(self):
+        self.routed = []
+
+    def __call__(self, prompt, node=None, **kwargs):
+        if node != "route_node":
+            return FUSED_ANSWER
+        ids = re.findall(r"^(\S+)\. ", prompt, re.MULTILINE)
+        self.routed.append(ids)
+        return json.dumps({"routes": [{"step": sid, "worker": "w_file"} for sid in ids]})
+
+
+def test_route_node_asks_the_llm_only_for_steps_the_index_cannot_route():
+    llm = RouteLLM()
+    planner = Layer1Planner(pipeline="fused")
+    planner.register_llm(llm)
+    planner.set_reflection_threshold(None)
+    planner.register_workers(WORKERS)
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert state.status == "PLANNED"
+    assert [step.routing["worker"] for step in state.plan] == ["w_browser", "w_file", "w_file"]
+    assert [step.routing["method"] for step in state.plan] == ["index", "llm", "index"]
+    assert llm.routed == [[state.plan[1].id]]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from layer1.planner.core.errors import NodeExecutionError
+from layer1.planner.planner_main import Layer1Planner
+
+STEPS_ANSWER = json.dumps({"steps": [
+    {"title": "Open web page", "description": "open the site in the browser"},
+    {"title": "Save file", "description": "write the page to a file"},
+]})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+class DictCheckpoints:
+    """StateManagerFacade's set_checkpoint / get_checkpoint over a dict, recording the calling threads."""
+
+    def __init__(self):
+        self.data = {}
+        self.threads = set()
+
+    def set_checkpoint(self, key, checkpoint, ttl=None):
+        self.threads.add(threading.get_ident())
+        self.data[key] = json.loads(json.dumps(checkpoint))
+
+    def get_checkpoint(self, key):
+        self.threads.add(threading.get_ident())
+        return self.data.get(key)
+
+
+class FlakyLLM:
+    """Answers per node; decompose_node fails while `fail_decompose` is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.fail_decompose = True
+
+    def __call__(self, prompt, node=None, **kwargs):
+        self.calls.append(node)
+        if node == "decompose_node":
+            if self.fail_decompose:
+                raise RuntimeError("model server went away")
+            return STEPS_ANSWER
+        if node == "reflect_node":
+            return json.dumps({"status": "OK", "notes": ""})
+        return json.dumps({"intent": "save a page", "constraints": [], "assumptions": []})
+
+
+def _planner(checkpoints, llm, pipeline="graph"):
+    planner = Layer1Planner(pipeline=pipeline)
+    planner.register_llm(llm)
+    planner.set_reflection_threshold(None)
+    planner.register_workers(WORKERS)
+    planner.bind_checkpoints(checkpoints)
+    return planner
+
+
+def test_step_workflow_resumes_after_a_failed_wave():
+    checkpoints, llm = DictCheckpoints(), FlakyLLM()
+    planner = _planner(checkpoints, llm)
+    state = planner.create_workflow("u", "Save the page")
+    with pytest.raises(NodeExecutionError):
+        planner.plan_workflow(state)
+    saved = planner.resume_workflow(state.workflow_id)
+    assert saved.status == "ERROR"
+    assert "intent_node" in saved.completed_nodes and "decompose_node" not in saved.completed_nodes
+
+    # a fresh process: only the workflow id survives
+    llm.fail_decompose = False
+    llm.calls.clear()
+    restarted = _planner(checkpoints, llm)
+    fresh = restarted.create_workflow("u", "Save the page")
+    fresh.workflow_id = state.workflow_id
+    done = restarted.step_workflow(fresh)
+    assert done.status == "PLANNED"
+    assert [s.title for s in done.plan] == ["Open web page", "Save file"]
+    assert "intent_node" not in llm.calls and llm.calls[0] == "decompose_node"
+
+
+def test_checkpoint_of_another_pipeline_is_ignored():
+    checkpoints, llm = DictCheckpoints(), FlakyLLM()
+    state = _planner(checkpoints, llm).create_workflow("u", "Save the page")
+    with pytest.raises(NodeExecutionError):
+        _planner(checkpoints, llm).plan_workflow(state)
+
+    fused = _planner(checkpoints, llm, pipeline="fused")
+    assert fused.resume_workflow(state.workflow_id) is None
+    fresh = fused.create_workflow("u", "Save the page")
+    fresh.workflow_id = state.workflow_id
+    assert fused._resume_state(fresh) is fresh
+
+
+def test_async_checkpoints_run_off_the_event_loop():
+    checkpoints, llm = DictCheckpoints(), FlakyLLM()
+    llm.fail_decompose = False
+    planner = _planner(checkpoints, llm)
+
+    async def scenario():
+        state = planner.create_workflow("u", "Save the page")
+        await planner.step_workflow_async(state, max_waves=2)
+        state = await planner.step_workflow_async(state)
+        return threading.get_ident(), state
+
+    loop_thread, state = asyncio.run(scenario())
+    assert state.status == "PLANNED"
+    assert checkpoints.threads and loop_thread not in checkpoints.threads
+    saved = planner.resume_workflow(state.workflow_id)
+    assert saved.completed_nodes == state.completed_nodes
@@ -0,0 +1,86 @@
+import json
+import zlib
+
+import pytest
+
+from layer1.planner.core import codec
+from layer1.planner.core.errors import CodecError
+from layer1.planner.core.state import PlannerState, Step
+
+
+def _state(steps=3):
+    state = PlannerState.new("u1", "save the page", {"locale": "fr", "nested": {"k": [1, 2.5, None, "é"]}})
+    state.steps = [
+        Step(
+            id=f"step_{i}", title=f"Step {i}", description="do it " * i, requires_approval=i % 2 == 0,
+            metadata={"tags": ["a"]}, routing={"worker": "w_file"}, results=[{"ok": True}],
+        )
+        for i in range(1, steps + 1)
+    ]
+    state.plan = list(state.steps)
+    state.status = "PLANNED"
+    state.completed_nodes = ["intent_node", "decompose_node"]
+    return state
+
+
+@pytest.mark.parametrize("compress", [None, True, False])
+def test_state_round_trip(compress):
+    state = _state()
+    restored = codec.decode_state(codec.encode_state(state, compress=compress))
+    assert restored == state
+    # plan entries that are steps come back as the same objects, not copies
+    assert all(p is s for p, s in zip(restored.plan, restored.steps))
+
+
+def test_plan_step_outside_steps_and_text_round_trip():
+    state = _state()
+    state.plan = [state.steps[1], Step(id="extra", title="Extra", description="not in steps")]
+    restored = codec.loads_state(codec.dumps_state(state))
+    assert restored == state
+    assert restored.plan[0] is restored.steps[1]
+    step = state.steps[0]
+    assert codec.decode_step(codec.encode_step(step)) == step
+    assert codec.loads_step(codec.dumps_step(step)) == step
+
+
+def test_large_state_is_compressed():
+    state = _state(steps=60)
+    blob = codec.encode_state(state)
+    flags = blob[3]
+    assert flags & codec._FLAG_ZLIB
+    assert len(blob) < len(codec.encode_state(state, compress=False))
+    assert codec.decode_state(blob) == state
+
+
+def test_older_shorter_field_tuples_decode_with_defaults():
+    # a blob written before trailing fields existed: Step without results, state without completed_nodes
+    fields = codec._state_fields(_state(steps=1))
+    fields[4] = [item[:7] for item in fields[4]]
+    blob = codec._HEADER.pack(codec._MAGIC, codec.CODEC_VERSION, 0) + json.dumps(
+        [codec._KIND_STATE, fields[:12]]
+    ).encode()
+    restored = codec.decode_state(blob)
+    assert restored.completed_nodes == [] and restored.steps[0].results == []
+
+
+@pytest.mark.parametrize("blob, message", [
+    (b"P", "too short"),
+    (b"XX\x01\x00[]", "not a planner codec blob"),
+    (codec._HEADER.pack(codec._MAGIC, codec.CODEC_VERSION + 1, 0) + b"[]", "newer"),
+    (codec._HEADER.pack(codec._MAGIC, codec.CODEC_VERSION, codec._FLAG_ZLIB) + b"garbage", "corrupt"),
+    (codec._HEADER.pack(codec._MAGIC, codec.CODEC_VERSION, 0) + zlib.compress(b"[]"), "corrupt"),
+])
+def test_bad_blobs_raise_codec_error(blob, message):
+    with pytest.raises(CodecError, match=message):
+        codec.decode_state(blob)
+
+
+def test_kind_mismatch_and_bad_text():
+    with pytest.raises(CodecError, match="kind"):
+        codec.decode_state(codec.encode_step(_state().steps[0]))
+    with pytest.raises(CodecError, match="base64"):
+        codec.loads_state("not base64!")
+    state = _state()
+    state.context["handle"] = object()
+    with pytest.raises(CodecError, match="not serializable"):
+        codec.encode_state(state)
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+from layer1.llm_engine.embeddings import EmbeddingService
+from layer1.llm_engine.scheduler import LLMScheduler
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    def embed(self, texts, model=None):
+        self.calls += 1
+        return [[float(len(t))] for t in texts]
+
+    async def aembed(self, texts, model=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return self.embed(texts, model)
+
+
+def test_embed_waits_for_a_background_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    connector = FakeEmbedder()
+    service = EmbeddingService(connector, scheduler=scheduler)
+    result = {}
+    with scheduler.slot("interactive"):
+        worker = threading.Thread(target=lambda: result.update(v=service.embed(["ab", "abc", "ab"])))
+        worker.start()
+        worker.join(0.1)
+        assert worker.is_alive() and connector.calls == 0
+        assert scheduler.stats()["classes"]["background"]["queued"] == 1
+    worker.join(5)
+    assert result["v"] == [[2.0], [3.0], [2.0]]
+    assert scheduler.stats()["classes"]["background"]["served"] == 1
+
+
+def test_aembed_batches_share_the_slot_limit():
+    scheduler = LLMScheduler(max_concurrency=2)
+    connector = FakeEmbedder()
+    service = EmbeddingService(connector, batch_size=1, scheduler=scheduler)
+    vectors = asyncio.run(service.aembed(["a", "bb", "ccc", "dddd", "eeeee"]))
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert connector.peak == 2
+    assert service.stats()["requests"] == 5
+
+
+class FakeRedis:
+    """RedisMemory's get/set plus get_many/set_many; records calls and the calling thread."""
+
+    def __init__(self, batched=True):
+        self.data = {}
+        self.calls = []
+        self.threads = set()
+        if not batched:
+            self.get_many = None
+            self.set_many = None
+
+    def _note(self, name):
+        self.calls.append(name)
+        self.threads.add(threading.get_ident())
+
+    def get(self, key):
+        self._note("get")
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._note("set")
+        self.data[key] = value
+
+    def get_many(self, keys):
+        self._note("get_many")
+        return [self.data.get(k) for k in keys]
+
+    def set_many(self, items, ttl=None):
+        self._note("set_many")
+        self.data.update(items)
+
+
+def test_redis_tier_is_read_and_written_once_per_call():
+    redis = FakeRedis()
+    first = EmbeddingService(FakeEmbedder(), batch_size=2, redis=redis)
+    assert first.embed(["a", "bb", "ccc", "a"]) == [[1.0], [2.0], [3.0], [1.0]]
+    assert redis.calls == ["get_many", "set_many", "set_many"]  # one write per embedding request
+
+    redis.calls.clear()
+    second = EmbeddingService(FakeEmbedder(), redis=redis)  # empty LRU, warm Redis
+    assert second.embed(["ccc", "bb", "dddd"]) == [[3.0], [2.0], [4.0]]
+    assert redis.calls == ["get_many", "set_many"]
+    assert second.stats()["redis_hits"] == 2 and second.stats()["misses"] == 1
+
+
+def test_plain_get_set_redis_still_works():
+    redis = FakeRedis(batched=False)
+    service = EmbeddingService(FakeEmbedder(), redis=redis)
+    service.embed(["a", "bb"])
+    assert EmbeddingService(FakeEmbedder(), redis=redis).embed(["bb"]) == [[2.0]]
+    assert set(redis.calls) == {"get", "set"}
+
+
+def test_aembed_keeps_redis_off_the_event_loop():
+    redis = FakeRedis()
+    warm = EmbeddingService(FakeEmbedder(), redis=redis)
+    warm.embed(["bb"])
+    redis.calls.clear()
+    redis.threads.clear()
+    service = EmbeddingService(FakeEmbedder(), redis=redis)
+
+    async def main():
+        vectors = await service.aembed(["a", "bb", "ccc"])
+        await asyncio.sleep(0.05)  # let the fire-and-forget write finish
+        return threading.get_ident(), vectors
+
+    loop_thread, vectors = asyncio.run(main())
+    assert vectors == [[1.0], [2.0], [3.0]]
+    assert redis.calls == ["get_many", "set_many"]
+    assert loop_thread not in redis.threads
+    assert set(redis.data) == {service.KEY_PREFIX + service.make_key(t) for t in ("a", "bb", "ccc")}
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from layer1.planner.planner_main import Layer1Planner
+
+FUSED_ANSWER = json.dumps({
+    "intent": {"intent": "save a page", "constraints": ["offline"], "assumptions": []},
+    "steps": [
+        {"title": "Open web page", "description": "open the site in the browser"},
+        {"title": "Save file", "description": "write the page to a file"},
+    ],
+    "review": {"status": "OK", "notes": "looks fine"},
+})
+
+STEPS_ANSWER = json.dumps({"steps": [
+    {"title": "Open web page", "description": "open the site"},
+    {"title": "Save file", "description": "save it"},
+]})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+class NodeLLM:
+    """Answers per node; fused_plan_node gets `fused` (invalid by default)."""
+
+    def __init__(self, fused='{"intent": {"intent": ""}, "steps": []}'):
+        self.fused = fused
+        self.calls = []
+
+    def __call__(self, prompt, node=None, **kwargs):
+        self.calls.append(node)
+        if node == "fused_plan_node":
+            return self.fused
+        if node == "decompose_node":
+            return STEPS_ANSWER
+        if node == "reflect_node":
+            return json.dumps({"status": "OK", "notes": "", "steps": []})
+        return json.dumps({"intent": "save a page", "constraints": [], "assumptions": []})
+
+    async def acall(self, prompt, **kwargs):
+        return self(prompt, **kwargs)
+
+
+def _planner(llm):
+    planner = Layer1Planner(pipeline="fused")
+    planner.register_llm(llm)
+    planner.register_allm(llm.acall)
+    planner.set_reflection_threshold(None)
+    planner.register_workers(WORKERS)
+    return planner
+
+
+def test_valid_fused_answer_plans_in_one_call():
+    llm = NodeLLM(FUSED_ANSWER)
+    planner = _planner(llm)
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert state.status == "PLANNED"
+    assert llm.calls == ["fused_plan_node"]
+    assert [s.title for s in state.steps] == ["Open web page", "Save file"]
+    assert state.reflection == {"status": "OK", "notes": "looks fine"}
+    assert json.loads(state.context["intent_extraction"]["raw"])["constraints"] == ["offline"]
+    assert state.context["planning"] == {"pipeline": "fused", "fallback": False}
+
+
+def test_invalid_fused_answer_falls_back_to_the_graph_nodes():
+    llm = NodeLLM()
+    planner = _planner(llm)
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert state.status == "PLANNED"
+    # no repair call: the graph nodes are the fallback
+    assert llm.calls == ["fused_plan_node", "intent_node", "decompose_node", "reflect_node"]
+    assert [s.title for s in state.steps] == ["Open web page", "Save file"]
+    planning = state.context["planning"]
+    assert planning["fallback"] is True and "intent" in planning["error"]
+
+
+def test_async_fallback_uses_the_async_nodes():
+    llm = NodeLLM()
+    planner = _planner(llm)
+    planner.register_llm(None)  # only the async binding is available
+
+    async def scenario():
+        return await planner.plan_workflow_async(planner.create_workflow("u", "Save the page"))
+
+    state = asyncio.run(scenario())
+    assert state.status == "PLANNED"
+    assert llm.calls == ["fused_plan_node", "intent_node", "decompose_node", "reflect_node"]
+    assert state.context["planning"]["fallback"] is True
+
+
+def test_pipeline_selection():
+    planner = Layer1Planner(pipeline="graph")
+    assert "fused_plan_node" not in sum(planner.get_waves(), [])
+    planner.set_pipeline("fused")
+    assert planner.get_pipeline() == "fused"
+    assert "fused_plan_node" in sum(planner.get_waves(), [])
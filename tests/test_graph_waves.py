@@ -0,0 +1,117 @@
+import asyncio
+import threading
+
+import pytest
+
+from layer1.planner.core.errors import MissingBindingError, NodeExecutionError
+from layer1.planner.core.graph import SimpleGraphPlanner, node_io
+from layer1.planner.core.state import PlannerState
+from layer1.planner.planner_main import Layer1Planner
+
+
+def _node(name, reads=(), writes=(), after=(), log=None, barrier=None):
+    def fn(state, bindings):
+        if barrier is not None:
+            barrier.wait(timeout=2)  # only passes if the wave's nodes really run together
+        if log is not None:
+            log.append(name)
+        return state
+    fn.__name__ = name
+    return node_io(reads=reads, writes=writes, after=after)(fn)
+
+
+def test_waves_follow_declared_reads_and_writes():
+    graph = SimpleGraphPlanner()
+    graph.register_node(_node("a", writes=("context.a",)))
+    graph.register_node(_node("b", writes=("context.b",)))
+    graph.register_node(_node("c", reads=("context.a", "context.b"), writes=("steps",)))
+    graph.register_node(_node("d", reads=("steps.routing",)))  # nested path overlaps "steps"
+    graph.register_node(_node("e", writes=("context.e",), after=("a",)))
+    assert graph.waves() == [["a", "b"], ["c", "e"], ["d"]]
+
+
+def test_undeclared_nodes_are_barriers():
+    graph = SimpleGraphPlanner()
+    graph.register_node(_node("a", writes=("x",)))
+    graph.register_node(lambda state, bindings: state, name="plain")
+    graph.register_node(_node("b", writes=("y",)))
+    assert graph.waves() == [["a"], ["plain"], ["b"]]
+
+
+def test_bad_registrations_are_rejected():
+    graph = SimpleGraphPlanner()
+    graph.register_node(_node("a"))
+    with pytest.raises(ValueError, match="already registered"):
+        graph.register_node(_node("a"))
+    with pytest.raises(ValueError, match="unregistered"):
+        graph.register_node(_node("b", after=("ghost",)))
+
+
+def test_a_wave_runs_its_nodes_in_parallel():
+    barrier = threading.Barrier(2)
+    graph = SimpleGraphPlanner()
+    graph.register_node(_node("a", writes=("context.a",), barrier=barrier))
+    graph.register_node(_node("b", writes=("context.b",), barrier=barrier))
+    state = graph.run_full_plan(PlannerState.new(user_id="u", goal="g"))
+    assert state.status == "PLANNED"
+    assert sorted(state.completed_nodes) == ["a", "b"]
+
+
+def test_async_run_gathers_a_wave():
+    barrier = asyncio.Barrier(2) if hasattr(asyncio, "Barrier") else None
+    log = []
+
+    def make(name):
+        @node_io(writes=(f"context.{name}",))
+        async def fn(state, bindings):
+            if barrier is not None:
+                await asyncio.wait_for(barrier.wait(), 2)
+            log.append(name)
+            return state
+        fn.__name__ = name
+        return fn
+
+    graph = SimpleGraphPlanner()
+    graph.register_node(make("a"))
+    graph.register_node(make("b"))
+    state = asyncio.run(graph.run_full_plan_async(PlannerState.new(user_id="u", goal="g")))
+    assert state.status == "PLANNED" and sorted(log) == ["a", "b"]
+
+
+def test_first_failure_in_registration_order_decides():
+    def failing(exc):
+        def fn(state, bindings):
+            raise exc
+        return fn
+
+    graph = SimpleGraphPlanner()
+    graph.register_node(failing(MissingBindingError("no llm")), name="a", writes=("context.a",))
+    graph.register_node(failing(RuntimeError("boom")), name="b", writes=("context.b",))
+    state = graph.run_full_plan(PlannerState.new(user_id="u", goal="g"))
+    assert state.status == "AWAITING_BINDINGS"
+
+    graph = SimpleGraphPlanner()
+    graph.register_node(failing(RuntimeError("boom")), name="a", writes=("context.a",))
+    graph.register_node(failing(MissingBindingError("no llm")), name="b", writes=("context.b",))
+    with pytest.raises(NodeExecutionError, match="Node a failed"):
+        graph.run_full_plan(PlannerState.new(user_id="u", goal="g"))
+
+
+def test_max_waves_and_resume():
+    log = []
+    graph = SimpleGraphPlanner()
+    graph.register_node(_node("a", writes=("x",), log=log))
+    graph.register_node(_node("b", reads=("x",), writes=("y",), log=log))
+    state = graph.run_full_plan(PlannerState.new(user_id="u", goal="g"), max_waves=1)
+    assert state.status == "PLANNING" and state.completed_nodes == ["a"]
+    state = graph.run_full_plan(state, resume=True)
+    assert state.status == "PLANNED" and log == ["a", "b"]
+
+
+def test_built_in_graph_pipeline_waves():
+    waves = Layer1Planner(pipeline="graph").get_waves()
+    flat = sum(waves, [])
+    for before, after in [("intent_node", "decompose_node"), ("decompose_node", "reflect_node"),
+                          ("reflect_node", "route_node")]:
+        assert flat.index(before) < flat.index(after)
+    assert len(waves) < len(flat)  # some nodes share a wave
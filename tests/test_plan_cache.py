@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+
+from layer1.planner.core.plan_cache import PlanCache
+from layer1.planner.planner_main import Layer1Planner
+
+FUSED_ANSWER = json.dumps({
+    "intent": {"intent": "save a page", "constraints": [], "assumptions": []},
+    "steps": [
+        {"title": "Open web page", "description": "open the site in the browser"},
+        {"title": "Save file", "description": "write the page to a file"},
+    ],
+    "review": {"status": "OK", "notes": ""},
+})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+class DictMemory:
+    """set_temp / get_temp / delete_temp over a dict (MemoryFacade's short-term API)."""
+
+    def __init__(self):
+        self.data = {}
+
+    def set_temp(self, key, value, ttl=None):
+        self.data[key] = value
+
+    def get_temp(self, key):
+        return self.data.get(key)
+
+    def delete_temp(self, key):
+        self.data.pop(key, None)
+
+
+def _planner(**bindings):
+    planner = Layer1Planner(pipeline="fused")
+    planner.register_llm(lambda prompt, **kwargs: FUSED_ANSWER)
+    planner.register_workers(WORKERS)
+    planner.bind_plan_cache(PlanCache(DictMemory()))
+    for name, fn in bindings.items():
+        getattr(planner, f"register_{name}")(fn)
+    return planner
+
+
+def _routes(state):
+    return [step.routing.get("worker") for step in state.plan]
+
+
+def test_cache_hit_is_routed_with_capability_index_only():
+    planner = _planner()
+    first = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    second = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert second.context["plan_cache"] == {"hit": True}
+    assert second.status == "PLANNED"
+    assert _routes(first) == _routes(second) == ["w_browser", "w_file"]
+    assert second.selected_worker == "w_browser"
+
+
+def test_async_cache_hit_is_routed():
+    planner = _planner()
+
+    async def scenario():
+        await planner.plan_workflow_async(planner.create_workflow("u", "Save the page"))
+        return await planner.plan_workflow_async(planner.create_workflow("u", "Save the page"))
+
+    state = asyncio.run(scenario())
+    assert state.context["plan_cache"] == {"hit": True}
+    assert _routes(state) == ["w_browser", "w_file"]
+
+
+def test_cache_hit_runs_safety_precheck():
+    checked = []
+
+    def safety(goal, info):
+        checked.append(goal)
+        return {"allowed": True}
+
+    planner = _planner(safety=safety)
+    planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert state.context["plan_cache"] == {"hit": True}
+    assert state.context["safety_precheck"] == {"allowed": True}
+    assert checked == ["Save the page", "Save the page"]
+
+
+class ThreadRecordingMemory(DictMemory):
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def set_temp(self, key, value, ttl=None):
+        self.threads.append(threading.get_ident())
+        super().set_temp(key, value, ttl)
+
+
+def test_async_plans_write_the_cache_off_the_event_loop():
+    planner = _planner()
+    memory = ThreadRecordingMemory()
+    planner.bind_plan_cache(PlanCache(memory))
+
+    async def scenario():
+        await planner.plan_workflow_async(planner.create_workflow("u", "Save the page"))
+        await planner.step_workflow_async(planner.create_workflow("u", "Save another page"))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(memory.threads) == 2
+    assert loop_thread not in memory.threads
@@ -0,0 +1,66 @@
+import json
+
+from layer1.planner.core.graph import PlannerBindings
+from layer1.planner.core.plan_quality import assess_plan, find_destructive
+from layer1.planner.core.state import PlannerState, Step
+from layer1.planner.nodes.reflect_node import reflect_node
+
+
+def _steps(*titles):
+    return [Step(id=f"step_{i}", title=t, description=f"{t} carefully") for i, t in enumerate(titles, start=1)]
+
+
+def test_good_plan_scores_full_marks():
+    assessment = assess_plan("Save the page", _steps("Open the page", "Save the file"))
+    assert (assessment.score, assessment.issues, assessment.high_risk) == (1.0, [], False)
+
+
+def test_penalties():
+    assert assess_plan("Save the page", []).score == 0.0
+    duplicate = assess_plan("Save the page", _steps("Open the page", "Open the page"))
+    assert duplicate.score == 0.7 and duplicate.issues == ["duplicate step: Open the page"]
+    no_verbs = assess_plan("Save the page", _steps("The page", "A file", "Some mail", "More"))
+    assert no_verbs.score == 0.55  # capped at 0.45
+    too_many = assess_plan("Save the page", _steps(*[f"Check item {i}" for i in range(10)]))
+    assert too_many.score == 0.8
+    long_goal = "Collect every invoice from the shared drive and reconcile them with the ledger by month end"
+    assert assess_plan(long_goal, _steps("Collect invoices")).score == 0.8
+    assert assess_plan("Backup db", _steps("1. Backup db")).score == 1.0  # numbering is ignored
+
+
+def test_destructive_commands_mark_high_risk():
+    assert find_destructive("then run rm -rf /tmp/x and DROP TABLE users") == ["rm -rf", "DROP TABLE"]
+    assessment = assess_plan("Clean up", _steps("Run git push origin main --force"))
+    assert assessment.high_risk and assessment.destructive
+    assert find_destructive("remove the old draft") == []
+
+
+def _gate(goal, steps, context=None):
+    calls = []
+
+    def llm(prompt, **kwargs):
+        calls.append(prompt)
+        return json.dumps({"status": "OK", "notes": "", "steps": []})
+
+    bindings = PlannerBindings(llm=llm)
+    state = PlannerState(workflow_id="wf_1", user_id="u1", goal=goal, context=context or {}, steps=steps)
+    return reflect_node(state, bindings), bindings, calls
+
+
+def test_good_plans_skip_reflection():
+    state, bindings, calls = _gate("Save the page", _steps("Open the page", "Save the file"))
+    assert calls == []
+    assert state.reflection["status"] == "SKIPPED"
+    assert state.context["reflection_gate"]["skipped"] is True
+    assert bindings.reflection_stats == {"runs": 0, "skipped": 1}
+
+
+def test_weak_or_risky_plans_are_reviewed():
+    state, _, calls = _gate("Save the page", _steps("Open the page", "Open the page"))
+    assert len(calls) == 1 and state.context["reflection_gate"]["reason"] == "score 0.70 below 0.75"
+
+    state, _, calls = _gate("Wipe it with rm -rf /data", _steps("Open the page", "Save the file"))
+    assert len(calls) == 1 and state.context["reflection_gate"]["reason"] == "high-risk goal"
+
+    state, _, calls = _gate("Save the page", _steps("Open the page", "Save the file"), {"high_risk": True})
+    assert len(calls) == 1 and state.context["reflection_gate"]["high_risk"] is True
@@ -0,0 +1,85 @@
+import json
+
+from layer1.planner.core.profiles import NodeProfile, ProfileRegistry
+from layer1.planner.planner_main import Layer1Planner
+
+STEPS_ANSWER = json.dumps({"steps": [
+    {"title": "Open web page", "description": "open the site in the browser"},
+    {"title": "Save file", "description": "write the page to a file"},
+]})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+class RecordingLLM:
+    """Answers per node and keeps the keyword arguments of every call."""
+
+    def __init__(self):
+        self.kwargs = {}
+
+    def __call__(self, prompt, node=None, **kwargs):
+        self.kwargs[node] = kwargs
+        if node == "decompose_node":
+            return STEPS_ANSWER
+        if node == "reflect_node":
+            return json.dumps({"status": "OK", "notes": "", "steps": []})
+        return json.dumps({"intent": "save a page", "constraints": [], "assumptions": []})
+
+
+def _planner(llm):
+    planner = Layer1Planner(pipeline="graph")
+    planner.register_llm(llm)
+    planner.set_reflection_threshold(None)
+    planner.register_workers(WORKERS)
+    return planner
+
+
+def test_profile_kwargs_only_carry_set_options():
+    assert NodeProfile(max_tokens=100, temperature=0.0).as_kwargs() == {"max_tokens": 100, "temperature": 0.0}
+    profile = NodeProfile(model="small", stop=["\n\n"])
+    assert profile.as_kwargs()["model"] == "small"
+    assert profile.as_kwargs()["stop"] == ["\n\n"]
+    registry = ProfileRegistry.planner_defaults()
+    assert registry.get("unknown_node") is registry.default
+    assert registry.get("decompose_node").structured
+
+
+def test_each_node_calls_the_llm_with_its_profile():
+    llm = RecordingLLM()
+    planner = _planner(llm)
+    planner.use_fast_model("small-model")
+    planner.set_node_profile("decompose_node", NodeProfile(max_tokens=777, temperature=0.3, stop=["END"]))
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert state.status == "PLANNED"
+
+    intent = llm.kwargs["intent_node"]
+    assert (intent["max_tokens"], intent["temperature"], intent["model"]) == (1024, 0.0, "small-model")
+    assert llm.kwargs["reflect_node"]["model"] == "small-model"
+    decompose = llm.kwargs["decompose_node"]
+    assert (decompose["max_tokens"], decompose["temperature"], decompose["stop"]) == (777, 0.3, ["END"])
+    assert "model" not in decompose  # engine default model
+    assert "response_format" not in decompose  # the replaced profile is not structured
+
+
+def test_plain_llm_callable_gets_no_profile_kwargs():
+    prompts = []
+
+    def llm(prompt):
+        prompts.append(prompt)
+        if "Break down the goal" in prompt:
+            return STEPS_ANSWER
+        return json.dumps({"status": "OK", "notes": "", "steps": []})
+
+    planner = _planner(llm)
+    assert planner.plan_workflow(planner.create_workflow("u", "Save the page")).status == "PLANNED"
+    assert prompts
+
+
+def test_profiles_are_part_of_the_plan_cache_key():
+    planner = _planner(RecordingLLM())
+    key = planner.plan_cache_key("Save the page")
+    planner.use_fast_model("small-model")
+    assert planner.plan_cache_key("Save the page") != key
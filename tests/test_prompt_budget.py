@@ -0,0 +1,72 @@
+from layer1.planner.core.prompt_budget import TRUNCATION_MARKER, PromptBudget, PromptSection
+
+
+def _words(n, word="word"):
+    return " ".join([word] * n)
+
+
+def test_prompt_within_budget_is_unchanged():
+    budget = PromptBudget(max_tokens=1000)
+    sections = [PromptSection("goal", "Save the page", required=True), PromptSection("ctx", "a: b", prefix="C: ")]
+    report = budget.build(sections)
+    assert report.prompt == "Save the page\n\nC: a: b"
+    assert report.trimmed == [] and report.dropped == [] and report.saved == 0
+
+
+def test_least_important_sections_are_trimmed_first():
+    budget = PromptBudget(max_tokens=300)
+    sections = [
+        PromptSection("instructions", _words(100, "rule"), required=True),
+        PromptSection("goal", _words(100, "goal"), priority=1, prefix="Goal: "),
+        PromptSection("history", _words(200, "old"), priority=5, prefix="History: "),
+    ]
+    report = budget.build(sections)
+    assert report.trimmed == ["history"]
+    assert report.tokens_after <= 300
+    assert _words(100, "rule") in report.prompt and _words(100, "goal") in report.prompt
+    assert "History: old" in report.prompt and report.prompt.endswith(TRUNCATION_MARKER)
+
+
+def test_sections_cut_below_min_tokens_are_dropped():
+    budget = PromptBudget(max_tokens=120)
+    sections = [
+        PromptSection("instructions", _words(100, "rule"), required=True),
+        PromptSection("notes", _words(40, "note"), priority=3, min_tokens=30),
+    ]
+    report = budget.build(sections)
+    assert report.dropped == ["notes"]
+    assert "note" not in report.prompt
+    assert budget.stats() == {"calls": 1, "trimmed_calls": 1, "tokens_saved": report.saved}
+
+
+def test_required_sections_are_never_trimmed():
+    budget = PromptBudget(max_tokens=10)
+    text = _words(100, "rule")
+    report = budget.build([PromptSection("instructions", text, required=True)])
+    assert report.prompt == text and report.tokens_after > 10
+
+
+def test_a_priority_group_shares_the_cut():
+    budget = PromptBudget(max_tokens=150)
+    sections = [PromptSection(f"step{i}", _words(100, f"s{i}"), priority=2) for i in range(2)]
+    report = budget.build(sections)
+    assert report.trimmed == ["step0", "step1"]
+    kept = [budget.count(part) for part in report.prompt.split("\n\n")]
+    assert abs(kept[0] - kept[1]) <= 2
+
+
+def test_summarizer_replaces_truncation_and_custom_tokenizer_is_used():
+    budget = PromptBudget(max_tokens=5, tokenizer=lambda t: len(t.split()), summarizer=lambda text, n: "summary")
+    sections = [
+        PromptSection("goal", "save the page", required=True),
+        PromptSection("ctx", _words(40), priority=1, min_tokens=1),
+    ]
+    assert budget.build(sections).prompt == "save the page\n\nsummary"
+
+
+def test_context_sections_render_non_strings_as_json():
+    sections = PromptBudget().context_sections({"user": "ann", "prefs": {"lang": "en"}}, priorities={"user": 1})
+    assert [(s.name, s.priority, s.render()) for s in sections] == [
+        ("user", 1, "user: ann"),
+        ("prefs", 5, 'prefs: {"lang": "en"}'),
+    ]
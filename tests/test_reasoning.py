@@ -0,0 +1,187 @@
+import asyncio
+import json
+
+import pytest
+
+from layer1.llm_engine.errors import ReasoningBudgetError
+from layer1.llm_engine.llm_engine_main import Layer1LLMEngine
+from layer1.llm_engine.llm_state import LLMCallState
+from layer1.llm_engine.reasoning import ReasoningConfig, ReasoningSplitter, json_object_complete, split_reasoning
+from layer1.planner.planner_main import Layer1Planner
+
+FUSED_ANSWER = json.dumps({
+    "intent": {"intent": "save a page", "constraints": [], "assumptions": []},
+    "steps": [
+        {"title": "Open web page", "description": "open the site in the browser"},
+        {"title": "Save file", "description": "write the page to a file"},
+    ],
+    "review": {"status": "OK", "notes": ""},
+})
+
+WORKERS = {
+    "w_browser": {"worker_type": "browser", "capabilities": ["open web page"]},
+    "w_file": {"worker_type": "file", "capabilities": ["save file"]},
+}
+
+
+class ThinkingConnector:
+    """Streams <think>...</think> then the answer in small deltas, then junk the model keeps generating."""
+
+    model = "stub"
+
+    def __init__(self, answer, junk=" and then some more text " * 20):
+        self.answer = answer
+        self.junk = junk
+        self.sent = 0
+        self.closed = False
+        self.prompts = []
+
+    def _deltas(self):
+        text = "<thi" + "nk>let me plan this</th" + "ink>" + self.answer + self.junk
+        return [text[i:i + 7] for i in range(0, len(text), 7)]
+
+    def stream(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        try:
+            for delta in self._deltas():
+                self.sent += 1
+                yield delta
+        except GeneratorExit:
+            self.closed = True
+            raise
+
+    async def astream(self, prompt, **kwargs):
+        for delta in self.stream(prompt, **kwargs):
+            yield delta
+
+    def llm(self, prompt, **kwargs):
+        return "".join(self._deltas())
+
+
+# ----------------- splitter -----------------
+def test_splitter_handles_tags_split_across_deltas():
+    splitter = ReasoningSplitter()
+    out = [splitter.feed(d) for d in ["<th", "ink>step one", " step two</thi", "nk>The ", "answer<", "/b>"]]
+    assert "".join(out) == "The answer</b>"
+    assert splitter.finish() == ("step one step two", "The answer</b>")
+    assert splitter.thinking_tokens == 3  # deltas that carried thinking text or its closing tag
+
+
+def test_splitter_reclassifies_text_before_a_bare_closing_tag():
+    splitter = ReasoningSplitter()
+    assert splitter.feed("thinking without an opening tag") == "thinking without an opening tag"
+    splitter.feed("</think>answer")
+    assert splitter.finish() == ("thinking without an opening tag", "answer")
+
+
+def test_split_reasoning_of_unterminated_think_block():
+    assert split_reasoning("<think>still going") == ("still going", "")
+    assert split_reasoning("plain answer") == ("", "plain answer")
+
+
+def test_json_object_complete():
+    assert not json_object_complete('{"a": "}"')
+    assert json_object_complete('{"a": "}", "b": {"c": 1}}')
+    assert json_object_complete('noise {"a": 1} more')
+    assert not json_object_complete('[{"title": "x"}, ')
+
+
+# ----------------- early stop -----------------
+def test_engine_stops_once_the_json_answer_is_complete():
+    connector = ThinkingConnector('{"intent": "x"}')
+    engine = Layer1LLMEngine(reasoning=ReasoningConfig())
+    engine.bind_lmstudio(connector)
+    state = LLMCallState.new("p")
+    answer = engine.llm("p", answer_complete=json_object_complete, call_state=state)
+    # generation stops on the delta that closes the object
+    assert answer.startswith('{"intent": "x"}') and len(answer) < len('{"intent": "x"}') + 7
+    assert connector.closed and connector.sent < len(connector._deltas())
+    assert state.metadata["thinking"] == "let me plan this"
+    assert state.metadata["thinking_truncated"] is False
+
+
+def test_without_answer_complete_the_whole_stream_is_read():
+    connector = ThinkingConnector('{"intent": "x"}', junk=" tail")
+    engine = Layer1LLMEngine(reasoning=ReasoningConfig())
+    engine.bind_lmstudio(connector)
+    assert engine.llm("p") == '{"intent": "x"} tail'
+    assert connector.sent == len(connector._deltas())
+
+
+def test_planner_nodes_stop_early_and_keep_thinking_on_the_state():
+    connector = ThinkingConnector(FUSED_ANSWER)
+    engine = Layer1LLMEngine(reasoning=ReasoningConfig())
+    engine.bind_lmstudio(connector)
+    planner = Layer1Planner(pipeline="fused")
+    planner.register_llm(engine.llm)
+    planner.register_allm(engine.allm)
+    planner.register_workers(WORKERS)
+    planner.register_reasoning(json_object_complete, LLMCallState.new)
+
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"))
+    assert [s.title for s in state.steps] == ["Open web page", "Save file"]
+    assert connector.closed
+    reasoning = state.context["reasoning"]["fused_plan_node"]
+    assert reasoning["thinking"] == "let me plan this" and reasoning["thinking_tokens"] > 0
+
+    connector.closed = False
+    state = asyncio.run(planner.plan_workflow_async(planner.create_workflow("u", "Save the other page")))
+    assert connector.closed
+    assert state.context["reasoning"]["fused_plan_node"]["thinking"] == "let me plan this"
+
+
+# ----------------- thinking budget fallback -----------------
+class OverthinkingConnector:
+    """Streams thinking until max_tokens; the direct-answer retry returns `fallback`."""
+
+    model = "stub"
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.retries = []
+
+    def stream(self, prompt, **kwargs):
+        yield "<think>"
+        for _ in range(kwargs["max_tokens"]):
+            yield "hmm "
+
+    async def astream(self, prompt, **kwargs):
+        for delta in self.stream(prompt, **kwargs):
+            yield delta
+
+    def llm(self, prompt, **kwargs):
+        self.retries.append(kwargs)
+        return self.fallback
+
+    async def allm(self, prompt, **kwargs):
+        return self.llm(prompt, **kwargs)
+
+
+def _overthinking_engine(fallback):
+    connector = OverthinkingConnector(fallback)
+    engine = Layer1LLMEngine(reasoning=ReasoningConfig(max_thinking_tokens=8, fallback_max_tokens=512))
+    engine.bind_lmstudio(connector)
+    return engine, connector
+
+
+def test_fallback_keeps_the_callers_larger_max_tokens():
+    engine, connector = _overthinking_engine('{"steps": []}')
+    state = LLMCallState.new("p")
+    assert engine.llm("p", max_tokens=2048, call_state=state) == '{"steps": []}'
+    assert asyncio.run(engine.allm("q", max_tokens=3072)) == '{"steps": []}'
+    assert [r["max_tokens"] for r in connector.retries] == [2048, 3072]
+    assert state.metadata["thinking_truncated"] is True
+
+    engine.llm("r", max_tokens=64)
+    assert connector.retries[-1]["max_tokens"] == 512
+
+
+def test_empty_fallback_answer_raises():
+    engine, _ = _overthinking_engine("<think>still thinking")
+    state = LLMCallState.new("p")
+    with pytest.raises(ReasoningBudgetError):
+        engine.llm("p", call_state=state)
+    assert state.metadata["thinking_truncated"] is True
+    with pytest.raises(ReasoningBudgetError):
+        asyncio.run(engine.allm("q"))
+    assert engine.telemetry_summary()["errors"]
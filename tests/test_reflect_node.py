@@ -0,0 +1,45 @@
+import asyncio
+
+from layer1.planner.core.graph import PlannerBindings
+from layer1.planner.core.profiles import NodeProfile
+from layer1.planner.core.state import PlannerState, Step
+from layer1.planner.nodes.reflect_node import areflect_node, reflect_node
+
+
+def _state(count, words=40):
+    steps = [
+        Step(id=f"step_{i}", title=f"Step {i}", description=" ".join(["detail"] * words))
+        for i in range(1, count + 1)
+    ]
+    return PlannerState(workflow_id="wf_1", user_id="u1", goal="do the thing", context={}, steps=steps)
+
+
+def _bindings(max_prompt_tokens):
+    calls = []
+
+    def llm(prompt, **kwargs):
+        calls.append(prompt)
+        return "1. Only step"
+
+    bindings = PlannerBindings(llm=llm)
+    bindings.reflection_threshold = None
+    bindings.profiles.register("reflect_node", NodeProfile(max_prompt_tokens=max_prompt_tokens))
+    return bindings, calls
+
+
+def test_plan_over_budget_is_not_replaced_from_a_partial_view():
+    bindings, calls = _bindings(max_prompt_tokens=120)
+    state = reflect_node(_state(12), bindings)
+    assert calls == []
+    assert [s.id for s in state.steps] == [f"step_{i}" for i in range(1, 13)]
+    assert state.reflection["status"] == "SKIPPED"
+    assert state.context["reflection_gate"]["dropped_steps"]
+    assert bindings.reflection_stats == {"runs": 0, "skipped": 1}
+
+
+def test_plan_within_budget_is_reviewed():
+    bindings, calls = _bindings(max_prompt_tokens=4000)
+    state = asyncio.run(areflect_node(_state(3), bindings))
+    assert len(calls) == 1 and "step_3." in calls[0]
+    assert state.reflection["status"] == "REPLACED"
+    assert bindings.reflection_stats == {"runs": 1, "skipped": 0}
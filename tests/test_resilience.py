@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+import requests
+
+from layer1.llm_engine.errors import CircuitOpenError
+from layer1.llm_engine.resilience import CircuitBreaker, ResiliencePolicy, ResilientConnector, is_transient
+from layer1.llm_engine.scheduler import LLMScheduler
+
+
+class FlakyConnector:
+    """allm fails while `failing`, hangs while `hang`, else answers "ok"."""
+
+    def __init__(self):
+        self.failing = False
+        self.hang = False
+        self.calls = 0
+
+    async def allm(self, prompt, **kwargs):
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(3600)
+        if self.failing:
+            raise ConnectionError("backend down")
+        return "ok"
+
+    def llm(self, prompt, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("backend down")
+        return "ok"
+
+
+def _connector(reset=0.0):
+    inner = FlakyConnector()
+    policy = ResiliencePolicy(max_attempts=1, breaker_threshold=1, breaker_reset=reset)
+    return inner, ResilientConnector(inner, policy)
+
+
+def test_breaker_opens_and_half_open_trial_closes_it():
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0.0)
+    assert breaker.before_call() is False
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.before_call() is True  # reset elapsed: this call is the trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.before_call() is True
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_fails_fast():
+    inner, conn = _connector(reset=60.0)
+    inner.failing = True
+    with pytest.raises(ConnectionError):
+        conn.llm("p")
+    with pytest.raises(CircuitOpenError):
+        conn.llm("p")
+    assert inner.calls == 1
+    assert conn.rejected == 1
+
+
+def test_cancelled_half_open_trial_is_released():
+    inner, conn = _connector()
+
+    async def scenario():
+        inner.failing = True
+        with pytest.raises(ConnectionError):
+            await conn.allm("p")
+        assert conn.breaker.state == CircuitBreaker.OPEN
+
+        # the half-open trial is cancelled (e.g. a batch timeout)
+        inner.failing, inner.hang = False, True
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(conn.allm("p"), 0.05)
+        assert conn.breaker.state == CircuitBreaker.HALF_OPEN
+
+        # a cancellation is neither success nor failure: the next call becomes the trial
+        inner.hang = False
+        assert await conn.allm("p") == "ok"
+        assert conn.breaker.state == CircuitBreaker.CLOSED
+
+    asyncio.run(scenario())
+
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    error = RuntimeError(f"LMStudioConnector failed: {status} error")  # wrapped like the connector does
+    error.__cause__ = requests.HTTPError(f"{status} error", response=response)
+    return error
+
+
+def test_only_transient_errors_are_retried():
+    assert is_transient(ConnectionError("reset"))
+    assert is_transient(_http_error(503))
+    assert is_transient(_http_error(429))
+    assert not is_transient(_http_error(400))
+    assert not is_transient(ValueError("bad payload"))
+
+
+def test_client_error_is_not_retried_or_counted():
+    errors = [_http_error(400)]
+
+    class Inner:
+        calls = 0
+
+        def llm(self, prompt, **kwargs):
+            self.calls += 1
+            raise errors[0]
+
+    inner = Inner()
+    conn = ResilientConnector(inner, ResiliencePolicy(max_attempts=2, breaker_threshold=2, base_delay=0.0))
+    with pytest.raises(RuntimeError):
+        conn.llm("p")
+    assert inner.calls == 1 and conn.retries == 0
+    assert conn.breaker.state == CircuitBreaker.CLOSED
+
+    errors[0] = _http_error(503)
+    with pytest.raises(RuntimeError):
+        conn.llm("p")
+    assert inner.calls == 3 and conn.retries == 1
+    assert conn.breaker.state == CircuitBreaker.OPEN
+
+
+def test_backoff_gives_up_the_scheduler_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    class Inner:
+        calls = 0
+
+        async def allm(self, prompt, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("reset")
+            order.append("retry")
+            return "ok"
+
+    conn = ResilientConnector(Inner(), ResiliencePolicy(max_attempts=2))
+    conn._backoff = lambda attempt: 0.05
+
+    async def call():
+        async with scheduler.aslot():
+            return await conn.allm("p")
+
+    async def other():
+        await asyncio.sleep(0.01)
+        async with scheduler.aslot():
+            order.append("other")
+
+    async def scenario():
+        return await asyncio.gather(call(), other())
+
+    assert asyncio.run(scenario())[0] == "ok"
+    assert order == ["other", "retry"]  # the other caller ran during the backoff
+    assert scheduler.stats()["active"] == 0
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+from layer1.llm_engine.response_cache import ResponseCache
+
+
+class SlowRedis:
+    """RedisMemory's get/set API with a blocking round trip."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.data = {}
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        return self.data.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.threads.add(threading.get_ident())
+        time.sleep(self.delay)
+        self.data[key] = value
+
+
+def test_lru_then_redis_tier():
+    redis = SlowRedis(delay=0)
+    cache = ResponseCache(max_entries=1, redis=redis)
+    cache.set("a", "1")
+    cache.set("b", "2")  # evicts "a" from the LRU
+    assert cache.get("a") == "1"  # served by Redis, back in the LRU
+    assert cache.get("missing") is None
+    assert cache.stats()["redis_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_async_redis_round_trips_do_not_block_the_loop():
+    redis = SlowRedis()
+    redis.data[ResponseCache.KEY_PREFIX + "k"] = "cached"
+    cache = ResponseCache(redis=redis)
+
+    async def scenario():
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.01)
+
+        value, _ = await asyncio.gather(cache.aget("k"), ticker())
+        cache.aset("other", "v")
+        await asyncio.sleep(0.3)
+        return value, ticks
+
+    value, ticks = asyncio.run(scenario())
+    assert value == "cached"
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+    assert threading.get_ident() not in redis.threads
+    assert redis.data[ResponseCache.KEY_PREFIX + "other"] == "v"
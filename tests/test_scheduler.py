@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+
+from layer1.llm_engine.scheduler import LLMScheduler, Priority
+
+
+async def _take(scheduler, order, label, priority, user, hold=0.0):
+    async with scheduler.aslot(priority, user):
+        order.append(label)
+        await asyncio.sleep(hold)
+
+
+def test_handoff_by_priority_then_round_robin_per_user():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def main():
+        async with scheduler.aslot(Priority.INTERACTIVE, "owner"):
+            tasks = [
+                asyncio.create_task(_take(scheduler, order, "bg", "background", "u1")),
+                asyncio.create_task(_take(scheduler, order, "plan-u1-1", "planning", "u1")),
+                asyncio.create_task(_take(scheduler, order, "plan-u1-2", "planning", "u1")),
+                asyncio.create_task(_take(scheduler, order, "plan-u2", "planning", "u2")),
+                asyncio.create_task(_take(scheduler, order, "chat", "interactive", "u3")),
+            ]
+            await asyncio.sleep(0.01)
+            assert scheduler.stats()["queued"] == 5
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["chat", "plan-u1-1", "plan-u2", "plan-u1-2", "bg"]
+    stats = scheduler.stats()
+    assert stats["active"] == 0 and stats["queued"] == 0 and stats["peak_queue_depth"] == 5
+
+
+def test_cancelled_waiter_hands_its_slot_on():
+    scheduler = LLMScheduler(max_concurrency=1)
+    order = []
+
+    async def main():
+        async with scheduler.aslot():
+            queued = asyncio.create_task(_take(scheduler, order, "queued", None, "u1"))
+            granted = asyncio.create_task(_take(scheduler, order, "granted", "interactive", "u2"))
+            after = asyncio.create_task(_take(scheduler, order, "after", None, "u3"))
+            await asyncio.sleep(0.01)
+            queued.cancel()  # still in line: gives up its place
+            await asyncio.sleep(0.01)
+        granted.cancel()  # slot already handed over: passes it on
+        await asyncio.gather(queued, granted, after, return_exceptions=True)
+
+    asyncio.run(main())
+    assert order == ["after"]
+    assert scheduler.stats()["active"] == 0
+
+
+def test_thread_waiters_admitted_when_the_pool_grows():
+    scheduler = LLMScheduler(max_concurrency=1)
+    entered = []
+    release = threading.Event()
+
+    def worker(label):
+        with scheduler.slot("background", label):
+            entered.append(label)
+            release.wait(5)
+
+    with scheduler.slot():
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(2)]
+        for t in threads:
+            t.start()
+        while scheduler.stats()["queued"] < 2:
+            time.sleep(0.005)
+        scheduler.set_max_concurrency(3)
+        for _ in range(200):
+            if len(entered) == 2:
+                break
+            time.sleep(0.005)
+        assert sorted(entered) == ["w0", "w1"]
+        assert scheduler.stats()["active"] == 3
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert scheduler.stats()["active"] == 0
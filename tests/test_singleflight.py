@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from layer1.llm_engine.singleflight import SingleFlight
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "shared": 4, "in_flight": 0}
+
+
+def test_async_callers_share_one_call_and_its_error():
+    flight = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "answer"
+
+
+def test_call_is_cancelled_when_every_caller_is():
+    flight = SingleFlight()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        finished.append(1)
+        return "answer"
+
+    async def scenario():
+        callers = [asyncio.ensure_future(flight.ado("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.3)
+        # a new caller after the cancellation starts a fresh call
+        return await flight.ado("k", slow)
+
+    assert asyncio.run(scenario()) == "answer"
+    assert finished == [1]
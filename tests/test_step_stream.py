@@ -0,0 +1,159 @@
+import asyncio
+import json
+import random
+import threading
+
+from layer1.llm_engine.llm_engine_main import Layer1LLMEngine
+from layer1.llm_engine.llm_state import LLMCallState
+from layer1.llm_engine.reasoning import ReasoningConfig, json_object_complete
+from layer1.llm_engine.response_cache import ResponseCache
+from layer1.llm_engine.scheduler import LLMScheduler
+from layer1.planner.core.step_stream import StepStreamParser
+from layer1.planner.core.structured import extract_json, parse_plan
+from layer1.planner.nodes.decompose_node import _parse_numbered_list
+from layer1.planner.planner_main import Layer1Planner
+
+STEPS_ANSWER = json.dumps({"steps": [
+    {"title": "Open {page}", "description": 'say "hi" [x]'},
+    {"title": "Save file", "description": "save"},
+    {"title": "Send email", "description": "send it"},
+]})
+
+
+def _chunks(text, seed=1):
+    rng = random.Random(seed)
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 7)
+        yield text[i:i + n]
+        i += n
+
+
+def _parse_streamed(text, structured):
+    parser = StepStreamParser(structured)
+    emitted = []
+    for delta in _chunks(text):
+        emitted += parser.feed(delta)
+    emitted += parser.close()
+    return emitted
+
+
+def test_json_steps_match_full_parse():
+    prefix = "<think>{ [ not json</think>\n```json\n"
+    for text in (STEPS_ANSWER, prefix + STEPS_ANSWER + "\n```"):
+        assert _parse_streamed(text, True) == parse_plan(extract_json(STEPS_ANSWER))
+
+
+def test_json_ignores_nested_steps_keys():
+    text = json.dumps({"intent": {"steps": [{"title": "no"}]}, "steps": [{"title": "Yes"}], "review": {}})
+    assert [s.title for s in _parse_streamed(text, True)] == ["Yes"]
+
+
+def test_numbered_list_matches_full_parse():
+    answer = "1. Open page: go to site\n2) Save - write file\n\n3. Run the big script now"
+    assert _parse_streamed("<think>1. no</think>" + answer, False) == _parse_numbered_list(answer)
+
+
+class StepsConnector:
+    """Answers every request with `answer`; stream() / astream() send it in small chunks."""
+
+    model = "stub"
+
+    def __init__(self, answer=STEPS_ANSWER):
+        self.answer = answer
+
+    def llm(self, prompt, **kwargs):
+        return self.answer
+
+    def stream(self, prompt, **kwargs):
+        yield from _chunks(self.answer)
+
+    async def astream(self, prompt, **kwargs):
+        for delta in _chunks(self.answer):
+            await asyncio.sleep(0)
+            yield delta
+
+
+def _streaming_planner(connector, **engine_kwargs):
+    engine = Layer1LLMEngine(**engine_kwargs)
+    engine.bind_lmstudio(connector)
+    planner = Layer1Planner(pipeline="graph")
+    planner.register_llm(engine.llm)
+    planner.register_allm(engine.allm)
+    planner.register_reasoning(json_object_complete, LLMCallState.new)
+    return planner
+
+
+def test_on_step_may_call_the_llm_while_the_stream_holds_the_only_slot():
+    scheduler = LLMScheduler(max_concurrency=1)
+    planner = _streaming_planner(StepsConnector(), scheduler=scheduler)
+    checked = []
+
+    def on_step(step):
+        # e.g. a per-step safety check through the same scheduler
+        with scheduler.slot():
+            checked.append(step.id)
+
+    worker = threading.Thread(
+        target=lambda: planner.plan_workflow(planner.create_workflow("u", "Save the page"), on_step=on_step),
+        daemon=True,
+    )
+    worker.start()
+    worker.join(5)
+    assert not worker.is_alive(), "planning deadlocked"
+    assert checked == ["step_1", "step_2", "step_3"]
+
+
+def test_stream_workflow_yields_steps_in_order():
+    planner = _streaming_planner(StepsConnector())
+
+    async def scenario():
+        state = planner.create_workflow("u", "Save the page")
+        return [step.id async for step in planner.stream_workflow(state)], state
+
+    ids, state = asyncio.run(scenario())
+    assert ids == ["step_1", "step_2", "step_3"]
+    assert state.context["decompose_stream"] == {"streamed": 3, "complete": True}
+
+
+def test_streamed_decomposition_goes_through_the_reasoning_budget():
+    connector = StepsConnector("<think>" + "hmm " * 50 + "</think>" + STEPS_ANSWER)
+    planner = _streaming_planner(connector, reasoning=ReasoningConfig())
+    seen = []
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"), on_step=seen.append)
+    assert [step.title for step in seen] == ["Open {page}", "Save file", "Send email"]
+    assert state.context["decompose_stream"] == {"streamed": 3, "complete": True}
+    assert state.context["reasoning"]["decompose_node"]["thinking"].startswith("hmm")
+
+
+def test_cached_and_coalesced_answers_reach_on_delta_whole():
+    engine = Layer1LLMEngine(cache=ResponseCache())
+    engine.bind_lmstudio(StepsConnector())
+    first, second = [], []
+    assert engine.llm("p", temperature=0, on_delta=first.append) == STEPS_ANSWER
+    assert engine.llm("p", temperature=0, on_delta=second.append) == STEPS_ANSWER
+    assert len(first) > 1 and "".join(first) == STEPS_ANSWER
+    assert second == [STEPS_ANSWER]
+
+
+def test_broken_stream_is_replanned_without_resending_steps():
+    replanned = json.dumps({"steps": [
+        {"title": "Open {page}", "description": 'say "hi" [x]'},
+        {"title": "Save page", "description": "save it"},
+        {"title": "Send email", "description": "send it"},
+    ]})
+    cut = STEPS_ANSWER.index('"save"}') + len('"save"}')
+
+    class BrokenStream(StepsConnector):
+        def stream(self, prompt, **kwargs):
+            yield from _chunks(STEPS_ANSWER[:cut])
+            raise ConnectionError("connection reset")
+
+    planner = _streaming_planner(BrokenStream(replanned))
+    seen = []
+    state = planner.plan_workflow(planner.create_workflow("u", "Save the page"), on_step=seen.append)
+    assert [step.title for step in seen] == ["Open {page}", "Save file", "Save page", "Send email"]
+    stream_info = state.context["decompose_stream"]
+    assert stream_info["streamed"] == 2 and stream_info["complete"] is False
+    assert stream_info["superseded"] == ["step_2"]
+    assert "connection reset" in stream_info["error"]
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from layer1.planner.core import structured
+from layer1.planner.core.errors import StructuredOutputError
+from layer1.planner.core.graph import PlannerBindings
+from layer1.planner.core.structured import (
+    extract_json, json_schema_format, parse_fused, parse_plan, parse_reflection, parse_routes,
+)
+
+SCHEMAS = {
+    "plan_steps": structured.STEPS_SCHEMA,
+    "plan_reflection": structured.REFLECTION_SCHEMA,
+    "step_routes": structured.ROUTES_SCHEMA,
+    "fused_plan": structured.FUSED_SCHEMA,
+}
+
+
+def _objects(schema):
+    if schema.get("type") == "object":
+        yield schema
+        for prop in schema["properties"].values():
+            yield from _objects(prop)
+    elif schema.get("type") == "array":
+        yield from _objects(schema["items"])
+
+
+@pytest.mark.parametrize("name", sorted(SCHEMAS))
+def test_schemas_are_strict_mode_compliant(name):
+    fmt = json_schema_format(name, SCHEMAS[name])
+    assert fmt["json_schema"]["strict"] is True
+    for obj in _objects(fmt["json_schema"]["schema"]):
+        assert obj["additionalProperties"] is False
+        assert sorted(obj["required"]) == sorted(obj["properties"])
+
+
+@pytest.mark.parametrize("raw", [
+    '{"steps": []}',
+    '<think>maybe {"steps": 1}</think>{"steps": []}',
+    '```json\n{"steps": []}\n```',
+    'Here is the plan: {"steps": []} Hope it helps.',
+])
+def test_extract_json_tolerates_wrapping(raw):
+    assert extract_json(raw) == {"steps": []}
+
+
+@pytest.mark.parametrize("raw", ["no json here", '{"steps": [}', "<think>only thinking"])
+def test_extract_json_rejects_non_json(raw):
+    with pytest.raises(StructuredOutputError):
+        extract_json(raw)
+
+
+def test_parsers_validate_and_normalise():
+    steps = parse_plan([{"title": "  Open page ", "description": ""}])
+    assert (steps[0].id, steps[0].title, steps[0].description) == ("step_1", "Open page", "Open page")
+    with pytest.raises(StructuredOutputError, match="step 1"):
+        parse_plan({"steps": [{"description": "no title"}]})
+
+    assert parse_reflection({"status": "ok"}) == {"status": "OK", "notes": "", "steps": []}
+    replaced = parse_reflection({"status": "REPLACED", "notes": "n", "steps": [{"title": "A", "description": "a"}]})
+    assert [s.title for s in replaced["steps"]] == ["A"]
+    with pytest.raises(StructuredOutputError):
+        parse_reflection({"status": "MAYBE"})
+
+    fused = parse_fused({
+        "intent": {"intent": " save ", "constraints": ["fast"]},
+        "steps": [{"title": "A", "description": "a"}],
+        "review": {"status": "revised"},
+    })
+    assert fused["intent"] == {"intent": "save", "constraints": ["fast"], "assumptions": []}
+    assert fused["review"] == {"status": "REVISED", "notes": ""}
+
+    routes = {"routes": [{"step": "step_1", "worker": "w_file"}, {"step": "step_2", "worker": "w_ghost"}]}
+    assert parse_routes(routes, ["w_file"]) == {"step_1": "w_file"}
+
+
+class ScriptedLLM:
+    """Returns the scripted answers in order and records each call."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def __call__(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return self.answers.pop(0)
+
+    async def acall(self, prompt, **kwargs):
+        return self(prompt, **kwargs)
+
+
+GOOD = json.dumps({"steps": [{"title": "Open page", "description": "open it"}]})
+
+
+def _structured(bindings, **kwargs):
+    return bindings.call_structured(
+        "decompose_node", "plan it", "plan_steps", structured.STEPS_SCHEMA, parse_plan, **kwargs
+    )
+
+
+def test_call_structured_sends_the_schema_and_parses():
+    llm = ScriptedLLM(GOOD)
+    bindings = PlannerBindings(llm=llm)
+    assert [s.title for s in _structured(bindings)] == ["Open page"]
+    assert llm.calls[0][1]["response_format"] == json_schema_format("plan_steps", structured.STEPS_SCHEMA)
+    assert bindings.structured_stats == {"calls": 1, "repairs": 0, "failures": 0}
+
+
+def test_one_repair_call_at_temperature_zero():
+    llm = ScriptedLLM('{"steps": [{"description": "no title"}]}', GOOD)
+    bindings = PlannerBindings(llm=llm)
+    assert [s.title for s in _structured(bindings)] == ["Open page"]
+    repair_prompt, repair_kwargs = llm.calls[1]
+    assert "step 1 needs a non-empty 'title' string" in repair_prompt
+    assert "no title" in repair_prompt  # the previous answer is quoted
+    assert repair_kwargs["temperature"] == 0.0
+    assert bindings.structured_stats == {"calls": 1, "repairs": 1, "failures": 0}
+
+
+def test_second_failure_or_no_repair_raises():
+    bindings = PlannerBindings(llm=ScriptedLLM("nope", "still nope"))
+    with pytest.raises(StructuredOutputError):
+        _structured(bindings)
+    assert bindings.structured_stats == {"calls": 1, "repairs": 1, "failures": 1}
+
+    llm = ScriptedLLM("nope")
+    with pytest.raises(StructuredOutputError):
+        _structured(PlannerBindings(llm=llm), repair=False)
+    assert len(llm.calls) == 1
+
+
+def test_async_repair_matches_sync():
+    llm = ScriptedLLM("nope", GOOD)
+    bindings = PlannerBindings(allm=llm.acall)
+    steps = asyncio.run(bindings.acall_structured(
+        "decompose_node", "plan it", "plan_steps", structured.STEPS_SCHEMA, parse_plan
+    ))
+    assert [s.title for s in steps] == ["Open page"]
+    assert bindings.structured_stats["repairs"] == 1
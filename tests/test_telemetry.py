@@ -0,0 +1,66 @@
+import logging
+
+import pytest
+
+from layer1.llm_engine.llm_engine_main import Layer1LLMEngine
+from layer1.llm_engine.response_cache import ResponseCache
+from layer1.llm_engine.telemetry import LLMTelemetry
+
+
+class EchoConnector:
+    model = "stub"
+
+    def llm(self, prompt, **kwargs):
+        if prompt == "fail":
+            raise ConnectionError("down")
+        return "answer " * 10
+
+
+def test_ring_buffer_keeps_the_latest_calls():
+    telemetry = LLMTelemetry(capacity=3)
+    for latency in (1.0, 2.0, 3.0, 4.0, 5.0):
+        telemetry.record(latency, 10, 20, completion_tokens=5, tokens_per_sec=10.0, node="n")
+    summary = telemetry.summary()
+    assert summary["total_calls"] == 5 and summary["window"] == 3
+    assert (summary["latency_p50"], summary["latency_max"]) == (4.0, 5.0)
+    assert summary["completion_tokens_total"] == 15
+    assert summary["nodes"] == {"n": {"calls": 3, "latency_p50": 4.0, "latency_total": 12.0}}
+
+
+def test_errors_cache_hits_and_tokens_per_sec():
+    telemetry = LLMTelemetry()
+    telemetry.record(1.0, 10, 0, error="ConnectionError", node="intent_node")
+    telemetry.record(0.001, 10, 20, tokens_per_sec=500.0, cached=True)
+    telemetry.record(1.0, 10, 20, tokens_per_sec=20.0)
+    summary = telemetry.summary()
+    assert summary["errors"] == {"ConnectionError": 1}
+    assert summary["cache_hits"] == 1
+    assert summary["tokens_per_sec_avg"] == 20.0  # cache hits are not throughput
+    assert set(summary["nodes"]) == {"intent_node", "-"}
+    telemetry.reset()
+    assert telemetry.summary()["window"] == 0
+
+
+def test_slow_calls_are_logged(caplog):
+    telemetry = LLMTelemetry(slow_threshold=0.5)
+    with caplog.at_level(logging.WARNING, logger="layer1.llm"):
+        telemetry.record(0.1, 10, 20)
+        telemetry.record(2.0, 10, 20, node="decompose_node")
+    assert [entry["node"] for entry in telemetry.slow_log] == ["decompose_node"]
+    assert "slow LLM call" in caplog.text
+    assert telemetry.summary()["slow_calls"] == 1
+
+
+def test_engine_records_every_call():
+    engine = Layer1LLMEngine(cache=ResponseCache())
+    engine.bind_lmstudio(EchoConnector())
+    engine.llm("p", temperature=0, node="intent_node")
+    engine.llm("p", temperature=0, node="intent_node")
+    with pytest.raises(ConnectionError):
+        engine.llm("fail", node="route_node")
+    summary = engine.telemetry_summary()
+    assert summary["total_calls"] == 3
+    assert summary["cache_hits"] == 1
+    assert summary["errors"] == {"ConnectionError": 1}
+    assert summary["nodes"]["intent_node"]["calls"] == 2
+    assert summary["completion_tokens_total"] > 0  # estimated for non-streamed calls
@@ -0,0 +1,46 @@
+import copy
+import importlib
+import sys
+from pathlib import Path
+
+from layer1.llm_engine.transcript import RecordingConnector, TranscriptStore
+
+
+class _Echo:
+    model = "echo"
+
+    def llm(self, prompt, **kwargs):
+        return prompt.upper()
+
+
+def test_shared_store_is_one_per_path_across_module_copies(tmp_path):
+    # Layer1Main imports the engine as llm_engine.*, Layer2 as layer1.llm_engine.*
+    layer1_dir = str(Path(__file__).resolve().parent.parent / "layer1")
+    loaded = set(sys.modules)
+    sys.path.insert(0, layer1_dir)
+    try:
+        other = importlib.import_module("llm_engine.transcript")
+    finally:
+        sys.path.remove(layer1_dir)
+        for name in set(sys.modules) - loaded:
+            if name.split(".")[0] == "llm_engine":
+                del sys.modules[name]
+    assert other is not sys.modules["layer1.llm_engine.transcript"]
+
+    path = tmp_path / "t.jsonl"
+    store = TranscriptStore.shared(str(path))
+    assert other.TranscriptStore.shared(str(path)) is store
+    assert TranscriptStore.shared(str(tmp_path / "." / "t.jsonl")) is store
+    store.close()
+
+
+def test_recording_connector_records_and_copies(tmp_path):
+    store = TranscriptStore(str(tmp_path / "t.jsonl"))
+    connector = RecordingConnector(_Echo(), store)
+    assert connector.llm("hi") == "HI"
+    assert connector.model == "echo"
+    assert store.records == 1
+    # copy builds the object without __init__ and probes __setstate__ etc.
+    clone = copy.copy(connector)
+    assert clone.inner is connector.inner
+    store.close()